@@ -0,0 +1,335 @@
+"""
+End-to-end benchmark of ObjectRuntime against a simulated Slurm cluster.
+
+    python -m ObjectBench.bench --partitions 8 --jobs 20000 --latency-ms 20 --clients 16
+
+First times each stage of serving an object in this process (ssh round
+trip, Slurm command output, parsing, object construction, serialization),
+then starts ObjectRuntime.server on the fake cluster and drives it with
+concurrent GetObject clients, reporting latency percentiles, throughput,
+reply sizes and the server's memory. --json writes the numbers to a file
+for comparing runs.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_SLURM = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_slurm.py")
+TOOLS = ("ssh", "sinfo", "squeue", "scontrol")
+CLUSTER = "Bench"
+SLURM_HOST = "bench.invalid"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(name: str, seconds: List[float], sizes: List[int] = None) -> Dict[str, Any]:
+    result = {
+        "stage": name,
+        "count": len(seconds),
+        "p50_ms": percentile(seconds, 0.50) * 1000,
+        "p99_ms": percentile(seconds, 0.99) * 1000,
+    }
+    if sizes:
+        result["bytes"] = sum(sizes) // len(sizes)
+    return result
+
+
+def timed(func: Callable[[], Any], repeat: int) -> List[float]:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def rss_kb(pid: int) -> Dict[str, int]:
+    """Current and peak resident memory of pid, from /proc (Linux only)."""
+    result = {}
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, value = line.split(":", 1)
+                    result[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return result
+
+
+def make_environment(args: argparse.Namespace, work_dir: str) -> Dict[str, str]:
+    """Write the fake tools and job log into work_dir; return the environment that uses them."""
+    bin_dir = os.path.join(work_dir, "bin")
+    os.makedirs(bin_dir)
+    for tool in TOOLS:
+        path = os.path.join(bin_dir, tool)
+        with open(path, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_SLURM}" {tool} "$@"\n')
+        os.chmod(path, 0o755)
+    log = os.path.join(work_dir, "job.out")
+    with open(log, "w") as f:
+        for line in range(args.log_lines):
+            f.write(f"step {line}: residual 1e-{line % 12} converged after {line % 40} iterations\n")
+    env = dict(os.environ)
+    env.update(
+        PATH=bin_dir + os.pathsep + env.get("PATH", ""),
+        PYTHONPATH=REPO_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+        OBJECTBENCH_PARTITIONS=str(args.partitions),
+        OBJECTBENCH_JOBS=str(args.jobs),
+        OBJECTBENCH_LATENCY_MS=str(args.latency_ms),
+        OBJECTBENCH_SCHED_MS=str(args.sched_ms),
+        OBJECTBENCH_LOG=log,
+    )
+    return env
+
+
+def make_config(args: argparse.Namespace, work_dir: str) -> str:
+    path = os.path.join(work_dir, "clusters.json")
+    cluster = {"name": CLUSTER, "slurm_host": SLURM_HOST, "ssh_pool_size": args.ssh_pool_size}
+    with open(path, "w") as f:
+        json.dump({"clusters": [cluster]}, f)
+    return path
+
+
+def bench_stages(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Time each step of serving an object, in this process (PATH already points at the fake tools)."""
+    sys.path.insert(0, REPO_DIR)
+    try:
+        import dill as pickle  # what the server uses for the pickle format
+    except Exception:  # pragma: no cover - fallback
+        import pickle  # type: ignore
+    from ObjectRuntime.job_record import iter_job_records
+    from ObjectRuntime.poller import ClusterState
+    from ObjectRuntime.providers import Registry
+    from ObjectRuntime.slurm_collector import SNAPSHOT_COMMAND, parse_snapshot
+    from ObjectRuntime.slurm_connection import get_connection, set_pool_size
+
+    set_pool_size(args.ssh_pool_size)
+    connection = get_connection(SLURM_HOST)
+    repeat = args.stage_repeat
+    results = [summarize("ssh round trip", timed(lambda: connection.run(["true"]), repeat))]
+
+    outputs = {}
+
+    def fetch(name: str, script: str) -> None:
+        outputs[name] = connection.run_script(script).stdout.decode("utf-8")
+
+    results.append(summarize("ssh sinfo+squeue", timed(lambda: fetch("snapshot", SNAPSHOT_COMMAND), repeat),
+                             [len(outputs.get("snapshot", ""))] * repeat))
+    results.append(summarize("ssh scontrol", timed(lambda: fetch("records", "scontrol -o show job"), repeat),
+                             [len(outputs.get("records", ""))] * repeat))
+
+    parsed = {}
+
+    def parse_records() -> None:
+        records = {}
+        for record in iter_job_records(outputs["records"].splitlines()):
+            for job_id in record.ids():
+                records[job_id] = record
+        parsed["records"] = records
+
+    def parse_queue() -> None:
+        parsed["snapshot"] = parse_snapshot(outputs["snapshot"])
+
+    results.append(summarize("parse squeue", timed(parse_queue, repeat)))
+    results.append(summarize("parse scontrol", timed(parse_records, repeat)))
+
+    registry = Registry({"clusters": [{"name": CLUSTER, "slurm_host": SLURM_HOST}]})
+    state = ClusterState(parsed["snapshot"], parsed["records"], 0)
+    partition = parsed["snapshot"].partitions[0]
+    path = f"/Slurm/{CLUSTER}/{partition}"
+    built = {}
+
+    def construct() -> None:
+        built["object"] = registry.resolve(path, state)
+
+    results.append(summarize(f"construct {partition}", timed(construct, repeat)))
+    obj = built["object"]
+    wire_sizes: List[int] = []
+    pickle_sizes: List[int] = []
+    results.append(summarize("serialize wire", timed(lambda: wire_sizes.append(len(obj.to_wire())), repeat), wire_sizes))
+    results.append(summarize("serialize pickle", timed(lambda: pickle_sizes.append(len(pickle.dumps(obj))), repeat), pickle_sizes))
+    return results
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start listening")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request_paths(args: argparse.Namespace) -> List[str]:
+    """The mix of objects clients ask for: the cluster, its partitions and some jobs."""
+    from ObjectBench import fake_slurm
+
+    os.environ["OBJECTBENCH_PARTITIONS"] = str(args.partitions)
+    os.environ["OBJECTBENCH_JOBS"] = str(args.jobs)
+    paths = [f"/Slurm/{CLUSTER}"]
+    paths += [f"/Slurm/{CLUSTER}/{partition}" for partition in fake_slurm.partitions()]
+    jobs = [job for job in fake_slurm.jobs() if not job[3]]
+    for job_id, partition, _, _ in random.Random(1).sample(jobs, min(len(jobs), 20)):
+        paths.append(f"/Slurm/{CLUSTER}/{partition.split(',')[0]}/{job_id}")
+    return paths
+
+
+def bench_server(args: argparse.Namespace, env: Dict[str, str], config: str) -> Dict[str, Any]:
+    """Start the server on the fake cluster and drive it with concurrent clients."""
+    from ObjectViewer.viewer import ServerConnection
+
+    port = free_port()
+    command = [sys.executable, "-m", "ObjectRuntime.server", "--port", str(port), "--host", "127.0.0.1",
+               "--config", config, "--ssh-pool-size", str(args.ssh_pool_size)]
+    if args.snapshot_interval:
+        command += ["--snapshot-interval", str(args.snapshot_interval)]
+    server = subprocess.Popen(command, cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        wait_for_port(port, server)
+        paths = request_paths(args)
+        message = {"action": "GetObject", "format": args.format}
+
+        # The first request for each object pays for the Slurm calls
+        cold: List[float] = []
+        connection = ServerConnection("127.0.0.1", port, timeout=120, compress=args.compress)
+        for path in paths:
+            start = time.perf_counter()
+            connection.request(dict(message, path=path))
+            cold.append(time.perf_counter() - start)
+        connection.close()
+        if args.snapshot_interval:
+            # Let the first background poll land so requests are answered from it
+            time.sleep(min(args.snapshot_interval, 5.0))
+
+        latencies: List[float] = []
+        sizes: List[int] = []
+        errors: List[str] = []
+        lock = threading.Lock()
+
+        def client(seed: int) -> None:
+            rng = random.Random(seed)
+            connection = ServerConnection("127.0.0.1", port, timeout=120, compress=args.compress)
+            mine: List[float] = []
+            my_sizes: List[int] = []
+            try:
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    reply = connection.request(dict(message, path=rng.choice(paths)))
+                    mine.append(time.perf_counter() - start)
+                    my_sizes.append(len(reply))
+            except Exception as exc:
+                with lock:
+                    errors.append(str(exc))
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(mine)
+                    sizes.extend(my_sizes)
+
+        threads = [threading.Thread(target=client, args=(seed,)) for seed in range(args.clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        memory = rss_kb(server.pid)
+        return {
+            "cold": summarize("first request per object", cold),
+            "warm": summarize(f"{args.clients} clients", latencies, sizes),
+            "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+            "errors": errors,
+            "server_rss_kb": memory.get("VmRSS", 0),
+            "server_peak_rss_kb": memory.get("VmHWM", 0),
+        }
+    finally:
+        server.terminate()
+        try:
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def print_stage(result: Dict[str, Any]) -> None:
+    size = f"{result['bytes']:>10d} B" if "bytes" in result else ""
+    print(f"  {result['stage']:<28} n={result['count']:<6d} p50 {result['p50_ms']:9.2f} ms  p99 {result['p99_ms']:9.2f} ms  {size}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ObjectRuntime benchmark on a simulated Slurm cluster")
+    parser.add_argument("--partitions", type=int, default=4, help="Partitions in the fake cluster")
+    parser.add_argument("--jobs", type=int, default=2000, help="Jobs in the fake cluster")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Delay added to every ssh command")
+    parser.add_argument("--sched-ms", type=int, default=0, help="Delay added to every sinfo/squeue/scontrol call")
+    parser.add_argument("--log-lines", type=int, default=10000, help="Lines in the jobs' output file")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent client connections")
+    parser.add_argument("--requests", type=int, default=50, help="GetObject requests per client")
+    parser.add_argument("--format", choices=("wire", "pickle"), default="wire", help="Reply format clients ask for")
+    parser.add_argument("--compress", action="store_true", help="Let clients offer reply compression")
+    parser.add_argument("--snapshot-interval", type=float, default=0.0, help="Run the server with background polling")
+    parser.add_argument("--ssh-pool-size", type=int, default=4, help="SSH sessions per Slurm host")
+    parser.add_argument("--stage-repeat", type=int, default=5, help="Repetitions of each in-process stage")
+    parser.add_argument("--skip-stages", action="store_true", help="Only run the client/server benchmark")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="objectbench-")
+    try:
+        env = make_environment(args, work_dir)
+        config = make_config(args, work_dir)
+        report: Dict[str, Any] = {"settings": vars(args)}
+        print(f"Fake cluster: {args.partitions} partitions, {args.jobs} jobs, "
+              f"ssh +{args.latency_ms} ms, scheduler +{args.sched_ms} ms")
+        if not args.skip_stages:
+            os.environ.update(env)
+            report["stages"] = bench_stages(args)
+            print("Stages (in process):")
+            for result in report["stages"]:
+                print_stage(result)
+        server = bench_server(args, env, config)
+        report["server"] = server
+        print(f"Server ({args.format}{', compressed' if args.compress else ''}"
+              f"{f', snapshot every {args.snapshot_interval:g} s' if args.snapshot_interval else ''}):")
+        print_stage(server["cold"])
+        print_stage(server["warm"])
+        print(f"  throughput {server['throughput_rps']:.0f} requests/s, "
+              f"server RSS {server['server_rss_kb'] / 1024:.1f} MB (peak {server['server_peak_rss_kb'] / 1024:.1f} MB)")
+        if server["errors"]:
+            print(f"  {len(server['errors'])} clients failed, first error: {server['errors'][0]}")
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        from ObjectRuntime.slurm_connection import close_all
+        close_all()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Stand-ins for ssh, sinfo, squeue and scontrol that serve a synthetic cluster.
+
+bench.py writes small wrappers named after each tool that run this script
+with the tool name as first argument, and puts them first on the server's
+PATH. The cluster is generated from environment variables, so every call
+sees the same partitions and jobs:
+
+    OBJECTBENCH_PARTITIONS  number of partitions (part00, part01, ...)
+    OBJECTBENCH_JOBS        number of jobs, spread over the partitions
+    OBJECTBENCH_LATENCY_MS  added to every ssh command (network round trip)
+    OBJECTBENCH_SCHED_MS    added to every squeue/sinfo/scontrol call
+    OBJECTBENCH_LOG         file every job reports as its StdOut/StdErr
+"""
+import os
+import subprocess
+import sys
+import time
+from typing import Iterator, Tuple
+
+
+STATES = ("RUNNING", "PENDING", "PENDING", "RUNNING", "COMPLETING", "PENDING")
+FIRST_JOB_ID = 1000000
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _sleep(name: str) -> None:
+    delay = _env_int(name, 0)
+    if delay > 0:
+        time.sleep(delay / 1000.0)
+
+
+def partitions() -> list:
+    return [f"part{index:02d}" for index in range(max(1, _env_int("OBJECTBENCH_PARTITIONS", 4)))]
+
+
+def jobs() -> Iterator[Tuple[str, str, str, int]]:
+    """(job id, partition list, state, array size) for every job."""
+    names = partitions()
+    for index in range(_env_int("OBJECTBENCH_JOBS", 2000)):
+        partition = names[index % len(names)]
+        # Every 50th job may run in two partitions, like "a,b" in squeue
+        if index % 50 == 49 and len(names) > 1:
+            partition += "," + names[(index + 1) % len(names)]
+        array_size = 8 if index % 200 == 7 else 0
+        yield str(FIRST_JOB_ID + index), partition, STATES[index % len(STATES)], array_size
+
+
+def scontrol_line(job_id: str, partition: str, state: str, array_size: int) -> str:
+    log = os.environ.get("OBJECTBENCH_LOG", "/dev/null")
+    number = int(job_id) - FIRST_JOB_ID
+    array = f"ArrayJobId={job_id} ArrayTaskId=1-{array_size} " if array_size else ""
+    return (
+        f"JobId={job_id} {array}JobName=bench_{number % 97} UserId=user{number % 31}({5000 + number % 31}) "
+        f"GroupId=bench(5000) Priority={number % 1000} JobState={state} Reason={'None' if state == 'RUNNING' else 'Priority'} "
+        f"Dependency=(null) Requeue=1 Restarts=0 RunTime=00:{number % 60:02d}:00 TimeLimit=1-00:00:00 "
+        f"SubmitTime=2024-01-01T00:00:00 StartTime=2024-01-01T00:05:00 EndTime=2024-01-02T00:05:00 "
+        f"Partition={partition} NodeList=c{number % 512:03d} NumNodes=1 NumCPUs={1 + number % 16} "
+        f"TRES=cpu={1 + number % 16},mem=4G,node=1 WorkDir=/home/user{number % 31} StdOut={log} StdErr={log}"
+    )
+
+
+def sinfo() -> None:
+    _sleep("OBJECTBENCH_SCHED_MS")
+    names = partitions()
+    sys.stdout.write("\n".join([names[0] + "*"] + names[1:]) + "\n")
+
+
+def squeue() -> None:
+    _sleep("OBJECTBENCH_SCHED_MS")
+    out = sys.stdout
+    for job_id, partition, state, array_size in jobs():
+        if array_size:
+            job_id += "_[1-%d]" % array_size
+        out.write(f"{partition} {job_id} {state}\n")
+
+
+def scontrol(args: list) -> None:
+    _sleep("OBJECTBENCH_SCHED_MS")
+    one_line = args[:1] == ["-o"]
+    if one_line:
+        args = args[1:]
+    wanted = args[2] if len(args) > 2 else None
+    for job in jobs():
+        if wanted is not None and job[0] != wanted.split("_")[0]:
+            continue
+        line = scontrol_line(*job)
+        if one_line:
+            sys.stdout.write(line + "\n")
+        else:
+            # Multi-line form, as `scontrol show job <id>` prints it
+            sys.stdout.write("   ".join(token + "\n" for token in line.split(" ")) + "\n")
+
+
+def ssh(args: list) -> int:
+    control = None
+    operation = None
+    master = False
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg in ("-S", "-O", "-o"):
+            if arg == "-S":
+                control = args[index + 1]
+            elif arg == "-O":
+                operation = args[index + 1]
+            index += 2
+        elif arg in ("-M", "-N", "-f"):
+            master = master or arg == "-M"
+            index += 1
+        else:
+            break
+    command = args[index + 1:]
+    if master:
+        open(control, "w").close()
+        return 0
+    if operation == "check":
+        return 0 if control and os.path.exists(control) else 255
+    if operation == "exit":
+        if control and os.path.exists(control):
+            os.unlink(control)
+        return 0
+    _sleep("OBJECTBENCH_LATENCY_MS")
+    # Like a real ssh: the remote shell runs the joined command line
+    return subprocess.call(["sh", "-c", " ".join(command)])
+
+
+def main() -> None:
+    tool, args = sys.argv[1], sys.argv[2:]
+    if tool == "ssh":
+        sys.exit(ssh(args))
+    elif tool == "sinfo":
+        sinfo()
+    elif tool == "squeue":
+        squeue()
+    elif tool == "scontrol":
+        scontrol(args)
+    else:
+        sys.exit(f"Unknown tool: {tool}")
+
+
+if __name__ == "__main__":
+    main()
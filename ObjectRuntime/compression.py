@@ -0,0 +1,82 @@
+"""
+Optional compression of reply frames.
+
+Clients list the codecs they accept in a request's "compress" field; the
+server picks the first one it supports and uses it for the rest of the
+connection. A compressed frame has the top bit of its 4-byte length set,
+and its body is one byte naming the codec followed by the compressed
+bytes of what the body would otherwise have been (request id and payload).
+Only payloads of at least `threshold` bytes that actually shrink are sent
+compressed, so small replies cost nothing extra.
+
+zlib is always available; lz4 is used when the lz4 package is installed.
+"""
+import zlib
+from typing import Any, Dict, List, Optional
+
+try:
+    import lz4.frame as lz4_frame  # much faster than zlib, slightly larger output
+except Exception:  # pragma: no cover - optional
+    lz4_frame = None
+
+
+COMPRESSED_FLAG = 0x80000000
+
+CODEC_IDS = {"zlib": 1, "lz4": 2}
+CODEC_NAMES = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+
+# Smallest payload worth compressing
+threshold = 1024
+
+# Compression level per codec; set from the server's command line
+levels: Dict[str, int] = {"zlib": 6, "lz4": 0}
+
+
+def available() -> List[str]:
+    """Codecs this process can handle, preferred first."""
+    return ["lz4", "zlib"] if lz4_frame is not None else ["zlib"]
+
+
+def choose(accepted: Any) -> Optional[str]:
+    """The first codec in accepted (a name or list of names) this process supports."""
+    if isinstance(accepted, str):
+        accepted = [accepted]
+    if not isinstance(accepted, list):
+        return None
+    supported = available()
+    for name in accepted:
+        if name in supported:
+            return name
+    return None
+
+
+def compress(codec: str, parts: List[bytes]) -> bytearray:
+    """
+    The compressed frame body for parts (sent back to back): codec id byte
+    plus compressed data. The parts are fed to the compressor one by one
+    rather than joined first.
+    """
+    out = bytearray((CODEC_IDS[codec],))
+    if codec == "lz4":
+        compressor = lz4_frame.LZ4FrameCompressor(compression_level=levels["lz4"])
+        out += compressor.begin()
+    else:
+        compressor = zlib.compressobj(levels["zlib"])
+    for part in parts:
+        out += compressor.compress(part)
+    out += compressor.flush()
+    return out
+
+
+def decompressor(codec_id: int) -> Any:
+    """
+    A streaming decompressor for codec_id: feed it chunks with
+    .decompress(data, max_length=n), which returns at most n bytes; .eof
+    is true once the whole stream was seen.
+    """
+    name = CODEC_NAMES.get(codec_id)
+    if name == "zlib":
+        return zlib.decompressobj()
+    if name == "lz4" and lz4_frame is not None:
+        return lz4_frame.LZ4FrameDecompressor()
+    raise ValueError(f"Unsupported compression codec {codec_id}")
@@ -0,0 +1,124 @@
+"""
+Length-prefixed frames, shared by the server and the viewer.
+
+A frame is a 4-byte big-endian length followed by that many bytes; frames
+tagged with a request id carry it as the first 4 bytes of the body. The
+top bit of the length marks a compressed body (see compression).
+
+Frames are received into a buffer allocated once from the length header
+and filled with recv_into, and sent as a list of parts with scatter-gather
+sendmsg, so a large payload is never copied just to add a header.
+"""
+import socket
+import struct
+from typing import List, Optional, Sequence
+
+from . import compression
+from . import metrics
+
+
+HEADER = struct.Struct("!I")
+TAGGED_HEADER = struct.Struct("!II")
+MAX_MESSAGE_SIZE = 128 * 1024 * 1024
+
+# Largest single recv for compressed frames, which are decompressed as they arrive
+RECV_CHUNK_SIZE = 256 * 1024
+# Most bytes decompressed in one step, so the size limit is checked as output grows
+DECOMPRESS_BLOCK_SIZE = 1024 * 1024
+
+_HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+
+
+def recv_into_exactly(connection: socket.socket, view: memoryview) -> None:
+    """Fill view from connection."""
+    while view:
+        received = connection.recv_into(view)
+        if not received:
+            raise ConnectionError("Connection closed while receiving data")
+        view = view[received:]
+
+
+def recv_exactly(connection: socket.socket, num_bytes: int) -> bytearray:
+    data = bytearray(num_bytes)
+    recv_into_exactly(connection, memoryview(data))
+    return data
+
+
+def recv_decompressed(connection: socket.socket, num_bytes: int) -> bytearray:
+    """
+    Receive a compressed frame body, decompressing each chunk as it arrives.
+    Output is produced a block at a time, so a highly compressible chunk is
+    rejected as soon as it expands past MAX_MESSAGE_SIZE.
+    """
+    decompressor = compression.decompressor(recv_exactly(connection, 1)[0])
+    chunk = bytearray(min(RECV_CHUNK_SIZE, max(num_bytes - 1, 1)))
+    view = memoryview(chunk)
+    data = bytearray()
+    remaining = num_bytes - 1
+    while remaining:
+        received = connection.recv_into(view[:min(remaining, len(chunk))])
+        if not received:
+            raise ConnectionError("Connection closed while receiving data")
+        remaining -= received
+        pending = view[:received]
+        while True:
+            block = decompressor.decompress(pending, max_length=DECOMPRESS_BLOCK_SIZE)
+            data += block
+            if len(data) > MAX_MESSAGE_SIZE:
+                raise ValueError("Message too large")
+            # zlib hands back the input it did not get to; lz4 keeps it itself
+            pending = getattr(decompressor, "unconsumed_tail", b"")
+            if decompressor.eof or (not pending and len(block) < DECOMPRESS_BLOCK_SIZE):
+                break
+    if not decompressor.eof:
+        raise ValueError("Truncated compressed message")
+    return data
+
+
+def read_frame(connection: socket.socket) -> bytearray:
+    """Read one frame body, decompressed if the sender compressed it."""
+    (length,) = HEADER.unpack(recv_exactly(connection, HEADER.size))
+    compressed = length & compression.COMPRESSED_FLAG
+    length &= ~compression.COMPRESSED_FLAG
+    if length > MAX_MESSAGE_SIZE:
+        raise ValueError("Message too large")
+    if compressed:
+        return recv_decompressed(connection, length)
+    return recv_exactly(connection, length)
+
+
+def send_parts(connection: socket.socket, parts: Sequence[bytes]) -> None:
+    """Send parts back to back with as few system calls and copies as possible."""
+    if not _HAS_SENDMSG:
+        for part in parts:
+            connection.sendall(part)
+        return
+    views = [memoryview(part) for part in parts if part]
+    while views:
+        sent = connection.sendmsg(views)
+        # Drop what was sent, keeping the unsent tail of a partly sent part
+        while views and sent >= len(views[0]):
+            sent -= len(views[0])
+            views.pop(0)
+        if views and sent:
+            views[0] = views[0][sent:]
+
+
+def write_frame(connection: socket.socket, payload: bytes) -> None:
+    send_parts(connection, [HEADER.pack(len(payload)), payload])
+
+
+def frame_parts(payload: bytes, request_id: Optional[int] = None, codec: Optional[str] = None) -> List[bytes]:
+    """
+    The frame for payload (tagged with request_id, if given) as a list of
+    parts to send in order, compressed with codec if that pays off.
+    """
+    if codec is not None and len(payload) >= compression.threshold:
+        body = [payload] if request_id is None else [HEADER.pack(request_id), payload]
+        with metrics.span("compress"):
+            data = compression.compress(codec, body)
+        if len(data) < len(payload) + 4 * (request_id is not None):
+            return [HEADER.pack(len(data) | compression.COMPRESSED_FLAG), data]
+    if request_id is None:
+        return [HEADER.pack(len(payload)), payload]
+    return [TAGGED_HEADER.pack(len(payload) + 4, request_id), payload]
@@ -0,0 +1,147 @@
+from typing import Any, Callable, Dict, List
+
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+from PyQt5.QtCore import Qt, QRect, QSize, QAbstractListModel, QModelIndex
+from PyQt5.QtGui import QPainter, QColor, QPen, QPalette
+
+from .pixmap_cache import get_pixmap
+
+
+ICON_SIZE = 96
+CELL_SIZE = QSize(140, 136)
+SELECTION_COLOR = QColor(45, 124, 255)
+
+# Role returning the child object itself
+ObjectRole = Qt.UserRole + 1
+
+
+def _badge(part: Any) -> str:
+    if hasattr(part, "getBadge"):
+        try:
+            return str(part.getBadge())
+        except Exception:
+            pass
+    return ""
+
+
+class ChildListModel(QAbstractListModel):
+    """
+    List model over an object's children.
+
+    Holds its own list of the children so server deltas can be applied as
+    row inserts, removals and changes instead of rebuilding the view.
+    """
+
+    def __init__(self, children: List[Any], parent=None) -> None:
+        super().__init__(parent)
+        self._children = list(children)
+        self._rows: Dict[str, int] = {child.path: row for row, child in enumerate(self._children)}
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._children)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        part = self._children[index.row()]
+        if role == Qt.DisplayRole or role == Qt.ToolTipRole:
+            try:
+                return part.getTitle()
+            except Exception:
+                return str(part)
+        if role == ObjectRole:
+            return part
+        return None
+
+    def append(self, parts: List[Any]) -> None:
+        if not parts:
+            return
+        first = len(self._children)
+        self.beginInsertRows(QModelIndex(), first, first + len(parts) - 1)
+        for part in parts:
+            self._rows[part.path] = len(self._children)
+            self._children.append(part)
+        self.endInsertRows()
+
+    def applyDelta(self, added: List[Any], changed: List[Any], removed: List[str]) -> None:
+        for part in changed:
+            row = self._rows.get(part.path)
+            if row is not None:
+                self._children[row] = part
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+        if removed:
+            gone = set(removed)
+            rows = sorted((self._rows[path] for path in gone if path in self._rows), reverse=True)
+            for row in rows:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._children[row]
+                self.endRemoveRows()
+            self._rows = {child.path: row for row, child in enumerate(self._children)}
+        self.append([part for part in added if part.path not in self._rows])
+
+
+class IconDelegate(QStyledItemDelegate):
+    """
+    Paints one cell: the icon with its badge, and the title underneath.
+
+    Only cells the view asks for are painted, so cost follows what is
+    visible rather than the number of children.
+    """
+
+    def sizeHint(self, option, index) -> QSize:
+        return CELL_SIZE
+
+    def paint(self, painter: QPainter, option, index) -> None:
+        part = index.data(ObjectRole)
+        cell = option.rect.adjusted(4, 4, -4, -4)
+        selected = bool(option.state & QStyle.State_Selected)
+        painter.save()
+        try:
+            painter.setRenderHint(QPainter.Antialiasing, True)
+            if selected:
+                # Visual selection: single blue border around the whole cell and subtle blue background
+                fill = QColor(SELECTION_COLOR)
+                fill.setAlphaF(0.08)
+                painter.setBrush(fill)
+                painter.setPen(QPen(SELECTION_COLOR, 2))
+                painter.drawRoundedRect(cell, 8, 8)
+
+            dpr = painter.device().devicePixelRatioF()
+            pixmap = get_pixmap(part.icon_id, ICON_SIZE, _badge(part), dpr)
+            icon_top = cell.top() + 8
+            if pixmap is not None:
+                x = cell.left() + (cell.width() - round(pixmap.width() / dpr)) // 2
+                y = icon_top + (ICON_SIZE - round(pixmap.height() / dpr)) // 2
+                painter.drawPixmap(x, y, pixmap)
+
+            text_rect = QRect(cell.left() + 4, icon_top + ICON_SIZE + 4, cell.width() - 8, cell.bottom() - icon_top - ICON_SIZE - 4)
+            title = option.fontMetrics.elidedText(str(index.data(Qt.DisplayRole)), Qt.ElideMiddle, text_rect.width())
+            painter.setPen(SELECTION_COLOR if selected else option.palette.color(QPalette.Text))
+            painter.drawText(text_rect, Qt.AlignHCenter | Qt.AlignTop, title)
+        finally:
+            painter.restore()
+
+
+class IconView(QListView):
+    """Grid of icons over a ChildListModel; only the visible cells are laid out and painted."""
+
+    def __init__(self, model: ChildListModel, open_callback: Callable[[Any], None], parent=None) -> None:
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setMovement(QListView.Static)
+        self.setResizeMode(QListView.Adjust)
+        self.setWrapping(True)
+        self.setUniformItemSizes(True)
+        self.setGridSize(CELL_SIZE)
+        # Lay out huge listings in batches so the window appears at once
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(1000)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setFrameShape(QListView.NoFrame)
+        self.setItemDelegate(IconDelegate(self))
+        self.setModel(model)
+        self.doubleClicked.connect(lambda index: open_callback(index.data(ObjectRole)))
@@ -0,0 +1,112 @@
+import base64
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+
+RESOURCE_DIR = os.path.join(os.path.dirname(__file__), "Resources")
+FALLBACK_ICON = "Question.png"
+
+# icon id -> base64-encoded PNG
+_icons: Dict[str, str] = {}
+# resource file name -> icon id
+_ids_by_name: Dict[str, str] = {}
+_local_loaded = False
+_fetcher: Optional[Callable[[str], str]] = None
+# Ids prefetch() failed to fetch, so later batches do not ask again
+_unavailable: Set[str] = set()
+_lock = threading.Lock()
+
+
+def _icon_id(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()[:16]
+
+
+def _load_resource(name: str) -> str:
+    with open(os.path.join(RESOURCE_DIR, name), "rb") as f:
+        data = f.read()
+    icon_id = _icon_id(data)
+    _icons[icon_id] = base64.b64encode(data).decode("utf-8")
+    _ids_by_name[name] = icon_id
+    return icon_id
+
+
+def icon_id_for(name: str) -> str:
+    """Return the icon id of a PNG in Resources/, loading it on first use."""
+    icon_id = _ids_by_name.get(name)
+    if icon_id is not None:
+        return icon_id
+    with _lock:
+        icon_id = _ids_by_name.get(name)
+        if icon_id is not None:
+            return icon_id
+        if not os.path.exists(os.path.join(RESOURCE_DIR, name)):
+            if name == FALLBACK_ICON:
+                raise FileNotFoundError(f"Missing icon resource: {name}")
+            icon_id = _ids_by_name.get(FALLBACK_ICON) or _load_resource(FALLBACK_ICON)
+            _ids_by_name[name] = icon_id
+            return icon_id
+        return _load_resource(name)
+
+
+def register(icon: str) -> str:
+    """Add a base64-encoded PNG to the registry and return its icon id."""
+    icon_id = _icon_id(base64.b64decode(icon))
+    with _lock:
+        _icons[icon_id] = icon
+    return icon_id
+
+
+def set_fetcher(fetcher: Optional[Callable[[str], str]]) -> None:
+    """Set the function used to fetch icons this process does not have (e.g. from the server)."""
+    global _fetcher
+    _fetcher = fetcher
+
+
+def find_icon(icon_id: str) -> Optional[str]:
+    """The base64-encoded PNG for icon_id if this process has it, without fetching it."""
+    global _local_loaded
+    icon = _icons.get(icon_id)
+    if icon is not None:
+        return icon
+    with _lock:
+        # Clients usually ship the same Resources/ folder, so look there before asking the server
+        if not _local_loaded:
+            _local_loaded = True
+            for name in sorted(os.listdir(RESOURCE_DIR)):
+                if name.endswith(".png") and name not in _ids_by_name:
+                    _load_resource(name)
+        return _icons.get(icon_id)
+
+
+def get_icon(icon_id: str) -> str:
+    """Return the base64-encoded PNG for icon_id, fetching it if need be."""
+    icon = find_icon(icon_id)
+    if icon is None and _fetcher is not None:
+        icon = _fetcher(icon_id)
+        with _lock:
+            _icons[icon_id] = icon
+    if icon is None:
+        raise KeyError(f"Unknown icon: {icon_id}")
+    return icon
+
+
+def prefetch(icon_ids: Iterable[str]) -> List[str]:
+    """
+    Fetch the icons among icon_ids this process does not have yet, on the
+    calling thread, so painting them later never waits on the network.
+    Returns the ids fetched.
+    """
+    fetched = []
+    for icon_id in set(icon_ids):
+        if not icon_id or icon_id in _unavailable or find_icon(icon_id) is not None or _fetcher is None:
+            continue
+        try:
+            get_icon(icon_id)
+        except Exception as exc:
+            print(f"Failed to fetch icon {icon_id}: {exc}")
+            _unavailable.add(icon_id)
+            continue
+        fetched.append(icon_id)
+    return fetched
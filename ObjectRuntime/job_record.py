@@ -0,0 +1,128 @@
+import sys
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class JobRecord:
+    """
+    The fields of one Slurm job the runtime uses, as parsed from `scontrol show job`.
+
+    Values are kept as the strings scontrol prints; fields not listed in
+    KEYS are skipped while parsing.
+    """
+    __slots__ = (
+        "job_id", "array_job_id", "array_task_id", "name", "user", "state", "reason",
+        "partition", "submit_time", "start_time", "end_time", "time_limit", "run_time",
+        "nodes", "num_nodes", "num_cpus", "tres", "req_tres", "std_out", "std_err", "work_dir",
+    )
+
+    # scontrol key -> slot
+    KEYS = {
+        "JobId": "job_id",
+        "ArrayJobId": "array_job_id",
+        "ArrayTaskId": "array_task_id",
+        "JobName": "name",
+        "UserId": "user",
+        "JobState": "state",
+        "Reason": "reason",
+        "Partition": "partition",
+        "SubmitTime": "submit_time",
+        "StartTime": "start_time",
+        "EndTime": "end_time",
+        "TimeLimit": "time_limit",
+        "RunTime": "run_time",
+        "NodeList": "nodes",
+        "NumNodes": "num_nodes",
+        "NumCPUs": "num_cpus",
+        "TRES": "tres",
+        "AllocTRES": "tres",
+        "ReqTRES": "req_tres",
+        "StdOut": "std_out",
+        "StdErr": "std_err",
+        "WorkDir": "work_dir",
+    }
+
+    # Shown in the job window, in this order
+    LABELS = (
+        ("job_id", "Job ID"), ("name", "Name"), ("user", "User"), ("state", "State"),
+        ("reason", "Reason"), ("partition", "Partition"), ("submit_time", "Submitted"),
+        ("start_time", "Started"), ("end_time", "Ends"), ("time_limit", "Time limit"),
+        ("run_time", "Run time"), ("nodes", "Nodes"), ("num_nodes", "Node count"),
+        ("num_cpus", "CPUs"), ("tres", "TRES"), ("req_tres", "Requested TRES"),
+        ("std_out", "StdOut"), ("std_err", "StdErr"), ("work_dir", "Working directory"),
+    )
+
+    def __init__(self) -> None:
+        self.job_id = self.array_job_id = self.array_task_id = self.name = self.user = self.state = \
+            self.reason = self.partition = self.submit_time = self.start_time = self.end_time = \
+            self.time_limit = self.run_time = self.nodes = self.num_nodes = self.num_cpus = \
+            self.tres = self.req_tres = self.std_out = self.std_err = self.work_dir = ""
+
+    def memory_size(self) -> int:
+        """Bytes this record and its values take up."""
+        return sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, slot)) for slot in self.__slots__ if getattr(self, slot))
+
+    def ids(self) -> List[str]:
+        """Return the ids squeue may list this job under (plain id and array task id)."""
+        ids = [self.job_id]
+        if self.array_job_id and self.array_task_id:
+            if self.array_task_id.isdigit():
+                ids.append(f"{self.array_job_id}_{self.array_task_id}")
+            else:
+                ids.append(f"{self.array_job_id}_[{self.array_task_id}]")
+        return ids
+
+    def items(self) -> List[Tuple[str, str]]:
+        """(label, value) for every field that is set, for display."""
+        return [(label, getattr(self, slot)) for slot, label in self.LABELS if getattr(self, slot)]
+
+    def to_extra(self) -> Dict[str, str]:
+        """The set fields, keyed by slot, for the wire record's extra fields."""
+        return {slot: getattr(self, slot) for slot in self.__slots__ if getattr(self, slot)}
+
+    @classmethod
+    def from_extra(cls, extra: Dict[str, str]) -> "JobRecord":
+        record = cls()
+        for slot in cls.__slots__:
+            value = extra.get(slot)
+            if value:
+                setattr(record, slot, value)
+        return record
+
+
+def iter_job_records(lines: Iterable[str]) -> Iterator[JobRecord]:
+    """
+    Parse `scontrol show job` output into job records, one pass over the lines.
+
+    Works for both the multi-line and the one-line (-o) format, and for any
+    number of jobs: a JobId field starts the next record. Words without a
+    key belong to the value before them, so values with spaces (JobName,
+    WorkDir) stay whole.
+    """
+    keys = JobRecord.KEYS
+    record = None
+    slot = None
+    for line in lines:
+        for token in line.split():
+            key, sep, value = token.partition("=")
+            if sep and key[:1].isalpha():
+                slot = keys.get(key)
+                if slot is None:
+                    continue
+                if slot == "job_id":
+                    if record is not None:
+                        yield record
+                    record = JobRecord()
+                elif slot == "user":
+                    # "name(uid)"
+                    value = value.split("(", 1)[0]
+                if record is not None:
+                    setattr(record, slot, value)
+            elif slot is not None and record is not None:
+                setattr(record, slot, getattr(record, slot) + " " + token)
+    if record is not None:
+        yield record
+
+
+def parse_jobs(text: str) -> List[JobRecord]:
+    """All job records in a block of `scontrol show job` output."""
+    return list(iter_job_records(text.splitlines()))
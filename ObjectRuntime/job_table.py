@@ -0,0 +1,110 @@
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import icons
+from .job_record import JobRecord
+from .slurm_job import WPSlurmJob
+
+
+class JobTable:
+    """
+    A partition's jobs as parallel columns: ids, states and (once fetched) job records.
+
+    States are interned, so the thousands of jobs sharing a handful of
+    states share the strings too. Wire records are built straight from
+    the columns; a WPSlurmJob is only created for a job that is asked for.
+    """
+    __slots__ = ("ids", "states", "records", "_rows")
+
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self.states: List[str] = []
+        self.records: List[Optional[JobRecord]] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, job_id: str, state: str) -> None:
+        self._rows[job_id] = len(self.ids)
+        self.ids.append(job_id)
+        self.states.append(sys.intern(state))
+        self.records.append(None)
+
+    def row(self, job_id: str) -> Optional[int]:
+        return self._rows.get(job_id)
+
+    def set_record(self, row: int, record: JobRecord) -> None:
+        self.records[row] = record
+        if record.state:
+            self.states[row] = sys.intern(record.state)
+
+    def memory_size(self, records: bool = True) -> int:
+        """Rough bytes the columns (and, with records, the job records, each once) keep alive."""
+        size = sys.getsizeof(self.ids) + sys.getsizeof(self.states) + sys.getsizeof(self.records) + sys.getsizeof(self._rows)
+        size += sum(sys.getsizeof(job_id) for job_id in self.ids)
+        if not records:
+            return size
+        unique = {id(record): record for record in self.records if record is not None}
+        return size + sum(record.memory_size() for record in unique.values())
+
+    def child_records(self, parent_path: str, offset: int = 0, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Wire records (as WPSlurmJob.to_record(False) would give) for rows offset:end."""
+        icon_id = icons.icon_id_for("WPSlurmJob.png")
+        ids, states, records = self.ids, self.states, self.records
+        result = []
+        for row in range(*slice(offset, end).indices(len(ids))):
+            job_id, state, record = ids[row], states[row], records[row]
+            result.append({
+                "type": "WPSlurmJob",
+                "path": f"{parent_path}/{job_id}",
+                "title": job_id,
+                "icon_id": icon_id,
+                "badge": state,
+                "state": state,
+                "children_count": 0,
+                "extra": record.to_extra() if record is not None else {},
+                "children": [],
+            })
+        return result
+
+
+class JobList:
+    """
+    Read-only sequence over a partition's JobTable that creates the
+    WPSlurmJob for a row when it is accessed, so code that expects a list
+    of child objects still works.
+    """
+    __slots__ = ("partition",)
+
+    def __init__(self, partition: Any) -> None:
+        self.partition = partition
+
+    def __len__(self) -> int:
+        return len(self.partition.jobs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._job(row) for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("job index out of range")
+        return self._job(index)
+
+    def __iter__(self) -> Iterator[WPSlurmJob]:
+        for row in range(len(self)):
+            yield self._job(row)
+
+    def _job(self, row: int) -> WPSlurmJob:
+        partition = self.partition
+        table = partition.jobs
+        job_id = table.ids[row]
+        job = WPSlurmJob(job_id, f"{partition.path}/{job_id}")
+        job.setHost(partition.host)
+        job.setPort(partition.port)
+        job.setSlurmHost(partition.slurm_host)
+        job.state = table.states[row]
+        if table.records[row] is not None:
+            job.record = table.records[row]
+        return job
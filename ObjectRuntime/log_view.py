@@ -0,0 +1,151 @@
+import threading
+from typing import Callable, Optional, Tuple
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QPushButton, QLabel
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QFontDatabase
+
+from .slurm_job import LOG_CHUNK_SIZE
+
+
+# Poll for new output this often while the view is visible
+FOLLOW_INTERVAL_MS = 5000
+
+# fetch(offset, length) -> (offset, file size, data); offset None means the tail
+Fetch = Callable[[Optional[int], Optional[int]], Tuple[int, int, bytes]]
+
+
+def _format_size(size: float) -> str:
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KiB", "MiB", "GiB", "TiB"):
+        size /= 1024.0
+        if size < 1024 or unit == "TiB":
+            break
+    return f"{size:.1f} {unit}"
+
+
+class _Bridge(QObject):
+    # (mode, offset, size, data) or (mode, error)
+    loaded = pyqtSignal(str, int, int, bytes)
+    failed = pyqtSignal(str, str)
+
+
+class LogView(QWidget):
+    """
+    Tail of a job's output file.
+
+    Starts with the last chunk of the file and fetches more only on request:
+    earlier chunks with "Show earlier", new output by polling from the end
+    while the view is visible. Every fetch runs on a background thread and
+    moves one chunk, so large logs are never copied whole.
+    """
+
+    def __init__(self, fetch: Fetch, parent=None) -> None:
+        super().__init__(parent)
+        self._fetch = fetch
+        # Byte range of the file currently shown
+        self.start = 0
+        self.end = 0
+        self.size = 0
+        self._busy = False
+        self._loaded = False
+
+        layout = QVBoxLayout(self)
+        bar = QHBoxLayout()
+        self.status = QLabel("Loading…")
+        self.earlier = QPushButton("Show earlier")
+        self.earlier.setEnabled(False)
+        self.earlier.clicked.connect(self.loadEarlier)
+        bar.addWidget(self.status, 1)
+        bar.addWidget(self.earlier)
+        layout.addLayout(bar)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        layout.addWidget(self.text)
+
+        self._bridge = _Bridge(self)
+        self._bridge.loaded.connect(self._on_loaded)
+        self._bridge.failed.connect(self._on_failed)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.loadNew)
+        self._timer.start(FOLLOW_INTERVAL_MS)
+        self._request("tail", None, None)
+
+    def _request(self, mode: str, offset: Optional[int], length: Optional[int]) -> None:
+        if self._busy:
+            return
+        self._busy = True
+        bridge = self._bridge
+
+        def _run():
+            try:
+                try:
+                    start, size, data = self._fetch(offset, length)
+                except Exception as e:
+                    bridge.failed.emit(mode, str(e))
+                    return
+                bridge.loaded.emit(mode, start, size, data)
+            except RuntimeError:
+                # The view was closed while fetching
+                pass
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def loadEarlier(self) -> None:
+        if self.start > 0:
+            chunk = min(self.start, LOG_CHUNK_SIZE)
+            self._request("earlier", self.start - chunk, chunk)
+
+    def loadNew(self) -> None:
+        if not self.isVisible():
+            return
+        if self._loaded:
+            self._request("new", self.end, None)
+        else:
+            # e.g. a pending job whose output file does not exist yet
+            self._request("tail", None, None)
+
+    def _on_loaded(self, mode: str, start: int, size: int, data: bytes) -> None:
+        self._busy = False
+        text = data.decode("utf-8", errors="replace")
+        if mode == "new" and size < self.end:
+            # The file was truncated or replaced: start over from its tail
+            self._loaded = False
+            self._request("tail", None, None)
+            return
+        if mode == "tail":
+            self.text.setPlainText(text)
+            self.start, self.end = start, start + len(data)
+            self.text.verticalScrollBar().setValue(self.text.verticalScrollBar().maximum())
+            self._loaded = True
+        elif mode == "earlier":
+            cursor = self.text.textCursor()
+            cursor.movePosition(cursor.Start)
+            cursor.insertText(text)
+            self.start = start
+        elif data:
+            scrollbar = self.text.verticalScrollBar()
+            at_bottom = scrollbar.value() == scrollbar.maximum()
+            cursor = self.text.textCursor()
+            cursor.movePosition(cursor.End)
+            cursor.insertText(text)
+            self.end = start + len(data)
+            if at_bottom:
+                scrollbar.setValue(scrollbar.maximum())
+        self.size = size
+        self.earlier.setEnabled(self.start > 0)
+        if self.start > 0:
+            self.status.setText(f"Showing the last {_format_size(self.end - self.start)} of {_format_size(size)}")
+        else:
+            self.status.setText(_format_size(size))
+
+    def _on_failed(self, mode: str, message: str) -> None:
+        self._busy = False
+        if mode == "tail":
+            self.status.setText(message)
+        else:
+            print(f"Failed to load output: {message}")
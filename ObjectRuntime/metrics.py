@@ -0,0 +1,191 @@
+"""
+Counters, latency histograms and per-request timing spans for the server.
+
+Counters and whole-request latencies are always recorded; they cost a lock
+and a few additions. Phase spans (ssh, parse, construct, encode, write, ...)
+are only timed for a sampled fraction of requests, set by sample_rate, and
+for the same fraction of work done outside requests (e.g. background polls).
+The spans of the most recent sampled requests are kept as traces.
+
+snapshot() returns everything as a dict (the Stats action) and
+prometheus_text() renders it in the Prometheus text format.
+"""
+import collections
+import contextlib
+import random
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Fraction of requests whose phases are timed
+sample_rate = 0.1
+
+# Sampled request traces kept for Stats
+MAX_TRACES = 50
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given quantile (inf past the last bucket)."""
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else float("inf")
+        return 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(bound) for bound in BUCKETS] + ["+Inf"], self.counts)),
+        }
+
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = collections.defaultdict(int)
+# (metric, label) -> histogram, e.g. ("request", "GetObject") or ("phase", "ssh")
+_histograms: Dict[Tuple[str, str], Histogram] = {}
+_traces: Deque[Dict[str, Any]] = collections.deque(maxlen=MAX_TRACES)
+_local = threading.local()
+_started = time.time()
+
+
+def count(name: str, amount: int = 1) -> None:
+    with _lock:
+        _counters[name] += amount
+
+
+def observe(metric: str, label: str, seconds: float) -> None:
+    with _lock:
+        histogram = _histograms.get((metric, label))
+        if histogram is None:
+            histogram = _histograms[(metric, label)] = Histogram()
+        histogram.observe(seconds)
+
+
+class _Span:
+    __slots__ = ("name", "trace", "start")
+
+    def __init__(self, name: str, trace: Optional[List[Tuple[str, float]]]) -> None:
+        self.name = name
+        self.trace = trace
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        seconds = time.perf_counter() - self.start
+        observe("phase", self.name, seconds)
+        if self.trace is not None:
+            self.trace.append((self.name, seconds))
+
+
+_NOT_SAMPLED = contextlib.nullcontext()
+
+
+def span(name: str) -> Any:
+    """Context manager timing one phase, if the current request (or this piece of background work) is sampled."""
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        if random.random() >= sample_rate:
+            return _NOT_SAMPLED
+        return _Span(name, None)
+    if trace is False:
+        return _NOT_SAMPLED
+    return _Span(name, trace)
+
+
+@contextlib.contextmanager
+def request(action: str, path: Optional[str] = None):
+    """Time one request handled on this thread, sampling its phases."""
+    sampled = random.random() < sample_rate
+    trace: Any = [] if sampled else False
+    _local.trace = trace
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        _local.trace = None
+        count(f"requests_{action}")
+        if failed:
+            count("request_errors")
+        observe("request", action, seconds)
+        if sampled:
+            with _lock:
+                _traces.append({
+                    "action": action,
+                    "path": path,
+                    "at": time.time(),
+                    "ms": seconds * 1000,
+                    "failed": failed,
+                    "spans": [(name, phase * 1000) for name, phase in trace],
+                })
+
+
+def snapshot() -> Dict[str, Any]:
+    """All metrics as a JSON-friendly dict."""
+    with _lock:
+        histograms: Dict[str, Dict[str, Any]] = {}
+        for (metric, label), histogram in _histograms.items():
+            histograms.setdefault(metric, {})[label] = histogram.to_dict()
+        return {
+            "uptime": time.time() - _started,
+            "sample_rate": sample_rate,
+            "counters": dict(_counters),
+            "histograms": histograms,
+            "traces": list(_traces),
+        }
+
+
+def prometheus_text(prefix: str = "objectruntime") -> str:
+    """Counters and histograms in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, histogram.counts[:], histogram.total, histogram.count) for key, histogram in _histograms.items())
+    lines = [f"{prefix}_uptime_seconds {time.time() - _started:.3f}"]
+    for name, value in counters:
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        lines.append(f"{prefix}_{name}_total {value}")
+    typed = set()
+    for (metric, label), counts, total, number in histograms:
+        name = f"{prefix}_{metric}_seconds"
+        label_name = "action" if metric == "request" else metric
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, bucket in zip([str(bound) for bound in BUCKETS] + ["+Inf"], counts):
+            cumulative += bucket
+            lines.append(f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{label_name}="{label}"}} {total:.6f}')
+        lines.append(f'{name}_count{{{label_name}="{label}"}} {number}')
+    return "\n".join(lines) + "\n"
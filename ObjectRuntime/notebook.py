@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import subprocess
 import platform
-from PyQt5.QtWidgets import QWidget, QTabWidget, QTabBar, QLabel, QPushButton
+from PyQt5.QtWidgets import QWidget, QTabWidget, QTabBar, QLabel, QPushButton, QVBoxLayout
 from PyQt5.QtCore import Qt, QRect
 from PyQt5.QtGui import QPainter, QFont, QColor, QPainterPath, QPixmap, QIcon
 
@@ -127,10 +127,21 @@ class NotebookWidget(QTabWidget):
         
     
         
+        # Tabs given as a callable instead of a widget are built on first activation
+        self.lazy_tabs = {}
+        self.currentChanged.connect(self.load_tab)
+
         # Create tabs
         if tabs:
             for name, widget in tabs:
-                self.addTab(widget, name)
+                if callable(widget):
+                    container = QWidget()
+                    layout = QVBoxLayout(container)
+                    layout.setContentsMargins(0, 0, 0, 0)
+                    self.lazy_tabs[self.addTab(container, name)] = widget
+                else:
+                    self.addTab(widget, name)
+            self.load_tab(self.currentIndex())
         else:
             # Default empty tabs
             for name in ["General", "Documents", "Demos", "Inbox"]:
@@ -139,6 +150,12 @@ class NotebookWidget(QTabWidget):
         # Apply background colors to tab contents
         self.apply_tab_colors()
     
+    def load_tab(self, index):
+        """Build a lazy tab's content the first time it is shown."""
+        factory = self.lazy_tabs.pop(index, None)
+        if factory is not None:
+            self.widget(index).layout().addWidget(factory())
+
     def open_file_manager(self):
         """Open the current path in the system file manager"""
         if not self.details_view or not hasattr(self.details_view, 'current_path'):
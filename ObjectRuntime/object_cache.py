@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from . import metrics
+
+
+class _Entry:
+    value: Any
+    size: int
+    expires: float
+
+    def __init__(self, value: Any, size: int, expires: float) -> None:
+        self.value = value
+        self.size = size
+        self.expires = expires
+
+
+class _Flight:
+    """A load in progress; concurrent callers for the same key wait on it."""
+    done: threading.Event
+    value: Any
+    error: Optional[BaseException]
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ObjectCache:
+    """
+    Key/value cache with a per-entry TTL and LRU eviction bounded by bytes.
+
+    Loads are single-flight: when several threads miss on the same key at
+    once, only the first runs the loader and the others wait for its result.
+    Failed loads are not cached; the error is raised in every waiting caller.
+    """
+    max_bytes: int
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, loader: Callable[[], Tuple[Any, int, float]]) -> Any:
+        """
+        Return the cached value for key, calling loader() on a miss.
+
+        loader returns (value, size_in_bytes, ttl_in_seconds).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    metrics.count("cache_hits")
+                    return entry.value
+                self._remove(key)
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+
+        metrics.count("cache_misses" if leader else "cache_shared_loads")
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value, size, ttl = loader()
+            flight.value = value
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None:
+                    self._store(key, _Entry(flight.value, size, time.monotonic() + ttl))
+            flight.done.set()
+        return value
+
+    def keys(self) -> List[Hashable]:
+        """Keys currently cached, least recently used first."""
+        with self._lock:
+            return list(self._entries)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop key from the cache, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._size = 0
+            elif key in self._entries:
+                self._remove(key)
+
+    def _store(self, key: Hashable, entry: _Entry) -> None:
+        if key in self._entries:
+            self._remove(key)
+        if entry.size > self.max_bytes or entry.expires <= time.monotonic():
+            return
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._size -= entry.size
@@ -0,0 +1,101 @@
+import base64
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QPixmap, QPainter, QColor, QBrush, QFontMetrics
+
+from . import icons
+
+
+# Size requested for window icons; the window manager scales from there
+WINDOW_ICON_SIZE = 64
+
+
+def compose_icon(icon_b64: str, badge: str, size: int, dpr: float = 1.0) -> Optional[QPixmap]:
+    """Scale a base64 PNG to size x size (logical pixels) and paint badge (if any) as a red pill in the corner."""
+    pixmap = QPixmap()
+    if not pixmap.loadFromData(base64.b64decode(icon_b64), "PNG"):
+        return None
+    scaled = pixmap.scaled(round(size * dpr), round(size * dpr), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    scaled.setDevicePixelRatio(dpr)
+    if badge == "":
+        return scaled
+    # Paint badge on a copy of the pixmap
+    composed = QPixmap(scaled)
+    painter = QPainter(composed)
+    try:
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        # Measure text and compute pill rect size
+        font = painter.font()
+        font.setBold(True)
+        painter.setFont(font)
+        metrics = QFontMetrics(font)
+        text_w = metrics.horizontalAdvance(badge)
+        text_h = metrics.height()
+        pad_x = 8
+        pad_y = 4
+        rect_w = text_w + 2 * pad_x
+        rect_h = text_h + 2 * pad_y
+        x = composed.width() / dpr - rect_w - 4
+        y = composed.height() / dpr - rect_h - 4
+        radius = rect_h / 2.0
+        # Draw red rounded rectangle
+        painter.setBrush(QBrush(QColor(220, 0, 0)))
+        painter.setPen(Qt.NoPen)
+        painter.drawRoundedRect(QRectF(x, y, rect_w, rect_h), radius, radius)
+        # Draw white text centered
+        painter.setPen(QColor(255, 255, 255))
+        painter.drawText(QRectF(x, y, rect_w, rect_h), Qt.AlignCenter, badge)
+    finally:
+        painter.end()
+    return composed
+
+
+class PixmapCache:
+    """
+    LRU cache of composed icon pixmaps keyed by (icon id, size, badge, DPI).
+
+    Cells mostly share one icon and a handful of badges, so decoding,
+    scaling and badge painting happen once per distinct combination rather
+    than once per cell. Icons that fail to load are cached as None so they
+    are not retried on every paint. Icons this process does not have yet
+    are never fetched here: the fallback icon stands in for them (uncached
+    under their key) until whoever loaded the object has prefetched them
+    off the GUI thread. Only use from the GUI thread.
+    """
+    max_entries: int
+
+    def __init__(self, max_entries: int = 512) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Optional[QPixmap]]" = OrderedDict()
+
+    def get(self, icon_id: str, size: int, badge: str = "", dpr: float = 1.0) -> Optional[QPixmap]:
+        key = (icon_id, size, badge, dpr)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        icon = icons.find_icon(icon_id)
+        if icon is None:
+            fallback = icons.icon_id_for(icons.FALLBACK_ICON)
+            return None if icon_id == fallback else self.get(fallback, size, badge, dpr)
+        try:
+            pixmap = compose_icon(icon, badge, size, dpr)
+        except Exception as e:
+            print(f"Failed to load icon {icon_id}: {e}")
+            pixmap = None
+        self._entries[key] = pixmap
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return pixmap
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+pixmap_cache = PixmapCache()
+
+
+def get_pixmap(icon_id: str, size: int, badge: str = "", dpr: float = 1.0) -> Optional[QPixmap]:
+    """Composed pixmap for icon_id from the shared cache."""
+    return pixmap_cache.get(icon_id, size, badge, dpr)
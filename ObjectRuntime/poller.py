@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from .job_record import JobRecord, iter_job_records
+from .object_cache import ObjectCache
+from .slurm_collector import SlurmSnapshot, get_collector
+from .slurm_connection import get_connection
+
+
+class ClusterState:
+    """
+    Everything one poll learned about a cluster: the partition/job snapshot
+    and the records of all jobs, keyed by every id squeue may list them under.
+
+    Never modified once built; objects built from it are memoized in its
+    own cache, which is dropped together with the state. records may also
+    be a function returning them, called the first time they are needed.
+    """
+    snapshot: SlurmSnapshot
+    taken_at: float
+    cache: ObjectCache
+
+    def __init__(self, snapshot: SlurmSnapshot, records: Union[Dict[str, JobRecord], Callable[[], Dict[str, JobRecord]]], cache_size: int) -> None:
+        self.snapshot = snapshot
+        self._records = records
+        self._lock = threading.Lock()
+        self.taken_at = time.time()
+        self.cache = ObjectCache(cache_size)
+
+    @property
+    def records(self) -> Dict[str, JobRecord]:
+        if callable(self._records):
+            with self._lock:
+                if callable(self._records):
+                    self._records = self._records()
+        return self._records
+
+    def age(self) -> float:
+        return time.time() - self.taken_at
+
+
+def fetch_records(slurm_host: str) -> Dict[str, JobRecord]:
+    """All jobs' records from one `scontrol -o show job` call, keyed by each of their ids."""
+    records: Dict[str, JobRecord] = {}
+    for record in iter_job_records(get_connection(slurm_host).iter_lines(["scontrol", "-o", "show", "job"])):
+        for job_id in record.ids():
+            records[job_id] = record
+    return records
+
+
+def poll_cluster(slurm_host: str, cache_size: int) -> ClusterState:
+    """Fetch a new ClusterState: one sinfo+squeue and one scontrol call."""
+    snapshot = get_collector(slurm_host).refresh()
+    return ClusterState(snapshot, fetch_records(slurm_host), cache_size)
+
+
+# load(path, state) -> cache loader result ((object, payload), size, ttl)
+Loader = Callable[[str, ClusterState], Tuple[Any, int, float]]
+
+
+class SnapshotPoller:
+    """
+    Polls one cluster in the background and keeps cluster.state current.
+
+    Polls run every interval seconds, randomly stretched or shortened by up
+    to jitter (a fraction of interval) so several clusters or servers do not
+    hit their schedulers in lockstep. Objects that were served from the old
+    state are rebuilt from the new one before it is swapped in, so requests
+    keep being answered from memory. A failed poll leaves the old state in
+    place; it just gets older.
+    """
+    interval: float
+    jitter: float
+
+    def __init__(self, cluster: Any, interval: float, load: Loader, jitter: float = 0.2) -> None:
+        self.cluster = cluster
+        self.interval = interval
+        self.jitter = jitter
+        self.load = load
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> ClusterState:
+        """Poll now and swap in the new state; concurrent calls share one poll."""
+        previous = self.cluster.state
+        with self._lock:
+            if self.cluster.state is not previous:
+                # Someone else polled while we waited
+                return self.cluster.state
+            state = poll_cluster(self.cluster.slurm_host, self.cluster.cache.max_bytes)
+            if previous is not None:
+                for path in previous.cache.keys():
+                    try:
+                        state.cache.get(path, lambda path=path: self.load(path, state))
+                    except Exception as exc:
+                        print(f"Failed to rebuild {path}: {exc}")
+            self.cluster.state = state
+            return state
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"objectruntime-poll-{self.cluster.name}", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.poll()
+            except Exception as exc:
+                print(f"Polling {self.cluster.name} failed: {exc}")
+            time.sleep(self.interval * (1.0 + random.uniform(-self.jitter, self.jitter)))
@@ -0,0 +1,158 @@
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .object_cache import ObjectCache
+from .poller import ClusterState, SnapshotPoller
+from .router import PathRouter
+from .slurm_collector import get_collector
+from .slurm_batch_system import WPSlurmBatchSystem
+from .slurm_partition import WPSlurmPartition
+from .slurm_job import WPSlurmJob
+from .slurm_connection import set_pool_size
+from .wp_object import WPObject
+
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(__file__), "clusters.json")
+
+# Routes for configs that do not list their own
+DEFAULT_ROUTES = [
+    {"pattern": "/Slurm/{cluster}", "provider": "batch_system"},
+    {"pattern": "/Slurm/{cluster}/{partition}", "provider": "partition"},
+    {"pattern": "/Slurm/{cluster}/{partition}/{job}", "provider": "job"},
+]
+
+# Job ids as Slurm prints them: plain, array task (123_4) or pending array (123_[4-9%2])
+JOB_ID = re.compile(r"^\d+(_\d+|_\[[\d,\-%]+\])?$")
+
+
+class Cluster:
+    """
+    One configured Slurm cluster: its login node and its own object cache.
+
+    When polled in the background (snapshot_interval > 0), state holds the
+    latest ClusterState and objects are served from it instead of the cache.
+    """
+    name: str
+    title: str
+    slurm_host: str
+    cache: ObjectCache
+    snapshot_interval: float
+    state: Optional[ClusterState]
+    poller: Optional[SnapshotPoller]
+
+    def __init__(self, name: str, slurm_host: str, title: Optional[str] = None, cache_size: int = 64 * 1024 * 1024) -> None:
+        self.name = name
+        self.slurm_host = slurm_host
+        self.title = title or f"{name} Batch System"
+        self.cache = ObjectCache(cache_size)
+        self.snapshot_interval = 0.0
+        self.state = None
+        self.poller = None
+
+
+# provider(cluster, path parameters, path, state) -> object; with a state
+# (see poller) the object is built from it instead of querying Slurm
+Provider = Callable[[Cluster, Dict[str, str], str, Optional[ClusterState]], WPObject]
+
+providers: Dict[str, Provider] = {}
+
+
+def provider(name: str) -> Callable[[Provider], Provider]:
+    """Register a function building the object for a route, under the name routes refer to."""
+    def register(func: Provider) -> Provider:
+        providers[name] = func
+        return func
+    return register
+
+
+@provider("batch_system")
+def provide_batch_system(cluster: Cluster, params: Dict[str, str], path: str, state: Optional[ClusterState]) -> WPObject:
+    obj = WPSlurmBatchSystem(cluster.title, path, cluster.slurm_host)
+    obj.getPartitions(state.snapshot if state is not None else None)
+    return obj
+
+
+@provider("partition")
+def provide_partition(cluster: Cluster, params: Dict[str, str], path: str, state: Optional[ClusterState]) -> WPObject:
+    snapshot = state.snapshot if state is not None else get_collector(cluster.slurm_host).snapshot()
+    if params["partition"] not in snapshot.partitions:
+        raise KeyError(f"Unknown object path: {path}")
+    obj = WPSlurmPartition(params["partition"], path, cluster.slurm_host)
+    obj.getJobs(snapshot)
+    obj.getJobDetails(state.records if state is not None else None)
+    return obj
+
+
+@provider("job")
+def provide_job(cluster: Cluster, params: Dict[str, str], path: str, state: Optional[ClusterState]) -> WPObject:
+    # The id ends up on the Slurm host's command line
+    if not JOB_ID.fullmatch(params["job"]):
+        raise KeyError(f"Unknown object path: {path}")
+    obj = WPSlurmJob(params["job"], path)
+    obj.setSlurmHost(cluster.slurm_host)
+    if state is not None:
+        record = state.records.get(params["job"])
+        if record is not None:
+            obj.record = record
+            obj.state = record.state or obj.state
+    else:
+        obj.getDetails()
+    # Only the partition(s) the job is queued in list it; also catches jobs Slurm does not know
+    if params["partition"] not in obj.record.partition.split(","):
+        raise KeyError(f"Unknown object path: {path}")
+    return obj
+
+
+def load_config(path: str = DEFAULT_CONFIG) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Registry:
+    """
+    The clusters one server serves, and the router from object paths to providers.
+
+    A config is a dict like
+
+        {"clusters": [{"name": "Quartz", "slurm_host": "quartz.uits.iu.edu",
+                       "title": "Quartz Batch System", "ssh_pool_size": 4,
+                       "cache_size_mb": 64, "snapshot_interval": 30}],
+         "routes": [{"pattern": "/Slurm/{cluster}/{partition}", "provider": "partition"}]}
+
+    Routes name their cluster with a {cluster} path parameter, or with a
+    "cluster" key to serve one cluster under a fixed prefix. Without
+    "routes", DEFAULT_ROUTES are used.
+    """
+    clusters: Dict[str, Cluster]
+
+    def __init__(self, config: Dict[str, Any], cache_size: int = 64 * 1024 * 1024) -> None:
+        self.clusters = {}
+        for entry in config.get("clusters", []):
+            size = int(entry.get("cache_size_mb", 0)) * 1024 * 1024 or cache_size
+            cluster = Cluster(entry["name"], entry["slurm_host"], entry.get("title"), size)
+            cluster.snapshot_interval = float(entry.get("snapshot_interval", 0.0))
+            if "ssh_pool_size" in entry:
+                set_pool_size(int(entry["ssh_pool_size"]), cluster.slurm_host)
+            self.clusters[cluster.name] = cluster
+        self.router = PathRouter()
+        for route in config.get("routes", DEFAULT_ROUTES):
+            func = providers.get(route["provider"])
+            if func is None:
+                raise ValueError(f"Unknown provider: {route['provider']}")
+            if route.get("cluster") is not None and route["cluster"] not in self.clusters:
+                raise ValueError(f"Route {route['pattern']} refers to unknown cluster {route['cluster']}")
+            self.router.add(route["pattern"], (func, route.get("cluster")))
+
+    def route(self, path: str) -> Tuple[Cluster, Provider, Dict[str, str]]:
+        """Return the cluster, provider and path parameters for path; KeyError if nothing serves it."""
+        (func, cluster_name), params = self.router.match(path)
+        cluster = self.clusters.get(cluster_name or params.get("cluster"))
+        if cluster is None:
+            raise KeyError(f"Unknown object path: {path}")
+        return cluster, func, params
+
+    def resolve(self, path: str, state: Optional[ClusterState] = None) -> WPObject:
+        cluster, func, params = self.route(path)
+        return func(cluster, params, path, state)
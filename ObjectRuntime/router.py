@@ -0,0 +1,70 @@
+from typing import Any, Dict, Optional, Tuple
+
+
+class _Node:
+    __slots__ = ("literals", "param", "param_node", "handler")
+
+    def __init__(self) -> None:
+        self.literals: Dict[str, "_Node"] = {}
+        self.param: Optional[str] = None
+        self.param_node: Optional["_Node"] = None
+        self.handler: Any = None
+
+
+class PathRouter:
+    """
+    Maps slash-separated path patterns to handlers.
+
+    Patterns are stored in a trie of path segments, so a lookup costs one
+    step per segment however many patterns there are. A segment in braces,
+    e.g. "{partition}", matches any single segment and is returned as a
+    parameter; literal segments win over parameters.
+    """
+
+    def __init__(self) -> None:
+        self._root = _Node()
+
+    @staticmethod
+    def _segments(path: str) -> list:
+        return [segment for segment in path.split("/") if segment]
+
+    def add(self, pattern: str, handler: Any) -> None:
+        node = self._root
+        for segment in self._segments(pattern):
+            if segment.startswith("{") and segment.endswith("}"):
+                name = segment[1:-1]
+                if node.param_node is None:
+                    node.param = name
+                    node.param_node = _Node()
+                elif node.param != name:
+                    raise ValueError(f"Conflicting parameter names {{{node.param}}} and {segment} in {pattern}")
+                node = node.param_node
+            else:
+                node = node.literals.setdefault(segment, _Node())
+        if node.handler is not None:
+            raise ValueError(f"Duplicate route: {pattern}")
+        node.handler = handler
+
+    def match(self, path: str) -> Tuple[Any, Dict[str, str]]:
+        """Return (handler, parameters) for path; KeyError if no pattern matches."""
+        params: Dict[str, str] = {}
+        handler = self._match(self._root, self._segments(path), 0, params)
+        if handler is None:
+            raise KeyError(f"Unknown object path: {path}")
+        return handler, params
+
+    def _match(self, node: _Node, segments: list, index: int, params: Dict[str, str]) -> Any:
+        if index == len(segments):
+            return node.handler
+        segment = segments[index]
+        child = node.literals.get(segment)
+        if child is not None:
+            handler = self._match(child, segments, index + 1, params)
+            if handler is not None:
+                return handler
+        if node.param_node is not None:
+            handler = self._match(node.param_node, segments, index + 1, params)
+            if handler is not None:
+                params[node.param] = segment
+                return handler
+        return None
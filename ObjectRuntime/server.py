@@ -1,109 +1,553 @@
 import argparse
-import socket
-import struct
+import asyncio
+import fnmatch
+import hashlib
 import threading
 import json
-from typing import Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 try:
     import dill as pickle  # more flexible than pickle for arbitrary objects
 except Exception:  # pragma: no cover - fallback
     import pickle  # type: ignore
 
-from .slurm_batch_system import WPSlurmBatchSystem
-from .slurm_partition import WPSlurmPartition
-from .slurm_job import WPSlurmJob
+from .slurm_job import LOG_CHUNK_SIZE, MAX_LOG_CHUNK_SIZE
+from .slurm_connection import set_pool_size
+from .providers import Registry, load_config, DEFAULT_CONFIG
+from .poller import ClusterState, SnapshotPoller, fetch_records
+from .slurm_collector import get_collector
+from .subscriptions import SubscriptionHub
+from .wp_object import WPObject
+from . import compression
+from . import framing
+from . import metrics
+from . import icons
+from . import wire
 
 
-def recv_all(connection: socket.socket, num_bytes: int) -> bytes:
-    data = bytearray()
-    while len(data) < num_bytes:
-        chunk = connection.recv(num_bytes - len(data))
-        if not chunk:
-            raise ConnectionError("Connection closed while receiving data")
-        data.extend(chunk)
-    return bytes(data)
+# Called from a worker thread to send one reply frame to the requesting client
+Send = Callable[[bytes], None]
 
 
-def read_message(connection: socket.socket) -> bytes:
-    header = recv_all(connection, 4)
-    (length,) = struct.unpack("!I", header)
-    if length > 128 * 1024 * 1024:
-        raise ValueError("Message too large")
-    return recv_all(connection, length)
+# Seconds a resolved object may be served from the cache, by type
+CACHE_TTLS = {
+    "WPSlurmBatchSystem": 30.0,
+    "WPSlurmPartition": 2.0,
+    "WPSlurmJob": 5.0,
+}
 
+# Children per frame for streamed GetObject replies
+STREAM_CHUNK_SIZE = 500
 
-def write_message(connection: socket.socket, payload: bytes) -> None:
-    connection.sendall(struct.pack("!I", len(payload)) + payload)
+# Largest file chunk a TailFile request may ask for
+MAX_TAIL_LENGTH = MAX_LOG_CHUNK_SIZE
 
+# Most objects one GetObjects request may return, after expanding globs
+MAX_BATCH_OBJECTS = 5000
 
-def handle_client(connection: socket.socket, address: Tuple[str, int]) -> None:
-    try:
-        raw = read_message(connection)
+# Clusters served and how paths map to objects; replaced in main() from --config
+registry = Registry(load_config())
+
+
+def resolve_object(object_path: str, state: Optional[ClusterState] = None) -> WPObject:
+    return registry.resolve(object_path, state)
+
+
+def encode_error(message: str, fmt: str) -> bytes:
+    if fmt == "wire":
+        return wire.encode_error(message)
+    return pickle.dumps({"error": message})
+
+
+def load_object(object_path: str, state: Optional[ClusterState] = None) -> Tuple[Tuple[WPObject, bytes], int, float]:
+    """
+    Cache loader: resolve the object at object_path and pre-encode its full wire reply.
+
+    The entry is charged for the object graph it keeps alive as well as the
+    encoded reply. Objects built from a polled state live as long as the
+    state does; the job records they share (a job is in each of its
+    partitions, and has its own object) belong to the state and are not
+    charged to any entry.
+    """
+    with metrics.span("construct"):
+        obj = resolve_object(object_path, state)
+    obj.as_of = state.taken_at if state is not None else time.time()
+    with metrics.span("encode"):
+        # The etag covers the content only, so an object rebuilt from
+        # unchanged Slurm data keeps it even though as_of moves on
+        payload = wire.encode_object(obj.to_record())
+        obj.etag = hashlib.blake2b(payload, digest_size=12).hexdigest()
+        # Last change: from here on the payload is shared by every send of the cached entry
+        wire.append_meta(payload, obj.wire_meta())
+    ttl = float("inf") if state is not None else CACHE_TTLS.get(type(obj).__name__, 0.0)
+    return (obj, payload), len(payload) + obj.memory_size(records=state is None), ttl
+
+
+def cached_object(object_path: str) -> Tuple[WPObject, bytes]:
+    """
+    The object at object_path and its full wire reply: from the cluster's
+    polled state when it has one, from its cache otherwise.
+    """
+    cluster, _, _ = registry.route(object_path)
+    state = cluster.state
+    if state is not None:
+        return state.cache.get(object_path, lambda: load_object(object_path, state))
+    return cluster.cache.get(object_path, lambda: load_object(object_path))
+
+
+def refresh_cluster(object_path: str) -> None:
+    """Query Slurm again for the cluster serving object_path instead of waiting for the next poll or expiry."""
+    cluster, _, _ = registry.route(object_path)
+    if cluster.poller is not None:
+        cluster.poller.poll()
+    else:
+        get_collector(cluster.slurm_host).refresh()
+        cluster.cache.invalidate()
+
+
+def get_object(object_path: str) -> WPObject:
+    obj, _ = cached_object(object_path)
+    return obj
+
+
+def expand_paths(patterns: List[str], lookup: Callable[[str], WPObject] = get_object) -> List[str]:
+    """
+    Expand glob segments ("*", "?", "[...]") against the children of the
+    object above them, e.g. /Slurm/Quartz/* to every partition path, and
+    drop duplicates while keeping the order of first appearance.
+    """
+    paths: Dict[str, None] = {}
+    for pattern in patterns:
+        prefixes = [""]
+        for segment in [segment for segment in pattern.split("/") if segment]:
+            if not any(char in segment for char in "*?["):
+                prefixes = [f"{prefix}/{segment}" for prefix in prefixes]
+                continue
+            matches = []
+            for prefix in prefixes:
+                for record in lookup(prefix).child_records():
+                    if fnmatch.fnmatchcase(record["path"].rsplit("/", 1)[-1], segment):
+                        matches.append(record["path"])
+            prefixes = matches
+        paths.update(dict.fromkeys(prefixes))
+        if len(paths) > MAX_BATCH_OBJECTS:
+            raise ValueError(f"More than {MAX_BATCH_OBJECTS} objects requested")
+    return list(paths)
+
+
+class ObjectBatch:
+    """
+    Looks up the objects of one GetObjects request.
+
+    Objects of a cluster answered per request that are not cached are built
+    from a state shared by the whole batch: the cluster snapshot and, once
+    some object needs them, all job records from a single scontrol call,
+    instead of one set of Slurm calls per object.
+    """
+
+    def __init__(self) -> None:
+        self._states: Dict[str, ClusterState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, cluster) -> ClusterState:
+        with self._lock:
+            state = self._states.get(cluster.name)
+            if state is None:
+                slurm_host = cluster.slurm_host
+                snapshot = get_collector(slurm_host).snapshot()
+                state = ClusterState(snapshot, lambda: fetch_records(slurm_host), 0)
+                self._states[cluster.name] = state
+            return state
+
+    def get(self, object_path: str) -> Tuple[WPObject, bytes]:
+        cluster, _, _ = registry.route(object_path)
+        if cluster.state is not None:
+            return cached_object(object_path)
+
+        def load() -> Tuple[Tuple[WPObject, bytes], int, float]:
+            (obj, payload), size, _ = load_object(object_path, self._state(cluster))
+            return (obj, payload), size, CACHE_TTLS.get(type(obj).__name__, 0.0)
+
+        return cluster.cache.get(object_path, load)
+
+
+subscription_hub = SubscriptionHub(get_object)
+
+
+def not_modified(obj: WPObject, fmt: str) -> bytes:
+    """The reply telling a client that its copy of obj (same etag) is current."""
+    metrics.count("not_modified")
+    if fmt == "wire":
+        return wire.encode_not_modified(obj.wire_meta())
+    return pickle.dumps({"not_modified": True, "etag": obj.etag, "as_of": obj.as_of})
+
+
+def send_object(send: Send, message: dict, fmt: str) -> None:
+    object_path = message.get("path")
+    obj, payload = cached_object(object_path)
+    if obj.etag is not None and message.get("if_none_match") == obj.etag:
+        send(not_modified(obj, fmt))
+        return
+    offset = int(message.get("offset", 0))
+    limit = message.get("limit")
+    if limit is not None:
+        limit = int(limit)
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValueError("offset and limit must not be negative")
+    if message.get("stream"):
+        if fmt != "wire":
+            raise ValueError("Streaming requires the wire format")
+        # Header first so the client can show the object, then the children in chunks
+        chunk_size = int(message.get("chunk_size", STREAM_CHUNK_SIZE))
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        end = None if limit is None else offset + limit
+        records = obj.child_records(offset, end)
+        send(wire.encode_object(obj.to_record(False), obj.wire_meta()))
+        for start in range(0, len(records), chunk_size):
+            send(wire.encode_children(records[start:start + chunk_size]))
+        send(wire.encode_end())
+    elif fmt == "wire":
+        if offset == 0 and limit is None:
+            send(payload)
+        else:
+            send(obj.to_wire(offset, limit))
+    else:
+        if offset != 0 or limit is not None:
+            raise ValueError("offset and limit require the wire format")
+        with metrics.span("encode"):
+            payload = pickle.dumps(obj)
+        send(payload)
+
+
+def send_objects(send: Send, message: dict, fmt: str) -> None:
+    """
+    Send every object in "paths" (paths or globs) in one reply; a failed
+    path gets an error entry, and a path whose etag in "if_none_match"
+    (path -> etag) is still current a not-modified entry.
+    """
+    paths = message.get("paths")
+    if not isinstance(paths, list):
+        raise ValueError("GetObjects needs a list of paths")
+    etags = message.get("if_none_match")
+    if not isinstance(etags, dict):
+        etags = {}
+    batch = ObjectBatch()
+    results: List[Tuple[str, Any]] = []
+    for path in expand_paths([str(path) for path in paths], lambda prefix: batch.get(prefix)[0]):
         try:
-            message = json.loads(raw.decode("utf-8"))
-        except Exception:
-            raise ValueError("Invalid JSON request")
+            results.append((path, batch.get(path)))
+        except Exception as exc:
+            results.append((path, exc))
+    entries = []
+    for path, result in results:
+        if isinstance(result, Exception):
+            entries.append((path, wire.encode_error(str(result)) if fmt == "wire" else {"error": str(result)}))
+        elif result[0].etag is not None and etags.get(path) == result[0].etag:
+            entries.append((path, wire.encode_not_modified(result[0].wire_meta()) if fmt == "wire"
+                            else {"not_modified": True, "etag": result[0].etag, "as_of": result[0].as_of}))
+            metrics.count("not_modified")
+        else:
+            entries.append((path, result[1] if fmt == "wire" else result[0]))
+    if fmt == "wire":
+        send(wire.encode_objects(entries))
+    else:
+        send(pickle.dumps(dict(entries)))
+
+
+def send_file_chunk(send: Send, message: dict, fmt: str) -> None:
+    """Send part of a job's StdOut/StdErr: from "offset", or its tail when no offset is given."""
+    obj = get_object(message.get("path"))
+    if not hasattr(obj, "readLog"):
+        raise ValueError(f"No output files for {message.get('path')}")
+    offset = message.get("offset")
+    if offset is not None:
+        offset = int(offset)
+        if offset < 0:
+            raise ValueError("offset must not be negative")
+    length = int(message.get("length", LOG_CHUNK_SIZE))
+    if length < 1:
+        raise ValueError("length must be at least 1")
+    start, size, data = obj.readLog(message.get("stream", "StdOut"), offset, min(length, MAX_TAIL_LENGTH))
+    if fmt == "wire":
+        send(wire.encode_file_chunk(start, size, data))
+    else:
+        send(pickle.dumps({"offset": start, "size": size, "data": data}))
 
-        action = message.get("action")
-        
-        if action != "GetObject":
-            raise ValueError("Unsupported action")
 
+def handle_request(message: dict, fmt: str, send: Send) -> None:
+    """Run one request; blocking, so it is called on the worker pool."""
+    action = message.get("action")
+    
+    if action not in ("GetObject", "GetObjects", "GetIcon", "TailFile", "Refresh", "Stats"):
+        raise ValueError("Unsupported action")
+
+    with metrics.request(action, message.get("path")):
         if action == "GetObject":
             object_path = message.get("path")
             print(f"Received message: {action} {object_path}")
-            if object_path == "/Slurm/Quartz":
-                obj = WPSlurmBatchSystem("Quartz Batch System", "/Slurm/Quartz", "quartz.uits.iu.edu")
-                obj.getPartitions()
-            elif object_path.startswith("/Slurm/Quartz/"):
-                # check if path is a partion or a job
-                # if path has three slashes, it is a partition, otherwise it is a job
-                if object_path.count("/") == 3:
-                    partition_name = object_path.rsplit("/", 1)[-1]
-                    obj = WPSlurmPartition(partition_name, object_path, "quartz.uits.iu.edu")
-                    obj.getJobs()
-                else:
-                    obj = WPSlurmJob(object_path.rsplit("/", 1)[-1], object_path)
-                    obj.setSlurmHost("quartz.uits.iu.edu")
-                    obj.getDetails()
+            send_object(send, message, fmt)
+        elif action == "GetObjects":
+            print(f"Received message: {action} {len(message.get('paths') or [])} paths")
+            send_objects(send, message, fmt)
+        elif action == "GetIcon":
+            icon_id = message.get("icon_id")
+            icon = icons.get_icon(icon_id)
+            if fmt == "wire":
+                send(wire.encode_icon(icon_id, icon))
             else:
-                raise KeyError(f"Unknown object path: {object_path}")
-            payload = pickle.dumps(obj)
-            write_message(connection, payload)
-    except Exception as exc:
-        # send a structured error back to the client
+                send(pickle.dumps({"id": icon_id, "icon": icon}))
+        elif action == "TailFile":
+            print(f"Received message: {action} {message.get('path')} {message.get('stream')}")
+            send_file_chunk(send, message, fmt)
+        elif action == "Refresh":
+            print(f"Received message: {action} {message.get('path')}")
+            refresh_cluster(message.get("path"))
+            send_object(send, message, fmt)
+            # Windows watching the cluster see the result now instead of at the
+            # next subscription poll, including the new as_of if nothing changed
+            cluster, _, _ = registry.route(message.get("path"))
+            subscription_hub.poll(lambda path: registry.route(path)[0] is cluster, as_of_interval=0.0)
+        elif action == "Stats":
+            stats = metrics.snapshot()
+            if fmt == "wire":
+                send(wire.encode_json(json.dumps(stats)))
+            else:
+                send(pickle.dumps(stats))
+
+
+class ClientConnection:
+    """
+    One keep-alive client connection.
+
+    Clients may send any number of framed requests on the same connection.
+    Requests carrying a numeric "id" are run concurrently and every reply
+    frame for them is tagged with that id, so they can be pipelined; requests
+    without one are answered in order with plain frames, as before.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, executor: ThreadPoolExecutor) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.executor = executor
+        self.loop = asyncio.get_running_loop()
+        self._write_lock = asyncio.Lock()
+        # Subscribe request id -> subscription hub token
+        self.subscriptions: Dict[int, int] = {}
+        # Reply compression codec, once a request has offered one we support
+        self.codec: Optional[str] = None
+
+    def frame(self, payload: bytes, request_id: Optional[int]) -> List[bytes]:
+        """
+        The frame for payload as a list of byte strings, compressed if the
+        connection negotiated a codec and it pays off. Large payloads are
+        compressed by whichever thread produced them, not the event loop.
+        """
+        return framing.frame_parts(payload, request_id, self.codec)
+
+    async def write(self, frame: List[bytes]) -> None:
+        async with self._write_lock:
+            self.writer.writelines(frame)
+            await self.writer.drain()
+
+    async def send(self, payload: bytes, request_id: Optional[int]) -> None:
+        await self.write(self.frame(payload, request_id))
+
+    async def read_message(self) -> bytes:
+        header = await self.reader.readexactly(framing.HEADER.size)
+        (length,) = framing.HEADER.unpack(header)
+        if length > framing.MAX_MESSAGE_SIZE:
+            raise ValueError("Message too large")
+        return await self.reader.readexactly(length)
+
+    async def subscribe(self, message: dict, fmt: str, request_id: Optional[int]) -> None:
+        """
+        Reply with the object, then push a KIND_DELTA, tagged with this
+        request's id, whenever the shared poll sees it change.
+
+        The reply is just the object's header when the client's
+        "if_none_match" is its current etag, and the whole object otherwise,
+        so deltas always apply to what the client has.
+        """
+        if fmt != "wire" or request_id is None:
+            raise ValueError("Subscribe requires the wire format and a request id")
+        object_path = message.get("path")
+        print(f"Received message: Subscribe {object_path}")
+        metrics.count("requests_Subscribe")
+        obj, payload = await self.loop.run_in_executor(self.executor, cached_object, object_path)
+        if obj.etag is not None and message.get("if_none_match") == obj.etag:
+            payload = wire.encode_object(obj.to_record(False), obj.wire_meta())
+        await self.send(payload, request_id)
+
+        # The write of the last delta pushed; at most one is in flight per subscription
+        pending: List[Any] = [None]
+
+        def push(payload: bytes) -> bool:
+            # Called from the poll thread; never wait on a slow client there.
+            # While the previous delta is still being written the client is
+            # not sent another; the hub includes its changes in the next one.
+            previous = pending[0]
+            if previous is not None and not previous.done():
+                metrics.count("subscription_deltas_deferred")
+                return False
+            future = asyncio.run_coroutine_threadsafe(self.write(self.frame(payload, request_id)), self.loop)
+            future.add_done_callback(_written)
+            pending[0] = future
+            return True
+
+        def _written(future) -> None:
+            # Collect the error of a write to a closed connection; serve() cleans up
+            if not future.cancelled():
+                future.exception()
+
+        self.subscriptions[request_id] = subscription_hub.subscribe(obj, push)
+
+    async def unsubscribe(self, message: dict, request_id: Optional[int]) -> None:
+        subscription = message.get("subscription")
+        token = self.subscriptions.pop(subscription, None)
+        if token is None:
+            raise ValueError(f"Unknown subscription: {subscription}")
+        subscription_hub.unsubscribe(token)
+        # Close the subscription's stream, then acknowledge the request
+        await self.send(wire.encode_end(), subscription)
+        await self.send(wire.encode_end(), request_id)
+
+    async def run_request(self, message: dict, request_id: Optional[int]) -> None:
+        # Clients ask for the compact wire format with "format": "wire"; dill pickles stay the default
+        fmt = "pickle"
         try:
-            error_payload = pickle.dumps({"error": str(exc)})
-            write_message(connection, error_payload)
-        except Exception:
-            pass
-    finally:
+            fmt = message.get("format", "pickle")
+            if fmt not in ("pickle", "wire"):
+                fmt = "pickle"
+                raise ValueError(f"Unsupported format: {message.get('format')}")
+            if "compress" in message:
+                self.codec = compression.choose(message["compress"])
+
+            action = message.get("action")
+            if action == "Subscribe":
+                await self.subscribe(message, fmt, request_id)
+                return
+            if action == "Unsubscribe":
+                await self.unsubscribe(message, request_id)
+                return
+
+            def send(payload: bytes) -> None:
+                # Block the worker until the frame is written, which also applies backpressure
+                frame = self.frame(payload, request_id)
+                with metrics.span("write"):
+                    asyncio.run_coroutine_threadsafe(self.write(frame), self.loop).result()
+                metrics.count("bytes_sent", sum(len(part) for part in frame))
+
+            await self.loop.run_in_executor(self.executor, handle_request, message, fmt, send)
+        except Exception as exc:
+            # send a structured error back to the client
+            try:
+                await self.send(encode_error(str(exc), fmt), request_id)
+            except Exception:
+                pass
+
+    async def serve(self) -> None:
+        tasks = set()
         try:
-            connection.shutdown(socket.SHUT_RDWR)
-        except Exception:
+            while True:
+                try:
+                    raw = await self.read_message()
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                try:
+                    message = json.loads(raw.decode("utf-8"))
+                    if not isinstance(message, dict):
+                        raise ValueError
+                except Exception:
+                    await self.send(encode_error("Invalid JSON request", "pickle"), None)
+                    continue
+                request_id = message.get("id")
+                if isinstance(request_id, int):
+                    task = asyncio.ensure_future(self.run_request(message, request_id & 0xFFFFFFFF))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    await self.run_request(message, None)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except Exception as exc:
+            print(f"Connection error: {exc}")
+        finally:
+            for token in self.subscriptions.values():
+                subscription_hub.unsubscribe(token)
+            self.subscriptions.clear()
+            self.writer.close()
+
+
+async def serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Answer any HTTP request with the metrics in Prometheus text format."""
+    try:
+        while (await reader.readline()).strip():
             pass
-        connection.close()
+        body = metrics.prometheus_text().encode("utf-8")
+        writer.write(
+            b"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+        )
+        await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_async(port: int, host: str, backlog: int, workers: int, metrics_port: Optional[int] = None) -> None:
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="objectruntime")
+
+    async def on_connect(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await ClientConnection(reader, writer, executor).serve()
+
+    if metrics_port:
+        await asyncio.start_server(serve_metrics, host, metrics_port, reuse_address=True)
+        print(f"Metrics on http://{host}:{metrics_port}/metrics")
+    server = await asyncio.start_server(on_connect, host, port, backlog=backlog, reuse_address=True)
+    print(f"ObjectRuntime listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
 
 
-def serve(port: int, host: str = "0.0.0.0") -> None:
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_sock:
-        server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_sock.bind((host, port))
-        server_sock.listen(5)
-        print(f"ObjectRuntime listening on {host}:{port}")
-        while True:
-            conn, addr = server_sock.accept()
-            thread = threading.Thread(target=handle_client, args=(conn, addr), daemon=True)
-            thread.start()
+def serve(port: int, host: str = "0.0.0.0", backlog: int = 1024, workers: int = 16, metrics_port: Optional[int] = None) -> None:
+    asyncio.run(serve_async(port, host, backlog, workers, metrics_port))
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Object Runtime Server")
     parser.add_argument("--port", type=int, default=9100, help="TCP port to listen on")
     parser.add_argument("--host", type=str, default="0.0.0.0", help="Host/IP to bind to")
+    parser.add_argument("--ssh-pool-size", type=int, default=4, help="Multiplexed SSH sessions per Slurm host")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="JSON file listing the clusters to serve and the path routes")
+    parser.add_argument("--cache-size-mb", type=int, default=64, help="Upper bound for each cluster's object cache")
+    parser.add_argument("--backlog", type=int, default=1024, help="Pending connection backlog")
+    parser.add_argument("--workers", type=int, default=16, help="Threads running blocking Slurm fetches")
+    parser.add_argument("--compress-threshold", type=int, default=compression.threshold, help="Smallest reply (bytes) sent compressed to clients that accept it")
+    parser.add_argument("--zlib-level", type=int, default=compression.levels["zlib"], help="zlib compression level (1-9)")
+    parser.add_argument("--lz4-level", type=int, default=compression.levels["lz4"], help="lz4 compression level (0-16), if lz4 is installed")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Also serve Prometheus metrics over HTTP on this port")
+    parser.add_argument("--trace-sample-rate", type=float, default=metrics.sample_rate, help="Fraction of requests whose phases are timed")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between polls for subscribed objects")
+    parser.add_argument("--snapshot-interval", type=float, default=None,
+                        help="Poll every cluster in the background every this many seconds and answer from the snapshot (0 = query Slurm per request; default: per-cluster config)")
     args = parser.parse_args()
-    serve(args.port, args.host)
+    global registry
+    set_pool_size(args.ssh_pool_size)
+    registry = Registry(load_config(args.config), args.cache_size_mb * 1024 * 1024)
+    subscription_hub.interval = args.poll_interval
+    compression.threshold = args.compress_threshold
+    metrics.sample_rate = args.trace_sample_rate
+    compression.levels.update(zlib=args.zlib_level, lz4=args.lz4_level)
+    for cluster in registry.clusters.values():
+        interval = cluster.snapshot_interval if args.snapshot_interval is None else args.snapshot_interval
+        if interval > 0:
+            cluster.poller = SnapshotPoller(cluster, interval, load_object)
+            cluster.poller.start()
+    serve(args.port, args.host, args.backlog, args.workers, args.metrics_port)
 
 
 if __name__ == "__main__":
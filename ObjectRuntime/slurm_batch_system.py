@@ -1,11 +1,11 @@
 import base64
-import subprocess
 import socket
 import struct
 import json
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 from .wp_object import WPObject
 from .slurm_partition import WPSlurmPartition
+from .slurm_collector import SlurmSnapshot, get_collector
 
 class WPSlurmBatchSystem(WPObject):
     """
@@ -26,35 +26,22 @@ class WPSlurmBatchSystem(WPObject):
         self.slurm_host = slurm_host
     
 
-    # create a function that uses the slurm binaries to list all partitions
-    # ssh into "hostname" first using the current user
-    def getPartitions(self):
-        # Single SSH call: get partitions with job counts
-        script = 'sinfo -h -o %P | sed "s/\\*$//" | while read p; do echo "$p $(squeue -h -p "$p" | wc -l)"; done'
-        with subprocess.Popen(["ssh", self.slurm_host, script], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
-            stdout, stderr = proc.communicate()
-            if proc.returncode != 0:
-                raise RuntimeError(f"Failed to get partitions and counts: {stderr.decode('utf-8')}")
+    def load_record(self, record: dict) -> None:
+        super().load_record(record)
+        self.slurm_host = None
 
+    # list all partitions with their job counts from the shared cluster snapshot
+    def getPartitions(self, snapshot: Optional[SlurmSnapshot] = None):
+        if snapshot is None:
+            snapshot = get_collector(self.slurm_host).snapshot()
         self.children = []
-        for line in stdout.decode('utf-8').splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                parts = line.split()
-                if len(parts) >= 2:
-                    part = parts[0]
-                    count = int(parts[1])
-                else:
-                    continue
-            except Exception:
-                continue
-            
+        for part in snapshot.partitions:
+            count = snapshot.getJobCount(part)
             obj = WPSlurmPartition(part, f"{self.path}/{part}", self.slurm_host)
             obj.setHost(self.host)
             obj.setPort(self.port)
             obj.children_count = count
             self.children.append(obj)
+        self.children_count = len(self.children)
     
     
\ No newline at end of file
@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from . import metrics
+from .slurm_connection import get_connection
+
+
+# One remote call: the partition list, a separator line, then every job in the queue
+SNAPSHOT_COMMAND = "sinfo -h -o %P && echo -- && squeue -h -o '%P %i %T'"
+SNAPSHOT_MAX_AGE = 2.0
+
+
+class SlurmSnapshot:
+    """
+    Point-in-time view of a cluster's partitions and jobs.
+
+    Built from a single sinfo and a single squeue, so all partitions, job
+    lists and counts derived from one snapshot are consistent with each other.
+    """
+    partitions: List[str]
+    jobs: Dict[str, List[Tuple[str, str]]]
+    taken: float
+
+    def __init__(self, partitions: List[str], jobs: Dict[str, List[Tuple[str, str]]]) -> None:
+        self.partitions = partitions
+        self.jobs = jobs
+        self.taken = time.monotonic()
+
+    def age(self) -> float:
+        return time.monotonic() - self.taken
+
+    def getJobs(self, partition: str) -> List[Tuple[str, str]]:
+        """Return (job_id, state) for every job queued in partition."""
+        return self.jobs.get(partition, [])
+
+    def getJobCount(self, partition: str) -> int:
+        return len(self.jobs.get(partition, []))
+
+
+def parse_snapshot(output: str) -> SlurmSnapshot:
+    partitions: List[str] = []
+    jobs: Dict[str, List[Tuple[str, str]]] = {}
+    lines = iter(output.splitlines())
+    for line in lines:
+        line = line.strip()
+        if line == "--":
+            break
+        if not line:
+            continue
+        # sinfo marks the default partition with a trailing '*'
+        name = line.rstrip("*")
+        if name not in jobs:
+            partitions.append(name)
+            jobs[name] = []
+    for line in lines:
+        parts = line.split()
+        if len(parts) < 3:
+            continue
+        job_id, state = parts[1], parts[2]
+        # Jobs submitted to several partitions are listed as "a,b" and show up in each
+        for name in parts[0].split(","):
+            jobs.setdefault(name, []).append((job_id, state))
+    return SlurmSnapshot(partitions, jobs)
+
+
+class SlurmCollector:
+    """
+    Fetches and caches SlurmSnapshots for one Slurm host.
+
+    Concurrent callers that find the snapshot too old share a single refresh.
+    """
+    slurm_host: str
+
+    def __init__(self, slurm_host: str) -> None:
+        self.slurm_host = slurm_host
+        self._snapshot: Optional[SlurmSnapshot] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> SlurmSnapshot:
+        result = get_connection(self.slurm_host).run_script(SNAPSHOT_COMMAND)
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to get partitions and jobs: {result.stderr.decode('utf-8')}")
+        with metrics.span("parse"):
+            snapshot = parse_snapshot(result.stdout.decode("utf-8"))
+        self._snapshot = snapshot
+        return snapshot
+
+    def snapshot(self, max_age: float = SNAPSHOT_MAX_AGE) -> SlurmSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.age() <= max_age:
+            return snapshot
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.age() <= max_age:
+                return snapshot
+            return self.refresh()
+
+
+_collectors: Dict[str, SlurmCollector] = {}
+_collectors_lock = threading.Lock()
+
+
+def get_collector(slurm_host: str) -> SlurmCollector:
+    """Return the shared collector for slurm_host, creating it on first use."""
+    with _collectors_lock:
+        collector = _collectors.get(slurm_host)
+        if collector is None:
+            collector = SlurmCollector(slurm_host)
+            _collectors[slurm_host] = collector
+        return collector
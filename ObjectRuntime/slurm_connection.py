@@ -0,0 +1,229 @@
+import atexit
+import os
+import queue
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from . import metrics
+
+
+DEFAULT_POOL_SIZE = 4
+HEALTH_CHECK_INTERVAL = 60.0
+# ssh exits with 255 when the connection itself failed (as opposed to the remote command)
+SSH_CONNECTION_ERROR = 255
+
+
+class _Session:
+    """
+    One multiplexed SSH session, backed by an OpenSSH ControlMaster socket.
+    """
+    control_path: str
+    last_checked: float
+
+    def __init__(self, control_path: str) -> None:
+        self.control_path = control_path
+        self.last_checked = 0.0
+
+
+class SlurmConnection:
+    """
+    Small pool of long-lived SSH sessions to one Slurm login node.
+
+    Each session is an OpenSSH ControlMaster; commands are run as multiplexed
+    channels over it, so they skip the TCP, key exchange and auth handshake.
+    At most pool_size commands are in flight per host, callers beyond that
+    wait for a free session instead of opening new connections.
+    """
+    slurm_host: str
+    pool_size: int
+    ssh: str
+
+    def __init__(self, slurm_host: str, pool_size: int = DEFAULT_POOL_SIZE, ssh: str = "ssh") -> None:
+        self.slurm_host = slurm_host
+        self.pool_size = pool_size
+        self.ssh = ssh
+        self._control_dir = tempfile.mkdtemp(prefix="objectruntime-ssh-")
+        self._sessions: List[_Session] = []
+        self._idle: "queue.Queue[_Session]" = queue.Queue()
+        for index in range(pool_size):
+            session = _Session(os.path.join(self._control_dir, f"{index}.sock"))
+            self._sessions.append(session)
+            self._idle.put(session)
+
+    def _is_alive(self, session: _Session) -> bool:
+        if not os.path.exists(session.control_path):
+            return False
+        result = subprocess.run(
+            [self.ssh, "-S", session.control_path, "-O", "check", self.slurm_host],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+        )
+        return result.returncode == 0
+
+    def _connect(self, session: _Session) -> None:
+        os.makedirs(self._control_dir, exist_ok=True)
+        # Drop a stale socket left behind by a master that died
+        try:
+            os.unlink(session.control_path)
+        except FileNotFoundError:
+            pass
+        metrics.count("ssh_connects")
+        # -f backgrounds the master once authenticated, so stdout/stderr must not be pipes
+        result = subprocess.run(
+            [
+                self.ssh, "-M", "-N", "-f",
+                "-S", session.control_path,
+                "-o", "ControlPersist=yes",
+                "-o", "BatchMode=yes",
+                "-o", "ServerAliveInterval=30",
+                self.slurm_host,
+            ],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to connect to {self.slurm_host}")
+        session.last_checked = time.monotonic()
+
+    def _ensure(self, session: _Session) -> None:
+        if time.monotonic() - session.last_checked < HEALTH_CHECK_INTERVAL:
+            return
+        if self._is_alive(session):
+            session.last_checked = time.monotonic()
+        else:
+            self._connect(session)
+
+    def _ssh_command(self, session: _Session, script: str) -> List[str]:
+        # ssh hands the remote login shell one command line, so this is the only argument after the host
+        return [self.ssh, "-S", session.control_path, "-o", "ControlMaster=no", self.slurm_host, script]
+
+    def _exec(self, session: _Session, script: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            self._ssh_command(session, script),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+        )
+
+    def run(self, command: List[str]) -> subprocess.CompletedProcess:
+        """
+        Run command (program and arguments) on the Slurm host and return the
+        completed process (stdout/stderr as bytes). Every argument is quoted,
+        so the remote shell passes it on verbatim.
+        """
+        return self.run_script(shlex.join(command))
+
+    def run_script(self, script: str) -> subprocess.CompletedProcess:
+        """
+        Run script through the remote login shell as is, for callers that need
+        pipes or variables. Anything taken from a request must be quoted with
+        shlex.quote before it goes into script.
+        """
+        metrics.count("ssh_commands")
+        session = self._idle.get()
+        try:
+            with metrics.span("ssh"):
+                self._ensure(session)
+                result = self._exec(session, script)
+                if result.returncode == SSH_CONNECTION_ERROR:
+                    # The master went away under us: reconnect once and retry
+                    self._connect(session)
+                    result = self._exec(session, script)
+            return result
+        finally:
+            self._idle.put(session)
+
+    def iter_lines(self, command: List[str]) -> Iterator[str]:
+        """
+        Run command (program and arguments, quoted like run) on the Slurm host
+        and yield its stdout line by line as it arrives.
+
+        Raises RuntimeError after the last line if the command failed.
+        """
+        metrics.count("ssh_commands")
+        session = self._idle.get()
+        try:
+            # Includes the time the caller spends on each line, e.g. parsing it
+            with metrics.span("ssh_stream"):
+                self._ensure(session)
+                # stderr goes to a file so a chatty command cannot block on a full pipe
+                with tempfile.TemporaryFile() as stderr:
+                    with subprocess.Popen(
+                        self._ssh_command(session, shlex.join(command)),
+                        stdout=subprocess.PIPE, stderr=stderr, stdin=subprocess.DEVNULL,
+                    ) as proc:
+                        for line in proc.stdout:
+                            yield line.decode("utf-8", errors="replace")
+                    if proc.returncode != 0:
+                        if proc.returncode == SSH_CONNECTION_ERROR:
+                            session.last_checked = 0.0
+                        stderr.seek(0)
+                        raise RuntimeError(f"Command failed on {self.slurm_host}: {stderr.read().decode('utf-8')}")
+        finally:
+            self._idle.put(session)
+
+    def check(self) -> bool:
+        """Health check all idle sessions, reconnecting those that are down."""
+        healthy = True
+        for _ in range(self.pool_size):
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                session.last_checked = 0.0
+                self._ensure(session)
+            except RuntimeError:
+                healthy = False
+            finally:
+                self._idle.put(session)
+        return healthy
+
+    def close(self) -> None:
+        for session in self._sessions:
+            if os.path.exists(session.control_path):
+                subprocess.run(
+                    [self.ssh, "-S", session.control_path, "-O", "exit", self.slurm_host],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+                )
+            session.last_checked = 0.0
+        shutil.rmtree(self._control_dir, ignore_errors=True)
+
+
+_connections: Dict[str, SlurmConnection] = {}
+_connections_lock = threading.Lock()
+_pool_size = DEFAULT_POOL_SIZE
+# Per-host overrides of _pool_size
+_pool_sizes: Dict[str, int] = {}
+
+
+def set_pool_size(pool_size: int, slurm_host: Optional[str] = None) -> None:
+    """Set the pool size used for connections created from now on, for all hosts or just slurm_host."""
+    global _pool_size
+    if pool_size < 1:
+        raise ValueError("Pool size must be at least 1")
+    if slurm_host is None:
+        _pool_size = pool_size
+    else:
+        _pool_sizes[slurm_host] = pool_size
+
+
+def get_connection(slurm_host: str) -> SlurmConnection:
+    """Return the shared connection pool for slurm_host, creating it on first use."""
+    with _connections_lock:
+        connection = _connections.get(slurm_host)
+        if connection is None:
+            connection = SlurmConnection(slurm_host, _pool_sizes.get(slurm_host, _pool_size))
+            _connections[slurm_host] = connection
+        return connection
+
+
+def close_all() -> None:
+    with _connections_lock:
+        for connection in _connections.values():
+            connection.close()
+        _connections.clear()
+
+
+atexit.register(close_all)
@@ -1,7 +1,17 @@
-import base64
-import subprocess
 import os
+import html
+import shlex
+from typing import Any, Optional, Tuple
 from .wp_object import WPObject
+from .slurm_connection import get_connection
+from .job_record import JobRecord, parse_jobs
+
+
+# Bytes of a job's output read per TailFile request
+LOG_CHUNK_SIZE = 64 * 1024
+
+# Most bytes of a job's output one read may return
+MAX_LOG_CHUNK_SIZE = 1024 * 1024
 
 
 class WPSlurmJob(WPObject):
@@ -9,6 +19,7 @@ class WPSlurmJob(WPObject):
     Minimal representation of a Slurm job object.
     """
     state: str # Pending or Running
+    record: JobRecord
     slurm_host: str
 
     def __init__(self, title: str, path: str) -> None:
@@ -16,6 +27,7 @@ class WPSlurmJob(WPObject):
         # get number of jobs in the partition
         self.children = []
         self.state = "Pending"
+        self.record = JobRecord()
         self.slurm_host = None
     
     def setSlurmHost(self, slurm_host: str) -> None:
@@ -24,19 +36,68 @@ class WPSlurmJob(WPObject):
     def getBadge(self) -> str:
         return self.state
     
+    def memory_size(self, records: bool = True) -> int:
+        return super().memory_size(records) + (self.record.memory_size() if records else 0)
+
+    def wire_extra(self) -> dict:
+        return self.record.to_extra()
+
+    def load_record(self, record: dict) -> None:
+        super().load_record(record)
+        self.state = record["state"]
+        self.record = JobRecord.from_extra(record["extra"])
+        self.slurm_host = None
+
     def getDetails(self) -> None:
         # get the details of the job
-        with subprocess.Popen(["ssh", self.slurm_host, "scontrol", "show", "job", self.title], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
-            stdout, stderr = proc.communicate()
-            if proc.returncode != 0:
-                raise RuntimeError(f"Failed to get job details: {stderr.decode('utf-8')}")
-            self.details = stdout.decode('utf-8')
-        self.state = self.details.split("State=")[1].split("\n")[0]
+        result = get_connection(self.slurm_host).run(["scontrol", "show", "job", self.title])
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to get job details: {result.stderr.decode('utf-8')}")
+        for record in parse_jobs(result.stdout.decode('utf-8')):
+            if self.title in record.ids():
+                self.record = record
+                self.state = record.state or self.state
+                break
 
-    
-    def wp_open(self, view: str = None) -> None:
+    def getLogPath(self, stream: str) -> str:
+        """Path of the job's StdOut or StdErr file on the Slurm host."""
+        if stream not in ("StdOut", "StdErr"):
+            raise ValueError(f"Unknown output stream: {stream}")
+        path = self.record.std_out if stream == "StdOut" else self.record.std_err
+        if not path:
+            raise ValueError(f"Job {self.title} has no {stream} file")
+        return path
+
+    def readLog(self, stream: str, offset: Optional[int] = None, length: int = LOG_CHUNK_SIZE) -> Tuple[int, int, bytes]:
+        """
+        Read up to length bytes of the job's StdOut or StdErr starting at offset,
+        or the last length bytes when offset is None.
+
+        Only the requested range leaves the Slurm host: tail seeks to the
+        offset and head stops after length bytes. Returns (offset, file size, data).
+        """
+        length = int(length)
+        if not 1 <= length <= MAX_LOG_CHUNK_SIZE:
+            raise ValueError(f"length must be between 1 and {MAX_LOG_CHUNK_SIZE}")
+        if offset is not None and int(offset) < 0:
+            raise ValueError("offset must not be negative")
+        path = shlex.quote(self.getLogPath(stream))
+        start = f"$(( size > {length} ? size - {length} : 0 ))" if offset is None else str(int(offset))
+        script = (
+            f"size=$(stat -L -c %s {path}) && start={start} && echo $size $start"
+            f" && tail -c +$((start + 1)) {path} | head -c {length}"
+        )
+        result = get_connection(self.slurm_host).run_script(script)
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to read {stream} of job {self.title}: {result.stderr.decode('utf-8').strip()}")
+        header, _, data = result.stdout.partition(b"\n")
+        size, start = (int(value) for value in header.split())
+        return start, size, data
+
+    def wp_open(self, view: str = None) -> Any:
         from PyQt5 import QtWidgets
-        from PyQt5.QtGui import QIcon, QPixmap
+        from PyQt5.QtGui import QIcon
+        from .pixmap_cache import get_pixmap, WINDOW_ICON_SIZE
         from PyQt5.QtCore import Qt
         from .notebook import NotebookWidget
         
@@ -52,9 +113,8 @@ class WPSlurmJob(WPObject):
 
         # Set window icon
         try:
-            icon_bytes = base64.b64decode(self.icon)
-            pixmap = QPixmap()
-            if pixmap.loadFromData(icon_bytes, "PNG"):
+            pixmap = get_pixmap(self.icon_id, WINDOW_ICON_SIZE, "", window.devicePixelRatioF())
+            if pixmap is not None:
                 icon = QIcon(pixmap)
                 window.setWindowIcon(icon)
                 app.setWindowIcon(icon)
@@ -66,48 +126,46 @@ class WPSlurmJob(WPObject):
         general_layout = QtWidgets.QVBoxLayout(general_tab)
         
         # General tab content
-        job_info = QtWidgets.QLabel(f"""
-        <h2>Job Information</h2>
-        <p><b>Job ID:</b> {self.title}</p>
-        <p><b>State:</b> {self.state}</p>
-        """)
+        def _job_info_html():
+            rows = [("Job ID", self.title), ("State", self.state)]
+            rows += [(label, value) for label, value in self.record.items() if label not in ("Job ID", "State")]
+            cells = "".join(f"<tr><td><b>{label}:</b></td><td>{html.escape(value)}</td></tr>" for label, value in rows)
+            return f"<h2>Job Information</h2><table cellspacing='4'>{cells}</table>"
+
+        job_info = QtWidgets.QLabel(_job_info_html())
         job_info.setAlignment(Qt.AlignTop)
         job_info.setWordWrap(True)
         general_layout.addWidget(job_info)
         
-        # Output tab content
-        output_tab = QtWidgets.QWidget()
-        output_layout = QtWidgets.QVBoxLayout(output_tab)
-        
-        output_text = QtWidgets.QTextEdit()
-        output_text.setPlainText(f"""Job Output for {self.title}
-        ...
-        """)
-        output_text.setReadOnly(True)
-        output_layout.addWidget(output_text)
-
-        # Errors tab content
-        errors_tab = QtWidgets.QWidget()
-        errors_layout = QtWidgets.QVBoxLayout(errors_tab)
-        
-        errors_info = QtWidgets.QLabel(f"""
-        <h2>Error Stream</h2>
-        <p><b>...</b></p>
-        """)
-        errors_info.setAlignment(Qt.AlignTop)
-        errors_info.setWordWrap(True)
-        errors_layout.addWidget(errors_info)
+        # Output and Errors tabs only start fetching when first shown
+        def _log_tab(stream):
+            def _build():
+                if self.host is None or self.port is None:
+                    label = QtWidgets.QLabel(f"{stream} is not available without a server connection")
+                    label.setAlignment(Qt.AlignCenter)
+                    return label
+                from .log_view import LogView
+                from ObjectViewer.viewer import fetch_file_chunk
+                return LogView(lambda offset, length: fetch_file_chunk(self.host, self.port, self.path, stream, offset, length))
+            return _build
 
         # Create notebook with the three tabs
         tabs = [
             ("General", general_tab),
-            ("Output", output_tab),
-            ("Errors", errors_tab)
+            ("Output", _log_tab("StdOut")),
+            ("Errors", _log_tab("StdErr"))
         ]
         
         notebook = NotebookWidget(parent=None, tabs=tabs)
         window.setCentralWidget(notebook)
         window.show()
 
+        # Keep title and state current while the window is open
+        def _apply_delta(added, changed, removed):
+            window.setWindowTitle(f"Job {self.title} - {self.state}")
+            job_info.setText(_job_info_html())
+        self._subscribe(window, _apply_delta)
+
         if owns_app:
-            app.exec_()
\ No newline at end of file
+            app.exec_()
+        return window
\ No newline at end of file
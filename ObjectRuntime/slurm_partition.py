@@ -1,35 +1,82 @@
 import base64
-import subprocess
 import os
+import sys
+from typing import Any, Dict, List, Optional
 from .wp_object import WPObject
-from .slurm_job import WPSlurmJob
+from .job_record import JobRecord, iter_job_records
+from .job_table import JobTable, JobList
+from .slurm_connection import get_connection
+from .slurm_collector import SlurmSnapshot, get_collector
 
 
 class WPSlurmPartition(WPObject):
     """
     Minimal representation of a Slurm partition object.
+
+    On the server the jobs are kept in a columnar JobTable and children is a
+    JobList view over it; objects rebuilt from the wire have a plain list.
     """
     slurm_host: str
+    jobs: Optional[JobTable]
 
     def __init__(self, title: str, path: str, slurm_host: str) -> None:
         super().__init__(title, path)
         self.slurm_host = slurm_host
+        self.jobs = None
 
     def setSlurmHost(self, slurm_host: str) -> None:
         self.slurm_host = slurm_host
 
-    def getJobs(self) -> list[WPSlurmJob]:
-        with subprocess.Popen(["ssh", self.slurm_host, "squeue", "-p", self.title, "-h", "-o", "%i"], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
-            stdout, stderr = proc.communicate()
-            if proc.returncode != 0:
-                raise RuntimeError(f"Failed to get number of jobs: {stderr.decode('utf-8')}")
-            for job in stdout.decode('utf-8').splitlines():
-                job_obj = WPSlurmJob(job, f"{self.path}/{job}")
-                job_obj.setHost(self.host)
-                job_obj.setPort(self.port)
-                job_obj.setSlurmHost(self.slurm_host)
-                self.children.append(job_obj)
-    
+    def getJobs(self, snapshot: Optional[SlurmSnapshot] = None) -> JobList:
+        if snapshot is None:
+            snapshot = get_collector(self.slurm_host).snapshot()
+        self.jobs = JobTable()
+        for job, state in snapshot.getJobs(self.title):
+            self.jobs.append(job, state)
+        self.children = JobList(self)
+        self.children_count = len(self.jobs)
+        return self.children
+
+    def getJobDetails(self, records: Optional[Dict[str, JobRecord]] = None) -> None:
+        """
+        Fill in state and job records for all jobs from a single scontrol call,
+        or from records (job id -> record) when given.
+
+        The one-line-per-job output is parsed as it streams in, keeping only
+        the jobs that belong to this partition.
+        """
+        if not self.jobs:
+            return
+        if records is not None:
+            for row, job_id in enumerate(self.jobs.ids):
+                record = records.get(job_id)
+                if record is not None:
+                    self.jobs.set_record(row, record)
+            return
+        connection = get_connection(self.slurm_host)
+        for record in iter_job_records(connection.iter_lines(["scontrol", "-o", "show", "job"])):
+            for job_id in record.ids():
+                row = self.jobs.row(job_id)
+                if row is not None:
+                    self.jobs.set_record(row, record)
+                    break
+
+    def child_records(self, offset: int = 0, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        if self.jobs is None:
+            return super().child_records(offset, end)
+        return self.jobs.child_records(self.path, offset, end)
+
+    def memory_size(self, records: bool = True) -> int:
+        if self.jobs is None:
+            return super().memory_size(records)
+        # children is a view over the table; iterating it would create every job
+        return sys.getsizeof(self) + sys.getsizeof(self.__dict__) + self.jobs.memory_size(records)
+
+    def load_record(self, record: dict) -> None:
+        super().load_record(record)
+        self.slurm_host = None
+        self.jobs = None
+
     def getBadge(self) -> str:
         if self.children_count > 0:
             return f"{self.children_count}"
@@ -0,0 +1,171 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .wp_object import WPObject
+from . import wire
+
+
+# Least seconds between deltas that only move a subscriber's as_of forward
+AS_OF_INTERVAL = 60.0
+
+# Fields compared between polls to decide whether a child changed
+_DIFF_FIELDS = ("title", "icon_id", "badge", "state", "children_count")
+
+
+def _fingerprint(record: Dict[str, Any]) -> Tuple:
+    return tuple(record[field] for field in _DIFF_FIELDS)
+
+
+class _Baseline:
+    """What subscribers were last sent of an object: fingerprints of its header and children."""
+    etag: Optional[str]
+    as_of: Optional[float]
+    header: Tuple
+    children: Dict[str, Tuple]
+
+    def __init__(self, obj: WPObject, records: Optional[List[Dict[str, Any]]] = None) -> None:
+        self.etag = obj.etag
+        self.as_of = obj.as_of
+        self.header = _fingerprint(obj.to_record(False))
+        if records is None:
+            records = obj.child_records()
+        self.children = {record["path"]: _fingerprint(record) for record in records}
+
+
+class _Watch:
+    """
+    The subscribers of one path and the baseline each of them is at.
+
+    Subscribers that were sent the same states share one _Baseline, so a
+    poll diffs once per distinct baseline rather than once per subscriber.
+    """
+    subscribers: Dict[int, Callable[[bytes], bool]]
+    baselines: Dict[int, _Baseline]
+
+    def __init__(self) -> None:
+        self.subscribers = {}
+        self.baselines = {}
+
+
+class SubscriptionHub:
+    """
+    Pushes changes of subscribed objects to their subscribers.
+
+    A single poll thread re-resolves every path that has subscribers once per
+    interval, however many clients watch it, diffs the result against what
+    each subscriber was last sent and sends it one wire KIND_DELTA message
+    with only what changed. A change of the object's as_of alone (e.g. a new
+    snapshot with the same content) is not pushed on every poll, which would
+    send every subscriber a delta per interval: once a subscriber's as_of is
+    AS_OF_INTERVAL behind, it gets a delta that is empty but for the header
+    and its metadata, so it can still show roughly how old its data is.
+
+    A subscriber's push returns False when it cannot take a delta yet (its
+    previous one is still being written). It then stays at its baseline and
+    the next poll sends it everything that changed since, in one delta.
+    """
+    interval: float
+
+    def __init__(self, resolve: Callable[[str], WPObject], interval: float = 5.0) -> None:
+        self.resolve = resolve
+        self.interval = interval
+        self._watches: Dict[str, _Watch] = {}
+        self._paths: Dict[int, str] = {}
+        self._next_token = 1
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, obj: WPObject, push: Callable[[bytes], bool]) -> int:
+        """
+        Start pushing deltas for obj.path to push; obj is the state the
+        subscriber was sent and starts from.
+
+        Returns a token for unsubscribe().
+        """
+        with self._lock:
+            watch = self._watches.get(obj.path)
+            if watch is None:
+                watch = self._watches[obj.path] = _Watch()
+            baseline = None
+            if obj.etag is not None:
+                baseline = next((known for known in watch.baselines.values() if known.etag == obj.etag), None)
+            token = self._next_token
+            self._next_token += 1
+            watch.subscribers[token] = push
+            watch.baselines[token] = baseline or _Baseline(obj)
+            self._paths[token] = obj.path
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="objectruntime-subscriptions", daemon=True)
+                self._thread.start()
+        return token
+
+    def unsubscribe(self, token: int) -> None:
+        with self._lock:
+            path = self._paths.pop(token, None)
+            if path is None:
+                return
+            watch = self._watches[path]
+            watch.subscribers.pop(token, None)
+            watch.baselines.pop(token, None)
+            if not watch.subscribers:
+                del self._watches[path]
+
+    def _diff(self, baseline: _Baseline, current: _Baseline, obj: WPObject, records: Dict[str, Dict[str, Any]],
+              as_of_interval: float = AS_OF_INTERVAL) -> Optional[bytes]:
+        """The delta taking a subscriber from baseline to current (obj, whose child records are records)."""
+        added: List[Dict[str, Any]] = []
+        changed: List[Dict[str, Any]] = []
+        for path, fingerprint in current.children.items():
+            previous = baseline.children.get(path)
+            if previous is None:
+                added.append(records[path])
+            elif previous != fingerprint:
+                changed.append(records[path])
+        removed = [path for path in baseline.children if path not in current.children]
+        if not added and not changed and not removed and current.header == baseline.header:
+            moved = 0.0 if current.as_of is None else current.as_of - (baseline.as_of or 0.0)
+            if moved <= 0.0 or moved < as_of_interval:
+                return None
+        return wire.encode_delta(obj.to_record(False), added, changed, removed, obj.wire_meta())
+
+    def poll(self, matches: Optional[Callable[[str], bool]] = None, as_of_interval: float = AS_OF_INTERVAL) -> None:
+        """
+        Poll every subscribed path (or those matches accepts) once and push
+        the deltas; as_of_interval=0 also pushes as_of changes right away.
+        """
+        with self._lock:
+            paths = [path for path in self._watches if matches is None or matches(path)]
+        for path in paths:
+            try:
+                obj = self.resolve(path)
+                child_records = obj.child_records()
+            except Exception as exc:
+                print(f"Subscription poll failed for {path}: {exc}")
+                continue
+            records = {record["path"]: record for record in child_records}
+            current = _Baseline(obj, child_records)
+            # Pushing only schedules the write, so it happens under the lock:
+            # concurrent polls (e.g. a Refresh) cannot reorder a subscriber's deltas
+            with self._lock:
+                watch = self._watches.get(path)
+                if watch is None:
+                    continue
+                deltas: Dict[_Baseline, Optional[bytes]] = {}
+                for token, push in list(watch.subscribers.items()):
+                    baseline = watch.baselines[token]
+                    if baseline not in deltas:
+                        deltas[baseline] = self._diff(baseline, current, obj, records, as_of_interval)
+                    delta = deltas[baseline]
+                    if delta is None:
+                        continue
+                    try:
+                        if push(delta):
+                            watch.baselines[token] = current
+                    except Exception as exc:
+                        print(f"Failed to push update for {path}: {exc}")
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            self.poll()
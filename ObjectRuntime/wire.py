@@ -0,0 +1,380 @@
+"""
+Compact, versioned encoding for objects sent between server and viewer.
+
+Every message starts with a 4-byte header: the magic b"WP", the format
+version and the message kind. Integers are unsigned LEB128 varints. Strings
+go through a per-message string table: each string is written as its table
+index, and an index equal to the current table size introduces a new entry
+followed by its UTF-8 length and bytes. Repeated values such as type names,
+icon ids and job states therefore cost one or two bytes after first use.
+
+An object record is:
+
+    type, path, title, icon_id, badge, state   (strings)
+    children_count                             (varint)
+    n_extra, n_extra x (key, value)            (varint, string pairs)
+    n_children, n_children x record            (varint, nested records)
+
+A KIND_CHILDREN chunk is a varint count followed by that many records.
+A KIND_DELTA message is the object's own record (without children), then
+the added child records, the changed child records and the removed child
+paths, each list prefixed by a varint count.
+A KIND_FILE_CHUNK message is the chunk's byte offset and the file size
+(varints) followed by the raw bytes, prefixed by their varint length.
+A KIND_OBJECTS message is a varint count followed by that many
+(path, message) pairs: the requested path as a string and a complete
+KIND_OBJECT, KIND_NOT_MODIFIED or KIND_ERROR message, prefixed by its
+varint length.
+A KIND_JSON message is a single string holding a JSON document.
+
+KIND_OBJECT and KIND_DELTA messages may end with a metadata trailer
+(as_of, etag): a varint count of (key, value) pairs whose strings are
+written in full (varint length and UTF-8 bytes) rather than through the
+string table, so the trailer can be appended to an already encoded
+message. Decoders that predate it ignore it. A KIND_NOT_MODIFIED message
+is just such a trailer.
+
+Encoders of potentially large messages return the bytearray they built
+rather than a copy, and decode() reads bytes or bytearrays in place. Such
+a message may be appended to (append_meta) until it is handed on; after
+that it is read-only, since the server's object cache shares one encoded
+reply between concurrent sends.
+"""
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+
+MAGIC = b"WP"
+VERSION = 1
+
+KIND_OBJECT = 0
+KIND_ERROR = 1
+KIND_ICON = 2
+# Streamed GetObject replies: a KIND_OBJECT header without children, any
+# number of KIND_CHILDREN chunks, then KIND_END
+KIND_CHILDREN = 3
+KIND_END = 4
+# Pushed to subscribers: what changed in an object since the previous message
+KIND_DELTA = 5
+# Part of a file on the Slurm host, e.g. a job's output (TailFile)
+KIND_FILE_CHUNK = 6
+# GetObjects replies: several objects (or errors) in one message
+KIND_OBJECTS = 7
+# Free-form data such as server statistics (Stats)
+KIND_JSON = 8
+# GetObject reply when the client's if_none_match is still the object's etag
+KIND_NOT_MODIFIED = 9
+
+_HEADER = struct.Struct("!2sBB")
+
+
+class _Encoder:
+    def __init__(self, kind: int) -> None:
+        self.out = bytearray(_HEADER.pack(MAGIC, VERSION, kind))
+        self.strings: Dict[str, int] = {}
+
+    def uint(self, value: int) -> None:
+        out = self.out
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    def string(self, value: str) -> None:
+        index = self.strings.get(value)
+        if index is not None:
+            self.uint(index)
+            return
+        index = len(self.strings)
+        self.strings[value] = index
+        data = value.encode("utf-8")
+        self.uint(index)
+        self.uint(len(data))
+        self.out += data
+
+    def record(self, record: Dict[str, Any]) -> None:
+        string = self.string
+        string(record["type"])
+        string(record["path"])
+        string(record["title"])
+        string(record.get("icon_id", ""))
+        string(record.get("badge", ""))
+        string(record.get("state", ""))
+        self.uint(record.get("children_count", 0))
+        extra = record.get("extra", {})
+        self.uint(len(extra))
+        for key, value in extra.items():
+            string(key)
+            string(value)
+        children = record.get("children", [])
+        self.uint(len(children))
+        for child in children:
+            self.record(child)
+
+
+def _read_uint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _read_string(data: bytes, pos: int, strings: List[str]) -> Tuple[str, int]:
+    index = data[pos]
+    if index < 0x80:
+        pos += 1
+    else:
+        index, pos = _read_uint(data, pos)
+    if index < len(strings):
+        return strings[index], pos
+    if index != len(strings):
+        raise ValueError("Corrupt string table")
+    length = data[pos]
+    if length < 0x80:
+        pos += 1
+    else:
+        length, pos = _read_uint(data, pos)
+    end = pos + length
+    value = data[pos:end].decode("utf-8")
+    strings.append(value)
+    return value, end
+
+
+def _read_record(data: bytes, pos: int, strings: List[str]) -> Tuple[Dict[str, Any], int]:
+    read_string = _read_string
+    type_name, pos = read_string(data, pos, strings)
+    path, pos = read_string(data, pos, strings)
+    title, pos = read_string(data, pos, strings)
+    icon_id, pos = read_string(data, pos, strings)
+    badge, pos = read_string(data, pos, strings)
+    state, pos = read_string(data, pos, strings)
+    children_count, pos = _read_uint(data, pos)
+    n_extra, pos = _read_uint(data, pos)
+    extra = {}
+    for _ in range(n_extra):
+        key, pos = read_string(data, pos, strings)
+        extra[key], pos = read_string(data, pos, strings)
+    n_children, pos = _read_uint(data, pos)
+    children = []
+    for _ in range(n_children):
+        child, pos = _read_record(data, pos, strings)
+        children.append(child)
+    record = {
+        "type": type_name,
+        "path": path,
+        "title": title,
+        "icon_id": icon_id,
+        "badge": badge,
+        "state": state,
+        "children_count": children_count,
+        "extra": extra,
+        "children": children,
+    }
+    return record, pos
+
+
+def _put_uint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def append_meta(message: bytearray, meta: Dict[str, str]) -> None:
+    """Append a metadata trailer to an encoded KIND_OBJECT or KIND_DELTA message, in place."""
+    _put_uint(message, len(meta))
+    for key, value in meta.items():
+        for text in (key, value):
+            data = text.encode("utf-8")
+            _put_uint(message, len(data))
+            message += data
+
+
+def _read_meta(data: bytes, pos: int) -> Tuple[Dict[str, str], int]:
+    meta = {}
+    count, pos = _read_uint(data, pos)
+    for _ in range(count):
+        texts = []
+        for _ in range(2):
+            length, pos = _read_uint(data, pos)
+            texts.append(data[pos:pos + length].decode("utf-8"))
+            pos += length
+        meta[texts[0]] = texts[1]
+    return meta, pos
+
+
+def encode_object(record: Dict[str, Any], meta: Optional[Dict[str, str]] = None) -> bytearray:
+    encoder = _Encoder(KIND_OBJECT)
+    encoder.record(record)
+    if meta:
+        append_meta(encoder.out, meta)
+    return encoder.out
+
+
+def encode_not_modified(meta: Dict[str, str]) -> bytes:
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, KIND_NOT_MODIFIED))
+    append_meta(out, meta)
+    return bytes(out)
+
+
+def encode_error(message: str) -> bytes:
+    encoder = _Encoder(KIND_ERROR)
+    encoder.string(message)
+    return bytes(encoder.out)
+
+
+def encode_icon(icon_id: str, icon: str) -> bytes:
+    encoder = _Encoder(KIND_ICON)
+    encoder.string(icon_id)
+    encoder.string(icon)
+    return bytes(encoder.out)
+
+
+def encode_children(records: List[Dict[str, Any]]) -> bytearray:
+    encoder = _Encoder(KIND_CHILDREN)
+    encoder.uint(len(records))
+    for record in records:
+        encoder.record(record)
+    return encoder.out
+
+
+def encode_end() -> bytes:
+    return _HEADER.pack(MAGIC, VERSION, KIND_END)
+
+
+def encode_delta(header: Dict[str, Any], added: List[Dict[str, Any]], changed: List[Dict[str, Any]], removed: List[str],
+                 meta: Optional[Dict[str, str]] = None) -> bytearray:
+    encoder = _Encoder(KIND_DELTA)
+    encoder.record(header)
+    for records in (added, changed):
+        encoder.uint(len(records))
+        for record in records:
+            encoder.record(record)
+    encoder.uint(len(removed))
+    for path in removed:
+        encoder.string(path)
+    if meta:
+        append_meta(encoder.out, meta)
+    return encoder.out
+
+
+def encode_file_chunk(offset: int, size: int, data: bytes) -> bytearray:
+    encoder = _Encoder(KIND_FILE_CHUNK)
+    encoder.uint(offset)
+    encoder.uint(size)
+    encoder.uint(len(data))
+    encoder.out += data
+    return encoder.out
+
+
+def encode_objects(entries: List[Tuple[str, bytes]]) -> bytearray:
+    """Bundle (path, encoded KIND_OBJECT/KIND_ERROR message) pairs; the messages are copied as they are."""
+    encoder = _Encoder(KIND_OBJECTS)
+    encoder.uint(len(entries))
+    for path, message in entries:
+        encoder.string(path)
+        encoder.uint(len(message))
+        encoder.out += message
+    return encoder.out
+
+
+def encode_json(text: str) -> bytes:
+    encoder = _Encoder(KIND_JSON)
+    encoder.string(text)
+    return bytes(encoder.out)
+
+
+def decode(payload: bytes) -> Tuple[int, Any]:
+    """
+    Decode a wire message into (kind, value).
+
+    value is a record dict for KIND_OBJECT, the message for KIND_ERROR, an
+    (icon_id, icon) tuple for KIND_ICON, a list of records for KIND_CHILDREN,
+    None for KIND_END, a dict with "object", "added", "changed" and
+    "removed" for KIND_DELTA and an (offset, size, data) tuple for
+    KIND_FILE_CHUNK. For KIND_OBJECTS it is a list of (path, (kind, value))
+    with each embedded message decoded in turn, the JSON text for KIND_JSON
+    and the metadata dict for KIND_NOT_MODIFIED. Object records (including
+    a delta's "object") carry their metadata trailer, if any, as "meta".
+    """
+    data = payload if isinstance(payload, (bytes, bytearray)) else bytes(payload)
+    return _decode(data, 0, len(data))
+
+
+def _decode(data: bytes, start: int, end: int) -> Tuple[int, Any]:
+    """Decode the message in data[start:end] without copying it out first."""
+    if end - start < _HEADER.size:
+        raise ValueError("Truncated message")
+    magic, version, kind = _HEADER.unpack_from(data, start)
+    if magic != MAGIC:
+        raise ValueError("Not a wire-format message")
+    if version > VERSION:
+        raise ValueError(f"Unsupported wire format version {version}")
+    pos = start + _HEADER.size
+    strings: List[str] = []
+    if kind == KIND_OBJECT:
+        record, pos = _read_record(data, pos, strings)
+        if pos < end:
+            record["meta"], pos = _read_meta(data, pos)
+        return kind, record
+    if kind == KIND_NOT_MODIFIED:
+        meta, pos = _read_meta(data, pos)
+        return kind, meta
+    if kind == KIND_ERROR:
+        message, pos = _read_string(data, pos, strings)
+        return kind, message
+    if kind == KIND_ICON:
+        icon_id, pos = _read_string(data, pos, strings)
+        icon, pos = _read_string(data, pos, strings)
+        return kind, (icon_id, icon)
+    if kind == KIND_CHILDREN:
+        count, pos = _read_uint(data, pos)
+        records = []
+        for _ in range(count):
+            record, pos = _read_record(data, pos, strings)
+            records.append(record)
+        return kind, records
+    if kind == KIND_END:
+        return kind, None
+    if kind == KIND_DELTA:
+        header, pos = _read_record(data, pos, strings)
+        delta: Dict[str, Any] = {"object": header}
+        for key in ("added", "changed"):
+            count, pos = _read_uint(data, pos)
+            records = []
+            for _ in range(count):
+                record, pos = _read_record(data, pos, strings)
+                records.append(record)
+            delta[key] = records
+        count, pos = _read_uint(data, pos)
+        removed = []
+        for _ in range(count):
+            path, pos = _read_string(data, pos, strings)
+            removed.append(path)
+        delta["removed"] = removed
+        if pos < end:
+            header["meta"], pos = _read_meta(data, pos)
+        return kind, delta
+    if kind == KIND_FILE_CHUNK:
+        offset, pos = _read_uint(data, pos)
+        size, pos = _read_uint(data, pos)
+        length, pos = _read_uint(data, pos)
+        return kind, (offset, size, bytes(data[pos:pos + length]))
+    if kind == KIND_OBJECTS:
+        count, pos = _read_uint(data, pos)
+        entries = []
+        for _ in range(count):
+            path, pos = _read_string(data, pos, strings)
+            length, pos = _read_uint(data, pos)
+            entries.append((path, _decode(data, pos, pos + length)))
+            pos += length
+        return kind, entries
+    if kind == KIND_JSON:
+        text, pos = _read_string(data, pos, strings)
+        return kind, text
+    raise ValueError(f"Unknown message kind {kind}")
@@ -1,15 +1,26 @@
-from typing import Optional, List
-import base64
-import os
+import sys
+from typing import Optional, List, Dict, Any, Tuple
+from . import icons
+from . import wire
 
 class WPObject:
     title: str
-    icon: str
+    icon_id: str
     host: Optional[str]
     port: Optional[int]
     children: List["WPObject"]
     children_count: int
     path: str
+    # When the server built this object from Slurm data (epoch seconds), if known
+    as_of: Optional[float] = None
+    # Server-assigned version of the object's content, for if_none_match
+    etag: Optional[str] = None
+    # class name -> class, used to rebuild objects from wire records
+    types: Dict[str, type] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        WPObject.types[cls.__name__] = cls
 
     def __init__(self, title: str, path: str) -> None:
         self.title = title
@@ -18,10 +29,8 @@ class WPObject:
         self.children_count = 0
         self.host = None
         self.port = None
-        icon = self.__class__.__name__ + ".png"
-        resource_path = os.path.join(os.path.dirname(__file__), "Resources", icon)
-        with open(resource_path, "rb") as f:
-            self.icon = base64.b64encode(f.read()).decode("utf-8")
+        # Instances only carry the id; the PNG itself is loaded once per process
+        self.icon_id = icons.icon_id_for(self.__class__.__name__ + ".png")
 
     def getTitle(self) -> str:
         return self.title
@@ -33,15 +42,182 @@ class WPObject:
         self.port = port
     
     def setIcon(self, icon: str) -> None:
-        self.icon = icon
+        self.icon_id = icons.register(icon)
     
     def getIcon(self) -> str:
-        return self.icon
+        return icons.get_icon(self.icon_id)
+
+    def wire_extra(self) -> Dict[str, str]:
+        """Type-specific string fields to send along with the standard record fields."""
+        return {}
+
+    def to_record(self, with_children: bool = True, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Return the wire record for this object; offset/limit select a page of children."""
+        record = {
+            "type": self.__class__.__name__,
+            "path": self.path,
+            "title": self.title,
+            "icon_id": self.icon_id,
+            "badge": self.getBadge() if hasattr(self, "getBadge") else "",
+            "state": getattr(self, "state", ""),
+            "children_count": self.children_count,
+            "extra": self.wire_extra(),
+            "children": [],
+        }
+        if with_children:
+            end = None if limit is None else offset + limit
+            record["children"] = self.child_records(offset, end)
+        return record
+
+    def child_records(self, offset: int = 0, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Wire records (without grandchildren) of children offset:end."""
+        return [child.to_record(False) for child in self.children[offset:end]]
+
+    def memory_size(self, records: bool = True) -> int:
+        """
+        Rough bytes this object and its children keep alive, for cache
+        accounting. With records False, job records are left out: they
+        belong to whoever shares them between objects (a polled state).
+        """
+        own = sys.getsizeof(self) + sys.getsizeof(self.__dict__) + sys.getsizeof(self.path) + sys.getsizeof(self.title)
+        return own + sum(child.memory_size(records) for child in self.children)
+
+    def wire_meta(self) -> Dict[str, str]:
+        """Metadata sent in the trailer of this object's messages rather than in its record."""
+        meta = {}
+        if self.as_of is not None:
+            meta["as_of"] = f"{self.as_of:.3f}"
+        if self.etag is not None:
+            meta["etag"] = self.etag
+        return meta
+
+    def to_wire(self, offset: int = 0, limit: Optional[int] = None) -> bytearray:
+        return wire.encode_object(self.to_record(True, offset, limit), self.wire_meta())
+
+    def load_record(self, record: Dict[str, Any]) -> None:
+        self.title = record["title"]
+        self.path = record["path"]
+        self.icon_id = record["icon_id"]
+        self.children_count = record["children_count"]
+        self.load_meta(record.get("meta", {}))
+        self.host = None
+        self.port = None
+        self.children = [WPObject.from_record(child) for child in record["children"]]
+
+    def load_meta(self, meta: Dict[str, str]) -> None:
+        as_of = meta.get("as_of")
+        self.as_of = float(as_of) if as_of else None
+        self.etag = meta.get("etag")
+
+    @staticmethod
+    def from_record(record: Dict[str, Any]) -> "WPObject":
+        """Rebuild an object (and its children) from a decoded wire record."""
+        cls = WPObject.types.get(record["type"], WPObject)
+        obj = cls.__new__(cls)
+        obj.load_record(record)
+        return obj
 
-    def wp_open(self, view: str = None) -> None:
+    def apply_delta(self, delta: Dict[str, Any]) -> Tuple[List["WPObject"], List["WPObject"], List[str]]:
+        """
+        Apply a subscription delta to this object and its children.
+
+        Returns (added, changed, removed paths). Applying the same delta
+        twice is harmless: known paths are replaced and unknown removals
+        ignored. A delta with "replace" set carries the whole object, whose
+        children replace the current ones.
+        """
+        children, host, port = self.children, self.host, self.port
+        self.load_record(delta["object"])
+        self.host, self.port = host, port
+        records = delta["added"] + delta["changed"]
+        removed_paths = delta["removed"]
+        if delta.get("replace"):
+            records = delta["object"]["children"]
+            current = {record["path"] for record in records}
+            removed_paths = [child.path for child in children if child.path not in current]
+        by_path = {child.path: index for index, child in enumerate(children)}
+        added: List[WPObject] = []
+        changed: List[WPObject] = []
+        for record in records:
+            child = WPObject.from_record(record)
+            child.setHost(self.host)
+            child.setPort(self.port)
+            index = by_path.get(child.path)
+            if index is None:
+                by_path[child.path] = len(children)
+                children.append(child)
+                added.append(child)
+            else:
+                children[index] = child
+                changed.append(child)
+        removed = [path for path in removed_paths if path in by_path]
+        if removed:
+            gone = set(removed)
+            children = [child for child in children if child.path not in gone]
+        self.children = children
+        return added, changed, removed
+
+    def extend_children(self, parts: List["WPObject"]) -> List["WPObject"]:
+        """
+        Append children that arrived after the object (streamed chunks) and
+        pass the new ones on to open windows. Returns the children added.
+        """
+        known = {child.path for child in self.children}
+        added: List[WPObject] = []
+        for part in parts:
+            if part.path in known:
+                continue
+            part.setHost(self.host)
+            part.setPort(self.port)
+            known.add(part.path)
+            self.children.append(part)
+            added.append(part)
+        for on_delta in list(getattr(self, "_views", [])):
+            on_delta(added, [], [])
+        return added
+
+    def _subscribe(self, window, on_delta) -> None:
+        """Apply deltas pushed by the server while window is open, calling on_delta on the GUI thread."""
+        # Streamed children (extend_children) reach the window the same way
+        if not hasattr(self, "_views"):
+            self._views = []
+        self._views.append(on_delta)
+        window.destroyed.connect(lambda *_: self._views.remove(on_delta))
+        if self.host is None or self.port is None:
+            return
+        import threading
+        from PyQt5.QtCore import QObject, pyqtSignal
+        try:
+            from ObjectViewer.viewer import Subscription
+        except ImportError:
+            return
+
+        class _Bridge(QObject):
+            delta = pyqtSignal(object)
+
+        # Shares the viewer's connection to the server; only the thread below talks to it
+        subscription = Subscription(self.host, self.port, self.path, self.etag)
+        bridge = _Bridge(window)
+        bridge.delta.connect(lambda delta: on_delta(*self.apply_delta(delta)))
+
+        def _run():
+            try:
+                for delta in subscription:
+                    # New icon ids are fetched here rather than when the rows are painted
+                    records = delta["added"] + delta["changed"] + delta["object"].get("children", [])
+                    icons.prefetch(record["icon_id"] for record in records + [delta["object"]])
+                    bridge.delta.emit(delta)
+            except Exception as e:
+                if not subscription.closed:
+                    print(f"Live updates stopped: {e}")
+
+        threading.Thread(target=_run, daemon=True).start()
+        window.destroyed.connect(lambda *_: subscription.close())
+
+    def wp_open(self, view: str = None) -> Any:
         from PyQt5 import QtWidgets
-        from PyQt5.QtGui import QIcon, QPixmap, QPainter, QColor, QBrush, QFont, QFontMetrics
-        from PyQt5.QtCore import Qt, QRect
+        from PyQt5.QtGui import QIcon, QKeySequence
+        from .pixmap_cache import get_pixmap, WINDOW_ICON_SIZE
 
         app = QtWidgets.QApplication.instance()
         owns_app = False
@@ -54,9 +230,8 @@ class WPObject:
 
         # Set app icon same as wp_open
         try:
-            icon_bytes = base64.b64decode(self.icon)
-            pixmap = QPixmap()
-            if pixmap.loadFromData(icon_bytes, "PNG"):
+            pixmap = get_pixmap(self.icon_id, WINDOW_ICON_SIZE, "", window.devicePixelRatioF())
+            if pixmap is not None:
                 icon = QIcon(pixmap)
                 window.setWindowIcon(icon)
                 app.setWindowIcon(icon)
@@ -64,191 +239,48 @@ class WPObject:
             print(f"Failed to set window icon: {e}")
             pass
 
-        scroll = QtWidgets.QScrollArea()
-        container = QtWidgets.QWidget()
-        grid = QtWidgets.QGridLayout(container)
-        grid.setAlignment(Qt.AlignTop)
-
-        # Populate grid
-        col_count = 4
-        row = 0
-        col = 0
-        
-        # Styles for selection visuals
-        SELECTED_CELL_STYLE = (
-            "QFrame#cell { border: 2px solid #2D7CFF; border-radius: 8px; "
-            "background-color: rgba(45,124,255,0.08); } "
-            "QLabel { border: none; background: transparent; }"
-        )
-        UNSELECTED_CELL_STYLE = (
-            "QFrame#cell { border: 2px solid transparent; border-radius: 8px; } "
-            "QLabel { border: none; background: transparent; }"
-        )
-        TITLE_SELECTED_STYLE = "border: none; background: transparent; color: #2D7CFF;"
-        TITLE_UNSELECTED_STYLE = "border: none; background: transparent;"
-
-        # Manage single selection across all cells in the grid
-        selected_cell: Optional["_Clickable"] = None
-        def _set_selected_cell(new_cell):
-            nonlocal selected_cell
-            # Deselect previous cell if different
-            if selected_cell is not None and selected_cell is not new_cell:
-                selected_cell.setSelected(False)
-            selected_cell = new_cell
-            if new_cell is not None:
-                new_cell.setSelected(True)
-
-        class _Clickable(QtWidgets.QFrame):
-            def __init__(self, open_callback, select_callback):
-                super().__init__()
-                self._open_callback = open_callback
-                self._select_callback = select_callback
-                self._icon_label = None
-                self._title_label = None
-                self.setCursor(Qt.PointingHandCursor)
-                # Ensure stylesheet backgrounds/borders are painted on QWidget
-                self.setAttribute(Qt.WA_StyledBackground, True)
-                # Avoid focus outline that could look like a second border
-                self.setFocusPolicy(Qt.NoFocus)
-                # Give a predictable selector name for stylesheet scoping
-                self.setObjectName("cell")
-                # Start unselected
-                self.setSelected(False)
-            
-            def setContent(self, icon_label, title_label):
-                self._icon_label = icon_label
-                self._title_label = title_label
-            
-            def setSelected(self, is_selected: bool):
-                # Visual selection: single blue border around the whole cell and subtle blue background
-                if is_selected:
-                    self.setStyleSheet(SELECTED_CELL_STYLE)
-                    if self._title_label is not None:
-                        self._title_label.setStyleSheet(TITLE_SELECTED_STYLE)
-                else:
-                    self.setStyleSheet(UNSELECTED_CELL_STYLE)
-                    if self._title_label is not None:
-                        self._title_label.setStyleSheet(TITLE_UNSELECTED_STYLE)
-
-            def mousePressEvent(self, event):
-                # Single click selects this cell
-                if event.button() == Qt.LeftButton and callable(self._select_callback):
-                    self._select_callback(self)
-                super().mousePressEvent(event)
-
-            def mouseDoubleClickEvent(self, event):
-                if callable(self._open_callback):
-                    self._open_callback()
-                super().mouseDoubleClickEvent(event)
-
-        for part in self.children:
-            # Determine child path for launching viewer
-            child_path = getattr(part, "path")
-            def _launch_viewer(p=child_path):
-                try:
-                    import sys as _sys
-                    import subprocess as _sp
-                    _sp.Popen([
-                        _sys.executable,
-                        "-m", "ObjectViewer.viewer",
-                        "--obj", p,
-                        "--host", str(self.host),
-                        "--port", str(self.port),
-                    ], stdout=_sp.DEVNULL, stderr=_sp.DEVNULL, stdin=_sp.DEVNULL, close_fds=True)
-                except Exception as e:
-                    print(f"Failed to launch viewer: {e}")
-                    pass
-
-            cell = _Clickable(_launch_viewer, _set_selected_cell)
-            vbox = QtWidgets.QVBoxLayout(cell)
-            vbox.setAlignment(Qt.AlignHCenter | Qt.AlignTop)
-            vbox.setContentsMargins(8, 8, 8, 8)
-
-            icon_label = QtWidgets.QLabel()
-            icon_label.setFixedSize(96, 96)
-            icon_label.setAlignment(Qt.AlignCenter)
-            icon_label.setAttribute(Qt.WA_TransparentForMouseEvents, True)
-            icon_label.setStyleSheet("border: none; background: transparent;")
-
-            title = part
-            icon_b64 = self.icon
-            if part is not None:
-                if hasattr(part, "getTitle"):
-                    try:
-                        title = part.getTitle()
-                    except Exception:
-                        pass
-                if hasattr(part, "getIcon"):
-                    try:
-                        icon_b64 = part.getIcon()
-                    except Exception:
-                        pass
+        from .icon_view import ChildListModel, IconView
 
+        def _launch_viewer(part):
             try:
-                icon_bytes = base64.b64decode(icon_b64)
-                pixmap = QPixmap()
-                if pixmap.loadFromData(icon_bytes, "PNG"):
-                    scaled = pixmap.scaled(96, 96, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    # Draw badge with number of jobs if > 0
-                    if hasattr(part, "getBadge") and part.getBadge() != "":
-                        # Paint badge on a copy of the pixmap
-                        composed = QPixmap(scaled)
-                        painter = QPainter(composed)
-                        try:
-                            painter.setRenderHint(QPainter.Antialiasing, True)
-                            # Measure text and compute pill rect size
-                            text = str(part.getBadge())
-                            font = painter.font()
-                            font.setBold(True)
-                            painter.setFont(font)
-                            metrics = QFontMetrics(font)
-                            text_w = metrics.horizontalAdvance(text)
-                            text_h = metrics.height()
-                            pad_x = 8
-                            pad_y = 4
-                            rect_w = text_w + 2 * pad_x
-                            rect_h = text_h + 2 * pad_y
-                            x = composed.width() - rect_w - 4
-                            y = composed.height() - rect_h - 4
-                            radius = rect_h / 2.0
-                            # Draw red rounded rectangle
-                            painter.setBrush(QBrush(QColor(220, 0, 0)))
-                            painter.setPen(Qt.NoPen)
-                            painter.drawRoundedRect(QRect(x, y, rect_w, rect_h), radius, radius)
-                            # Draw white text centered
-                            painter.setPen(QColor(255, 255, 255))
-                            painter.drawText(QRect(x, y, rect_w, rect_h), Qt.AlignCenter, text)
-                        finally:
-                            painter.end()
-                        icon_label.setPixmap(composed)
-                    else:
-                        icon_label.setPixmap(scaled)
-            except Exception:
+                # Opens in-process when running inside the resident viewer
+                from ObjectViewer.daemon import launch
+                launch(part.path, self.host, self.port)
+            except Exception as e:
+                print(f"Failed to launch viewer: {e}")
                 pass
 
-            title_label = QtWidgets.QLabel(title)
-            title_label.setAlignment(Qt.AlignCenter)
-            title_label.setAttribute(Qt.WA_TransparentForMouseEvents, True)
-            title_label.setStyleSheet("border: none; background: transparent;")
-
-            cell.setContent(icon_label, title_label)
+        model = ChildListModel(self.children)
+        icon_view = IconView(model, _launch_viewer)
+        model.setParent(icon_view)
 
-            vbox.addWidget(icon_label)
-            vbox.addWidget(title_label)
+        # How old the server's data is, for servers answering from a polled snapshot
+        def _show_as_of():
+            if self.as_of is not None:
+                import time
+                window.statusBar().showMessage("As of " + time.strftime("%H:%M:%S", time.localtime(self.as_of)))
 
-            grid.addWidget(cell, row, col)
-            col += 1
-            if col >= col_count:
-                col = 0
-                row += 1
+        # Live updates pushed by the server: only the affected rows change
+        def _apply_delta(added, changed, removed):
+            model.applyDelta(added, changed, removed)
+            window.setWindowTitle(self.title)
+            _show_as_of()
 
-        container.setLayout(grid)
-        scroll.setWidget(container)
-        scroll.setWidgetResizable(True)
+        window.setCentralWidget(icon_view)
+        # F5 asks the server to poll Slurm now; the subscription brings in the result
+        def _refresh():
+            if self.host is None or self.port is None:
+                return
+            import threading
+            from ObjectViewer.viewer import refresh_object
+            threading.Thread(target=refresh_object, args=(self.host, self.port, self.path), daemon=True).start()
 
-        window.setCentralWidget(scroll)
+        QtWidgets.QShortcut(QKeySequence(QKeySequence.Refresh), window, _refresh)
         window.resize(640, 480)
+        _show_as_of()
         window.show()
+        self._subscribe(window, _apply_delta)
 
         if owns_app:
             app.exec_()
+        return window
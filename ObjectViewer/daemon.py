@@ -0,0 +1,214 @@
+import fcntl
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from ObjectRuntime import icons
+from ObjectViewer.viewer import cached_icon, fetch_icon, spawn_detached, _servers
+
+
+# Exit after this long without any open window
+IDLE_TIMEOUT = 600.0
+
+
+def socket_path() -> str:
+    """Per-user path of the daemon's local socket."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"objectviewer-{os.getuid()}.sock")
+
+
+def forward(request: Dict[str, Any], timeout: float = 5.0) -> bool:
+    """Hand request to a running daemon; False if none is listening."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path())
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            return sock.recv(16).startswith(b"ok")
+    except OSError:
+        return False
+
+
+def check_request(request: Any) -> Dict[str, Any]:
+    """The window request with its port as an int; ValueError if it is not one."""
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object")
+    object_path, host, view = request.get("object"), request.get("host"), request.get("view")
+    if not isinstance(object_path, str) or not object_path.startswith("/"):
+        raise ValueError(f"Bad object path: {object_path!r}")
+    if not isinstance(host, str) or not host:
+        raise ValueError(f"Bad host: {host!r}")
+    if view is not None and not isinstance(view, str):
+        raise ValueError(f"Bad view: {view!r}")
+    port = request.get("port", 9100)
+    if isinstance(port, str) and port.isdigit():
+        port = int(port)
+    if isinstance(port, bool) or not isinstance(port, int) or not 0 < port < 65536:
+        raise ValueError(f"Bad port: {port!r}")
+    return {"object": object_path, "host": host, "port": port, "view": view}
+
+
+_daemon: Optional["ViewerDaemon"] = None
+
+
+def launch(object_path: str, host: str, port: int, view: Optional[str] = None) -> None:
+    """
+    Open a window for object_path: in this process when it is the daemon,
+    otherwise through a running daemon, otherwise by starting the CLI.
+    """
+    request = {"object": object_path, "host": host, "port": int(port), "view": view}
+    if _daemon is not None:
+        _daemon.handle(request)
+        return
+    if forward(request):
+        return
+    subprocess.Popen([
+        sys.executable,
+        "-m", "ObjectViewer.viewer",
+        "--object", object_path,
+        "--host", str(host),
+        "--port", str(port),
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL, close_fds=True)
+
+
+def _fetch_icon_from_any_server(icon_id: str) -> str:
+    # Icon ids are content hashes, so any server we talk to that has the icon will do
+    icon = cached_icon(icon_id)
+    if icon is not None:
+        return icon
+    error: Optional[Exception] = None
+    for host, port in list(_servers):
+        try:
+            return fetch_icon(host, port, icon_id)
+        except Exception as exc:
+            error = exc
+    raise KeyError(f"Unknown icon: {icon_id}") from error
+
+
+class ViewerDaemon:
+    """
+    Resident viewer process: one QApplication and one connection per server.
+
+    New windows are requested over a local socket (one JSON request per
+    connection), so opening an object costs a fetch instead of an
+    interpreter start, a PyQt import and a new QApplication.
+    """
+
+    def __init__(self) -> None:
+        from PyQt5 import QtWidgets
+        from PyQt5.QtCore import QTimer
+        from PyQt5.QtNetwork import QLocalServer
+
+        self.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+        self.app.setQuitOnLastWindowClosed(False)
+        self.windows: List[Any] = []
+        self.idle_since = time.monotonic()
+
+        QLocalServer.removeServer(socket_path())
+        self.server = QLocalServer()
+        if not self.server.listen(socket_path()):
+            raise RuntimeError(f"Failed to listen on {socket_path()}: {self.server.errorString()}")
+        self.server.newConnection.connect(self._accept)
+
+        self.idle_timer = QTimer()
+        self.idle_timer.timeout.connect(self._check_idle)
+        self.idle_timer.start(10000)
+        icons.set_fetcher(_fetch_icon_from_any_server)
+
+    def _accept(self) -> None:
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            buffer = bytearray()
+
+            def _read(connection=connection, buffer=buffer):
+                buffer.extend(bytes(connection.readAll()))
+                if b"\n" not in buffer:
+                    return
+                try:
+                    request = json.loads(buffer.split(b"\n", 1)[0].decode("utf-8"))
+                except ValueError as exc:
+                    print(f"Bad viewer request: {exc}")
+                    request = None
+                connection.write(b"ok\n" if request is not None and self.handle(request) else b"error\n")
+                connection.flush()
+                connection.disconnectFromServer()
+
+            connection.readyRead.connect(_read)
+            connection.disconnected.connect(connection.deleteLater)
+
+    def handle(self, request: Any) -> bool:
+        """
+        Check and open request; False if it was refused or failed. Runs in Qt
+        slots, where an exception would abort the daemon and all its windows.
+        """
+        try:
+            self.open(check_request(request))
+        except Exception as exc:
+            print(f"Failed to open {request!r}: {exc}")
+            return False
+        return True
+
+    def open(self, request: Dict[str, Any]) -> None:
+        from ObjectViewer.loader import open_object
+
+        # The window shows up at once and fills in while the object streams in
+        open_object(request["host"], request["port"], request["object"], request.get("view"), self._track)
+
+    def _track(self, window: Any) -> None:
+        from PyQt5.QtCore import Qt
+
+        window.setAttribute(Qt.WA_DeleteOnClose, True)
+        self.windows.append(window)
+        window.destroyed.connect(lambda *_, w=window: self._closed(w))
+        window.raise_()
+        window.activateWindow()
+
+    def _closed(self, window: Any) -> None:
+        if window in self.windows:
+            self.windows.remove(window)
+        if not self.windows:
+            self.idle_since = time.monotonic()
+
+    def _check_idle(self) -> None:
+        if not self.windows and time.monotonic() - self.idle_since > IDLE_TIMEOUT:
+            self.server.close()
+            self.app.quit()
+
+    def run(self) -> None:
+        self.app.exec_()
+
+
+def run_daemon(request: Dict[str, Any]) -> None:
+    """Become the daemon and open request, unless another daemon is already starting up."""
+    global _daemon
+    lock = open(socket_path() + ".lock", "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        # Lost the race to another process; give it a moment to start listening
+        for _ in range(50):
+            if forward(request):
+                return
+            time.sleep(0.1)
+        print("Viewer daemon is not responding")
+        return
+    try:
+        _daemon = ViewerDaemon()
+        _daemon.handle(request)
+        _daemon.run()
+    finally:
+        _daemon = None
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
+
+
+def start(request: Dict[str, Any]) -> None:
+    """Forward request to the running daemon, starting a detached one if needed."""
+    if forward(request):
+        return
+    spawn_detached(lambda: run_daemon(request))
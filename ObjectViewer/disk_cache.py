@@ -0,0 +1,290 @@
+"""
+Persistent client-side cache of reply frames and icons.
+
+Lives in $XDG_CACHE_HOME/objectruntime (~/.cache/objectruntime) and is
+shared by every viewer process of the user. Each entry is one file under
+entries/, named after a hash of its key and holding the etag and frames
+the object last arrived with. A memory-mapped index (a fixed-size hash
+table of key hash, last use and size) tells whether an entry exists, how
+big the cache is and which entries were used least recently, without
+listing or stat-ing the entries directory.
+
+Processes coordinate through flock on the lock file: lookups take it
+shared, changes exclusive. Entry files are written to a temporary file
+and renamed into place, so a reader never sees half an entry; temporary
+files left by a process that died mid-write are swept when the cache is
+opened and when it evicts. When the entries outgrow max_bytes (or the
+index fills up) the least recently used ones are removed.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+MAGIC = b"ORC1"
+# Magic, slot count, entry count, total size of all entries
+INDEX_HEADER = struct.Struct("!4sIIQ")
+# Key hash (all zero for a free slot), last use, size
+SLOT = struct.Struct("!20sdQ")
+SLOTS = 8192
+# Evict down to this fraction of max_bytes / of the slots, so not every put evicts
+LOW_WATER = 0.9
+MAX_FILL = 0.75
+# Temporary entry files older than this were left by a process that died mid-put
+STALE_TEMP_AGE = 600.0
+
+_FREE = bytes(20)
+_LENGTH = struct.Struct("!I")
+
+
+def cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "objectruntime")
+
+
+def _digest(key: Tuple) -> bytes:
+    return hashlib.sha1(repr(key).encode("utf-8")).digest()
+
+
+class DiskCache:
+    """
+    Size-bounded store of (etag, frames) by key, safe to use from several
+    threads and several processes at once. Any error reading or writing the
+    cache directory disables the cache for this process instead of failing
+    the viewer.
+    """
+    max_bytes: int
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.directory = directory or cache_dir()
+        self.max_bytes = max_bytes
+        self._entries_dir = os.path.join(self.directory, "entries")
+        self._index: Optional[mmap.mmap] = None
+        self._lock_file = None
+        self._disabled = False
+        # flock locks belong to the open file, not the thread; this serializes threads
+        self._lock = threading.Lock()
+
+    # Locking and the index
+
+    def _open(self) -> bool:
+        if self._index is not None:
+            return True
+        if self._disabled:
+            return False
+        try:
+            os.makedirs(self._entries_dir, exist_ok=True)
+            self._lock_file = open(os.path.join(self.directory, "lock"), "a+b")
+            size = INDEX_HEADER.size + SLOTS * SLOT.size
+            fd = os.open(os.path.join(self.directory, "index"), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(fd).st_size != size:
+                        os.ftruncate(fd, size)
+                    self._index = mmap.mmap(fd, size)
+                    magic, slots, _, _ = INDEX_HEADER.unpack_from(self._index, 0)
+                    if magic != MAGIC or slots != SLOTS:
+                        self._reset()
+                    else:
+                        self._sweep_temp()
+                finally:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        except (OSError, ValueError) as exc:
+            self._fail(exc)
+            return False
+        return True
+
+    def _fail(self, exc: Exception) -> None:
+        print(f"Disk cache disabled: {exc}")
+        self._disabled = True
+        self._index = None
+
+    def _reset(self) -> None:
+        """Start over with an empty index, dropping entries it no longer knows about."""
+        index = self._index
+        index[:] = bytes(len(index))
+        INDEX_HEADER.pack_into(index, 0, MAGIC, SLOTS, 0, 0)
+        for name in os.listdir(self._entries_dir):
+            try:
+                os.unlink(os.path.join(self._entries_dir, name))
+            except OSError:
+                pass
+
+    def _sweep_temp(self) -> None:
+        """Remove temporary files of puts that never finished; they are not counted in the index."""
+        cutoff = time.time() - STALE_TEMP_AGE
+        for name in os.listdir(self._entries_dir):
+            if not name.startswith(".tmp"):
+                continue
+            path = os.path.join(self._entries_dir, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    def _usage(self) -> Tuple[int, int]:
+        """Number of entries and their total size."""
+        return INDEX_HEADER.unpack_from(self._index, 0)[2:]
+
+    def _set_usage(self, count: int, total: int) -> None:
+        INDEX_HEADER.pack_into(self._index, 0, MAGIC, SLOTS, max(count, 0), max(total, 0))
+
+    def _find(self, digest: bytes) -> Tuple[int, bool]:
+        """(offset of digest's slot, True) or (offset of the free slot it would go in, False)."""
+        slot = int.from_bytes(digest[:4], "big") % SLOTS
+        for _ in range(SLOTS):
+            offset = INDEX_HEADER.size + slot * SLOT.size
+            stored = self._index[offset:offset + 20]
+            if stored == digest:
+                return offset, True
+            if stored == _FREE:
+                return offset, False
+            slot = (slot + 1) % SLOTS
+        return -1, False
+
+    def _slots(self) -> List[Tuple[bytes, float, int]]:
+        slots = []
+        for slot in range(SLOTS):
+            digest, used, size = SLOT.unpack_from(self._index, INDEX_HEADER.size + slot * SLOT.size)
+            if digest != _FREE:
+                slots.append((digest, used, size))
+        return slots
+
+    def _path(self, digest: bytes) -> str:
+        return os.path.join(self._entries_dir, digest.hex())
+
+    def _evict(self, incoming: int) -> None:
+        """Drop least recently used entries until incoming bytes and one more slot fit."""
+        count, total = self._usage()
+        if total + incoming <= self.max_bytes and count < SLOTS * MAX_FILL:
+            return
+        self._sweep_temp()
+        slots = self._slots()
+        slots.sort(key=lambda slot: slot[1])
+        keep_bytes = self.max_bytes * LOW_WATER - incoming
+        keep_slots = int(SLOTS * MAX_FILL * LOW_WATER)
+        while slots and (total > keep_bytes or len(slots) > keep_slots):
+            digest, _, size = slots.pop(0)
+            total -= size
+            try:
+                os.unlink(self._path(digest))
+            except OSError:
+                pass
+        # Linear probing cannot simply free a slot, so rebuild the table from what is left
+        self._index[INDEX_HEADER.size:] = bytes(SLOTS * SLOT.size)
+        for digest, used, size in slots:
+            offset, _ = self._find(digest)
+            SLOT.pack_into(self._index, offset, digest, used, size)
+        self._set_usage(len(slots), sum(size for _, _, size in slots))
+
+    # Entries
+
+    def get(self, key: Tuple) -> Optional[Tuple[str, List[bytes]]]:
+        """The etag and frames stored for key, or None."""
+        digest = _digest(key)
+        with self._lock:
+            if not self._open():
+                return None
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_SH)
+                try:
+                    offset, found = self._find(digest)
+                    if not found:
+                        return None
+                    with open(self._path(digest), "rb") as f:
+                        data = f.read()
+                    # Racing another reader's update of the same timestamp is harmless
+                    self._index[offset + 20:offset + 28] = struct.pack("!d", time.time())
+                finally:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            except FileNotFoundError:
+                return None
+            except (OSError, ValueError) as exc:
+                self._fail(exc)
+                return None
+        try:
+            return _decode_entry(data)
+        except (struct.error, UnicodeDecodeError, ValueError):
+            return None
+
+    def put(self, key: Tuple, etag: str, frames: List[bytes]) -> None:
+        data = _encode_entry(etag, frames)
+        if len(data) > self.max_bytes * LOW_WATER:
+            return
+        digest = _digest(key)
+        with self._lock:
+            if not self._open():
+                return
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=self._entries_dir, prefix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(data)
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                    try:
+                        self._evict(len(data))
+                        os.replace(temp_path, self._path(digest))
+                        offset, found = self._find(digest)
+                        previous = SLOT.unpack_from(self._index, offset)[2] if found else 0
+                        SLOT.pack_into(self._index, offset, digest, time.time(), len(data))
+                        count, total = self._usage()
+                        self._set_usage(count + (not found), total - previous + len(data))
+                    finally:
+                        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.unlink(temp_path)
+            except (OSError, ValueError) as exc:
+                self._fail(exc)
+
+    # Icons are keyed by their content hash, so an entry never goes stale
+
+    def get_icon(self, icon_id: str) -> Optional[str]:
+        entry = self.get(("icon", icon_id))
+        if entry is None or not entry[1]:
+            return None
+        return entry[1][0].decode("ascii")
+
+    def put_icon(self, icon_id: str, icon: str) -> None:
+        self.put(("icon", icon_id), "", [icon.encode("ascii")])
+
+    def size(self) -> int:
+        """Total bytes of all entries."""
+        with self._lock:
+            if not self._open():
+                return 0
+            return self._usage()[1]
+
+
+def _encode_entry(etag: str, frames: List[bytes]) -> bytes:
+    etag_bytes = etag.encode("utf-8")
+    parts = [_LENGTH.pack(len(etag_bytes)), etag_bytes]
+    for frame in frames:
+        parts.append(_LENGTH.pack(len(frame)))
+        parts.append(bytes(frame))
+    return b"".join(parts)
+
+
+def _decode_entry(data: bytes) -> Tuple[str, List[bytes]]:
+    (length,) = _LENGTH.unpack_from(data, 0)
+    position = _LENGTH.size + length
+    etag = data[_LENGTH.size:position].decode("utf-8")
+    frames = []
+    while position < len(data):
+        (length,) = _LENGTH.unpack_from(data, position)
+        position += _LENGTH.size
+        if position + length > len(data):
+            raise ValueError("Truncated cache entry")
+        frames.append(data[position:position + length])
+        position += length
+    return etag, frames
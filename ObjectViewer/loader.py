@@ -0,0 +1,173 @@
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
+
+from ObjectRuntime import icons
+from ObjectViewer.viewer import cached_entry, iter_cached, iter_object
+
+
+def _prefetch_icons(item: Any) -> None:
+    """Fetch the icons of an object (and its children) or a chunk of children, on the fetch thread."""
+    parts = item if isinstance(item, list) else [item] + list(item.children)
+    icons.prefetch(part.icon_id for part in parts)
+
+
+class _Bridge(QObject):
+    """Carries results from the fetch thread to the GUI thread."""
+    header = pyqtSignal(object)
+    cached = pyqtSignal(object)
+    chunk = pyqtSignal(object)
+    unchanged = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+
+def open_object(host: str, port: int, object_path: str, view: Optional[str] = None, on_window: Optional[Callable[[Any], None]] = None) -> Any:
+    """
+    Show a placeholder window for object_path at once and load the object in the background.
+
+    Everything runs on a worker thread, including fetching icons the
+    process does not have yet, before the objects using them are handed to
+    the GUI. If a copy of the object is cached
+    (in memory, or on disk from an earlier viewer process) it is decoded
+    first and replaces the placeholder right away. Then the object is
+    streamed from the server, revalidating any cached copy: when the server
+    reports it unchanged only the window's "As of" time is updated.
+    Otherwise the window is replaced by a new one as soon as the object's
+    header arrives, and children are added to it chunk by chunk as they
+    come in. Closing the window before the stream ends stops the load.
+    on_window is called with every window this opens. Returns the placeholder.
+    """
+    placeholder = QtWidgets.QMainWindow()
+    placeholder.setWindowTitle(object_path)
+    label = QtWidgets.QLabel(f"Loading {object_path}…")
+    label.setAlignment(Qt.AlignCenter)
+    label.setWordWrap(True)
+    placeholder.setCentralWidget(label)
+    placeholder.resize(640, 480)
+
+    cancelled = threading.Event()
+    # cached: etag of the cached copy the window shows, until a fresh one replaces it
+    state: Dict[str, Any] = {"window": None, "object": None, "cached": None}
+    bridge = _Bridge(QtWidgets.QApplication.instance())
+
+    def _closed(window):
+        # Windows this replaced itself are no longer current when they go
+        if state["window"] is window:
+            state["window"] = None
+            cancelled.set()
+
+    def _show(window):
+        window.setAttribute(Qt.WA_DeleteOnClose, True)
+        window.destroyed.connect(lambda *_, w=window: _closed(w))
+        state["window"] = window
+        if on_window is not None:
+            on_window(window)
+
+    def _on_header(obj):
+        old = state["window"]
+        if old is None or not old.isVisible():
+            # Closed while loading, but not deleted yet
+            cancelled.set()
+            return
+        state["object"] = obj
+        state["cached"] = None
+        obj.setHost(host)
+        obj.setPort(port)
+        try:
+            window = obj.wp_open(view)
+        except Exception as exc:
+            cancelled.set()
+            _on_failed(str(exc))
+            return
+        if window is None:
+            cancelled.set()
+            state["window"] = None
+        else:
+            window.move(old.pos())
+            _show(window)
+        old.close()
+
+    def _on_cached(obj):
+        _on_header(obj)
+        if state["object"] is obj and state["window"] is not None:
+            state["cached"] = obj.etag
+
+    def _on_chunk(parts):
+        if not cancelled.is_set():
+            state["object"].extend_children(parts)
+
+    def _on_unchanged(fresh):
+        obj = state["object"]
+        if obj is not None and not cancelled.is_set():
+            obj.as_of, obj.etag = fresh.as_of, fresh.etag
+            # No new children, but open windows redraw their status bar
+            obj.extend_children([])
+
+    def _on_failed(message):
+        print(f"Failed to open {object_path}: {message}")
+        window = state["window"]
+        if window is not None and state["object"] is None:
+            label.setText(f"Failed to open {object_path}:\n{message}")
+        elif window is not None and state["cached"] is not None:
+            # Still showing the cached copy; keep it
+            window.statusBar().showMessage(f"Cached copy, could not reach the server: {message}")
+        else:
+            # Not modal: other windows keep updating while this is shown
+            box = QtWidgets.QMessageBox(QtWidgets.QMessageBox.Warning, "Object Viewer", f"Loading {object_path} stopped:\n{message}")
+            box.setAttribute(Qt.WA_DeleteOnClose, True)
+            box.show()
+
+    bridge.header.connect(_on_header)
+    bridge.cached.connect(_on_cached)
+    bridge.chunk.connect(_on_chunk)
+    bridge.unchanged.connect(_on_unchanged)
+    bridge.failed.connect(_on_failed)
+    bridge.finished.connect(bridge.deleteLater)
+
+    def _run():
+        items = None
+        try:
+            entry = cached_entry(host, port, object_path)
+            if entry is not None:
+                try:
+                    for item in iter_cached(entry):
+                        if cancelled.is_set():
+                            return
+                        _prefetch_icons(item)
+                        if isinstance(item, list):
+                            bridge.chunk.emit(item)
+                        else:
+                            bridge.cached.emit(item)
+                except Exception as exc:
+                    print(f"Ignoring unreadable cache entry for {object_path}: {exc}")
+                    entry = None
+            # Signals arrive in order, so the GUI has the cached copy before anything below
+            items = iter_object(host, port, object_path, cached=entry)
+            for item in items:
+                if cancelled.is_set():
+                    break
+                _prefetch_icons(item)
+                if isinstance(item, list):
+                    bridge.chunk.emit(item)
+                elif entry is not None and item.etag == entry[0]:
+                    # The window already shows this; the rest would be the same children again
+                    bridge.unchanged.emit(item)
+                    break
+                else:
+                    bridge.header.emit(item)
+        except Exception as exc:
+            if not cancelled.is_set():
+                bridge.failed.emit(str(exc))
+        finally:
+            if items is not None:
+                # Drops any frames the server still sends for this request
+                items.close()
+            bridge.finished.emit()
+
+    placeholder.show()
+    _show(placeholder)
+    threading.Thread(target=_run, name=f"load {object_path}", daemon=True).start()
+    return placeholder
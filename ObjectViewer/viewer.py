@@ -1,37 +1,26 @@
 import argparse
 import sys
 import os
+import select
 import socket
 import json
-import struct
-from typing import Any
+import threading
+import time
+import collections
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
 
-try:
-    import dill as pickle
-except Exception:  # pragma: no cover
-    import pickle  # type: ignore
+from ObjectRuntime import compression
+from ObjectRuntime import framing
+from ObjectRuntime import icons
+from ObjectRuntime import wire
+from ObjectRuntime.wp_object import WPObject
+from ObjectViewer.disk_cache import DiskCache
+# Imported for their side effect of registering the object types the server may send
+from ObjectRuntime import slurm_batch_system, slurm_partition, slurm_job  # noqa: F401
 
 
-def recv_all(connection: socket.socket, num_bytes: int) -> bytes:
-    data = bytearray()
-    while len(data) < num_bytes:
-        chunk = connection.recv(num_bytes - len(data))
-        if not chunk:
-            raise ConnectionError("Connection closed while receiving data")
-        data.extend(chunk)
-    return bytes(data)
-
-
-def read_message(connection: socket.socket) -> bytes:
-    header = recv_all(connection, 4)
-    (length,) = struct.unpack("!I", header)
-    if length > 128 * 1024 * 1024:
-        raise ValueError("Message too large")
-    return recv_all(connection, length)
-
-
-def write_message(connection: socket.socket, payload: bytes) -> None:
-    connection.sendall(struct.pack("!I", len(payload)) + payload)
+class ServerError(RuntimeError):
+    """Error reported by the server in place of a reply."""
 
 
 def spawn_detached(func) -> None:
@@ -50,13 +39,470 @@ def spawn_detached(func) -> None:
     finally:
         os._exit(0)
 
+
+def decode_object(payload: bytes) -> Any:
+    """Turn a wire-format GetObject reply into a WPObject, or an {"error": ...} dict."""
+    kind, value = wire.decode(payload)
+    if kind == wire.KIND_ERROR:
+        return {"error": value}
+    if kind != wire.KIND_OBJECT:
+        raise ValueError(f"Unexpected reply kind {kind}")
+    return WPObject.from_record(value)
+
+
+class ServerConnection:
+    """
+    Keep-alive connection to an ObjectRuntime server.
+
+    Every request is tagged with an id and its replies come back in frames
+    tagged with the same id, so several threads can pipeline requests over
+    the one connection: frames read on behalf of another request are parked
+    until that request asks for them. One waiting thread at a time reads
+    from the socket, without holding the lock, so sending never waits for
+    another request's reply.
+    """
+    host: str
+    port: int
+
+    def __init__(self, host: str, port: int, timeout: float = 10, compress: bool = True) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        # Codecs offered to the server for large replies, preferred first
+        self.codecs = compression.available() if compress else []
+        self._sock: Optional[socket.socket] = None
+        self._next_id = 1
+        self._pending: Dict[int, Deque[bytearray]] = {}
+        self._lock = threading.Lock()
+        # Signalled whenever frames were parked or the reading thread is done
+        self._frames = threading.Condition(self._lock)
+        self._reading = False
+
+    def send(self, message: dict) -> int:
+        """Send a request and return its id."""
+        with self._lock:
+            request_id = self._next_id
+            self._next_id = (self._next_id + 1) & 0xFFFFFFFF or 1
+            message = dict(message, id=request_id)
+            if self.codecs:
+                message["compress"] = self.codecs
+            data = json.dumps(message).encode("utf-8")
+            for attempt in range(2):
+                if self._sock is None:
+                    self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                    self._pending.clear()
+                try:
+                    framing.write_frame(self._sock, data)
+                    break
+                except OSError:
+                    # The server may have dropped an idle connection; reconnect once
+                    self._drop()
+                    if attempt:
+                        raise
+            self._pending[request_id] = collections.deque()
+            return request_id
+
+    def read(self, request_id: int, wait: bool = False) -> bytearray:
+        """
+        Return the next reply frame for request_id.
+
+        With wait the frame may be any time coming (subscription deltas):
+        an idle connection is then not taken for a broken one, and the
+        thread keeps waiting until the frame arrives or finish() is called.
+        """
+        deadline = None if wait or self.timeout is None else time.monotonic() + self.timeout
+        with self._lock:
+            while True:
+                queue = self._pending.get(request_id)
+                if queue is None:
+                    raise ConnectionError("Connection lost before the reply arrived")
+                if queue:
+                    return queue.popleft()
+                if self._reading:
+                    # Another thread is reading; it parks our frames and wakes us
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise socket.timeout("timed out")
+                    self._frames.wait(remaining)
+                    continue
+                self._reading = True
+                sock = self._sock
+                self._lock.release()
+                frame = None
+                try:
+                    # A waiting reader gives up the socket now and then, so
+                    # requests with a deadline get their turn to time out
+                    if not wait or select.select([sock], [], [], self.timeout)[0]:
+                        frame = framing.read_frame(sock)
+                except BaseException:
+                    self._lock.acquire()
+                    self._reading = False
+                    self._frames.notify_all()
+                    if self._sock is sock:
+                        self._drop()
+                    raise
+                self._lock.acquire()
+                self._reading = False
+                self._frames.notify_all()
+                if frame is None:
+                    continue
+                (frame_id,) = framing.HEADER.unpack_from(frame)
+                if frame_id in self._pending:
+                    # Dropping the id from the front of a bytearray does not copy the payload
+                    del frame[:framing.HEADER.size]
+                    self._pending[frame_id].append(frame)
+
+    def finish(self, request_id: int) -> None:
+        """Forget request_id; any frames still arriving for it are dropped."""
+        with self._lock:
+            self._pending.pop(request_id, None)
+            # Wakes a thread still waiting in read(request_id, wait=True)
+            self._frames.notify_all()
+
+    def request(self, message: dict) -> bytes:
+        """Send a request that has a single reply frame and return it."""
+        request_id = self.send(message)
+        try:
+            return self.read(request_id)
+        finally:
+            self.finish(request_id)
+
+    def _drop(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._pending.clear()
+        self._frames.notify_all()
+
+    def close(self) -> None:
+        with self._lock:
+            self._drop()
+
+
+_servers: Dict[Tuple[str, int], ServerConnection] = {}
+_servers_lock = threading.Lock()
+
+
+def get_server(host: str, port: int) -> ServerConnection:
+    """Return the shared keep-alive connection to host:port."""
+    with _servers_lock:
+        server = _servers.get((host, port))
+        if server is None:
+            server = ServerConnection(host, port)
+            _servers[(host, port)] = server
+        return server
+
+
+class ResponseCache:
+    """
+    Reply frames of recently streamed objects, keyed by server, path and
+    page, with the etag the server sent them with. The next request for the
+    same object carries if_none_match, and a NotModified reply is answered
+    from here instead of downloading the object again. With a disk cache,
+    entries are also kept there, so they outlive the process.
+    """
+    max_bytes: int
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, disk: Optional[DiskCache] = None) -> None:
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self._entries: "collections.OrderedDict[Tuple, Tuple[str, List[bytes], int]]" = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Tuple[str, List[bytes]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0], entry[1]
+        if self.disk is None:
+            return None
+        stored = self.disk.get(key)
+        if stored is not None:
+            self._remember(key, *stored)
+        return stored
+
+    def put(self, key: Tuple, etag: str, frames: List[bytes]) -> None:
+        self._remember(key, etag, frames)
+        if self.disk is not None:
+            self.disk.put(key, etag, frames)
+
+    def _remember(self, key: Tuple, etag: str, frames: List[bytes]) -> None:
+        size = sum(len(frame) for frame in frames)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[2]
+            self._entries[key] = (etag, frames, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+response_cache = ResponseCache(disk=DiskCache())
+
+
+def _replay(frames: List[bytes], meta: Optional[Dict[str, str]] = None) -> Iterator[Any]:
+    """
+    Yield what iter_object yielded for frames, with the object's metadata
+    from a NotModified reply if given (otherwise as stored).
+    """
+    for frame in frames:
+        kind, value = wire.decode(frame)
+        if kind == wire.KIND_OBJECT:
+            obj = WPObject.from_record(value)
+            if meta is not None:
+                obj.load_meta(meta)
+            yield obj
+        elif kind == wire.KIND_CHILDREN:
+            yield [WPObject.from_record(record) for record in value]
+
+
+def iter_object(host: str, port: int, object_path: str, offset: int = 0, limit: Optional[int] = None,
+                cached: Optional[Tuple[str, List[bytes]]] = None) -> Iterator[Any]:
+    """
+    Stream an object from the server.
+
+    Yields the object itself (without children) as soon as its header
+    arrives, then one list of child objects per chunk the server sends.
+    An object the server reports unchanged since the last time it was
+    streamed is replayed from response_cache; callers that already looked
+    up its cached_entry pass it as cached.
+    """
+    server = get_server(host, port)
+    request = {"action": "GetObject", "path": object_path, "format": "wire", "stream": True, "offset": offset}
+    if limit is not None:
+        request["limit"] = limit
+    key = (host, port, object_path, offset, limit)
+    if cached is None:
+        cached = response_cache.get(key)
+    if cached is not None:
+        request["if_none_match"] = cached[0]
+    request_id = server.send(request)
+    frames: List[bytes] = []
+    etag = None
+    try:
+        while True:
+            frame = server.read(request_id)
+            kind, value = wire.decode(frame)
+            if kind == wire.KIND_NOT_MODIFIED and cached is not None:
+                yield from _replay(cached[1], value)
+                return
+            if kind == wire.KIND_ERROR:
+                raise ServerError(value)
+            if kind == wire.KIND_END:
+                if etag is not None:
+                    response_cache.put(key, etag, frames)
+                return
+            frames.append(frame)
+            if kind == wire.KIND_OBJECT:
+                etag = value.get("meta", {}).get("etag")
+                yield WPObject.from_record(value)
+            elif kind == wire.KIND_CHILDREN:
+                yield [WPObject.from_record(record) for record in value]
+            else:
+                raise ValueError(f"Unexpected reply kind {kind}")
+    finally:
+        server.finish(request_id)
+
+
+def cached_entry(host: str, port: int, object_path: str, offset: int = 0, limit: Optional[int] = None) -> Optional[Tuple[str, List[bytes]]]:
+    """
+    The etag and reply frames object_path was last streamed with (by this
+    process or, through the disk cache, an earlier one), or None.
+    """
+    return response_cache.get((host, port, object_path, offset, limit))
+
+
+def iter_cached(entry: Tuple[str, List[bytes]]) -> Iterator[Any]:
+    """Yield what iter_object yielded for a cached_entry, with the as_of and etag it was sent with."""
+    return _replay(entry[1])
+
+
 def fetch_object(host: str, port: int, object_path: str) -> Any:
-    with socket.create_connection((host, port), timeout=10) as sock:
-        request = {"action": "GetObject", "path": object_path}
-        write_message(sock, json.dumps(request).encode("utf-8"))
-        payload = read_message(sock)
-        obj = pickle.loads(payload)
-        return obj
+    obj = None
+    try:
+        for item in iter_object(host, port, object_path):
+            if obj is None:
+                obj = item
+            else:
+                obj.children.extend(item)
+    except ServerError as exc:
+        return {"error": str(exc)}
+    return obj
+
+
+def fetch_objects(host: str, port: int, paths: List[str], known: Optional[Dict[str, WPObject]] = None) -> Dict[str, Any]:
+    """
+    Fetch several objects in one request. paths may contain globs such as
+    /Slurm/Quartz/*; returns path -> WPObject, or {"error": ...} for paths
+    that failed. Objects in known (e.g. the previous result) that have not
+    changed are not sent again; they are returned as they are.
+    """
+    request: Dict[str, Any] = {"action": "GetObjects", "paths": paths, "format": "wire"}
+    if known:
+        request["if_none_match"] = {path: obj.etag for path, obj in known.items() if isinstance(obj, WPObject) and obj.etag}
+    payload = get_server(host, port).request(request)
+    kind, value = wire.decode(payload)
+    if kind == wire.KIND_ERROR:
+        raise ServerError(value)
+    if kind != wire.KIND_OBJECTS:
+        raise ValueError(f"Unexpected reply kind {kind}")
+    result: Dict[str, Any] = {}
+    for path, (item_kind, item) in value:
+        if item_kind == wire.KIND_ERROR:
+            result[path] = {"error": item}
+        elif item_kind == wire.KIND_NOT_MODIFIED and known and path in known:
+            result[path] = known[path]
+            result[path].load_meta(item)
+        else:
+            result[path] = WPObject.from_record(item)
+    return result
+
+
+# Seconds before a broken subscription is retried, doubling up to the maximum
+RESUBSCRIBE_DELAY = 1.0
+MAX_RESUBSCRIBE_DELAY = 60.0
+
+
+class Subscription:
+    """
+    Live updates for one object, over the shared connection to its server.
+
+    Creating one does no network I/O; iterating (on a worker thread) yields one delta dict (see wire.KIND_DELTA) per change the
+    server pushes, until close() is called from another thread. When the
+    subscription breaks (server restart, lost connection) it is renewed
+    with the etag of the last state received, and the first delta after
+    that brings the object up to date.
+    """
+    closed: bool
+    etag: Optional[str]
+
+    def __init__(self, host: str, port: int, object_path: str, etag: Optional[str] = None) -> None:
+        self.object_path = object_path
+        # The state the subscriber has; the server only resends the children when it changed
+        self.etag = etag
+        self._server = get_server(host, port)
+        self._request_id: Optional[int] = None
+        self._closing = threading.Event()
+        self.closed = False
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        delay = RESUBSCRIBE_DELAY
+        while not self.closed:
+            try:
+                for delta in self._deltas():
+                    delay = RESUBSCRIBE_DELAY
+                    yield delta
+                return
+            except (OSError, ServerError) as exc:
+                if self.closed:
+                    return
+                print(f"Live updates for {self.object_path} interrupted ({exc}), resubscribing in {delay:.0f} s")
+            if self._closing.wait(delay):
+                return
+            delay = min(delay * 2, MAX_RESUBSCRIBE_DELAY)
+
+    def _deltas(self) -> Iterator[Dict[str, Any]]:
+        message = {"action": "Subscribe", "path": self.object_path, "format": "wire"}
+        if self.etag is not None:
+            message["if_none_match"] = self.etag
+        request_id = self._request_id = self._server.send(message)
+        try:
+            while not self.closed:
+                frame = self._server.read(request_id, wait=True)
+                kind, value = wire.decode(frame)
+                if kind == wire.KIND_ERROR:
+                    raise ServerError(value)
+                if kind == wire.KIND_END:
+                    return
+                if kind == wire.KIND_OBJECT:
+                    # The current state, sent when the subscription starts: the
+                    # whole object unless it is still at the etag we sent
+                    etag = value.get("meta", {}).get("etag")
+                    replace = etag is None or etag != self.etag
+                    self.etag = etag
+                    yield {"object": value, "added": [], "changed": [], "removed": [], "replace": replace}
+                elif kind == wire.KIND_DELTA:
+                    self.etag = value["object"].get("meta", {}).get("etag", self.etag)
+                    yield value
+        finally:
+            self._server.finish(request_id)
+            if self.closed:
+                # Stop the server pushing to us; its replies are dropped unread
+                try:
+                    self._server.finish(self._server.send({"action": "Unsubscribe", "subscription": request_id, "format": "wire"}))
+                except OSError:
+                    pass
+
+    def close(self) -> None:
+        """Stop iterating; safe to call from any thread, it does no network I/O."""
+        self.closed = True
+        self._closing.set()
+        if self._request_id is not None:
+            # Wakes the iterating thread if it waits in read()
+            self._server.finish(self._request_id)
+
+
+def refresh_object(host: str, port: int, object_path: str) -> Any:
+    """Have the server query Slurm again for object_path's cluster, and return the fresh object."""
+    payload = get_server(host, port).request({"action": "Refresh", "path": object_path, "format": "wire"})
+    return decode_object(payload)
+
+
+def cached_icon(icon_id: str) -> Optional[str]:
+    """An icon from the disk cache; icon ids are content hashes, so it is never stale."""
+    disk = response_cache.disk
+    return disk.get_icon(icon_id) if disk is not None else None
+
+
+def fetch_icon(host: str, port: int, icon_id: str) -> str:
+    icon = cached_icon(icon_id)
+    if icon is not None:
+        return icon
+    payload = get_server(host, port).request({"action": "GetIcon", "icon_id": icon_id, "format": "wire"})
+    kind, value = wire.decode(payload)
+    if kind == wire.KIND_ERROR:
+        raise RuntimeError(f"Server error: {value}")
+    if response_cache.disk is not None:
+        response_cache.disk.put_icon(icon_id, value[1])
+    return value[1]
+
+
+def fetch_stats(host: str, port: int) -> Dict[str, Any]:
+    """The server's counters, latency histograms and recent sampled request traces."""
+    kind, value = wire.decode(get_server(host, port).request({"action": "Stats", "format": "wire"}))
+    if kind == wire.KIND_ERROR:
+        raise ServerError(value)
+    return json.loads(value)
+
+
+def fetch_file_chunk(host: str, port: int, object_path: str, stream: str, offset: Optional[int] = None, length: Optional[int] = None) -> Tuple[int, int, bytes]:
+    """
+    Read part of a job's StdOut/StdErr: length bytes from offset, or its tail
+    when offset is None. Returns (offset, file size, data).
+    """
+    request: Dict[str, Any] = {"action": "TailFile", "path": object_path, "stream": stream, "format": "wire"}
+    if offset is not None:
+        request["offset"] = offset
+    if length is not None:
+        request["length"] = length
+    kind, value = wire.decode(get_server(host, port).request(request))
+    if kind == wire.KIND_ERROR:
+        raise ServerError(value)
+    return value
 
 
 def main() -> None:
@@ -65,14 +511,24 @@ def main() -> None:
     parser.add_argument("--host", default="127.0.0.1", help="Server host")
     parser.add_argument("--port", type=int, default=9100, help="Server port")
     parser.add_argument("--view", default=None, help="View to open (icon(Default), settings)")
+    parser.add_argument("--no-daemon", action="store_true", help="Open in a new process instead of the resident viewer")
     args = parser.parse_args()
 
+    if not args.no_daemon:
+        from ObjectViewer.daemon import start
+        start({"object": args.object_path, "host": args.host, "port": args.port, "view": args.view})
+        print("Done")
+        sys.exit(0)
+
     obj = fetch_object(args.host, args.port, args.object_path)
     # If the server returned an error dict
     if isinstance(obj, dict) and "error" in obj:
         raise RuntimeError(f"Server error: {obj['error']}")
     obj.setHost(args.host)
     obj.setPort(args.port)
+    # Objects only carry icon ids; resolve any we don't have locally from the server
+    icons.set_fetcher(lambda icon_id: fetch_icon(args.host, args.port, icon_id))
+    icons.prefetch([obj.icon_id] + [child.icon_id for child in obj.children])
     if hasattr(obj, "getTitle"):
         title = getattr(obj, "getTitle")()
         print(title)
@@ -0,0 +1,24 @@
+import pytest
+
+from ObjectViewer.daemon import check_request
+
+
+def test_valid_request():
+    assert check_request({"object": "/Slurm/Quartz", "host": "localhost", "port": "9100"}) == \
+        {"object": "/Slurm/Quartz", "host": "localhost", "port": 9100, "view": None}
+    assert check_request({"object": "/Slurm/Quartz", "host": "localhost", "view": "list"})["port"] == 9100
+
+
+@pytest.mark.parametrize("request_", [
+    [1],
+    {"host": "localhost", "port": 9100},
+    {"object": "Slurm", "host": "localhost"},
+    {"object": "/Slurm", "port": 9100},
+    {"object": "/Slurm", "host": "localhost", "port": "abc"},
+    {"object": "/Slurm", "host": "localhost", "port": 70000},
+    {"object": "/Slurm", "host": "localhost", "port": True},
+    {"object": "/Slurm", "host": "localhost", "view": 3},
+])
+def test_bad_requests(request_):
+    with pytest.raises(ValueError):
+        check_request(request_)
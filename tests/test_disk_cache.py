@@ -0,0 +1,88 @@
+import os
+import time
+
+from ObjectViewer import disk_cache
+from ObjectViewer.disk_cache import DiskCache
+
+
+def test_put_get(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    frames = [b"header", bytearray(b"chunk one"), b""]
+    cache.put(("host", 9100, "/Slurm/Quartz", 0, None), "etag-1", frames)
+    assert cache.get(("host", 9100, "/Slurm/Quartz", 0, None)) == ("etag-1", [b"header", b"chunk one", b""])
+    assert cache.get(("host", 9100, "/Slurm/Other", 0, None)) is None
+
+
+def test_shared_between_instances(tmp_path):
+    DiskCache(str(tmp_path)).put(("key",), "e", [b"data"])
+    assert DiskCache(str(tmp_path)).get(("key",)) == ("e", [b"data"])
+
+
+def test_replace_keeps_size_accurate(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.put(("key",), "e1", [b"x" * 1000])
+    cache.put(("key",), "e2", [b"y" * 10])
+    assert cache.get(("key",)) == ("e2", [b"y" * 10])
+    entries = os.path.join(str(tmp_path), "entries")
+    assert cache.size() == sum(os.path.getsize(os.path.join(entries, name)) for name in os.listdir(entries))
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10000)
+    for index in range(5):
+        cache.put(("key", index), "", [b"x" * 1500])
+    # Touch the oldest entry so the next one in line is evicted instead
+    assert cache.get(("key", 0)) is not None
+    for index in range(5, 8):
+        cache.put(("key", index), "", [b"x" * 1500])
+    assert cache.size() <= 10000
+    assert cache.get(("key", 0)) is not None
+    assert cache.get(("key", 1)) is None
+    assert cache.get(("key", 7)) is not None
+
+
+def test_oversized_entry_is_not_stored(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    cache.put(("big",), "", [b"x" * 5000])
+    assert cache.get(("big",)) is None
+    assert cache.size() == 0
+
+
+def test_icons(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    assert cache.get_icon("0123456789abcdef") is None
+    cache.put_icon("0123456789abcdef", "iVBORw0KGgo=")
+    assert cache.get_icon("0123456789abcdef") == "iVBORw0KGgo="
+
+
+def test_corrupt_index_starts_over(tmp_path):
+    DiskCache(str(tmp_path)).put(("key",), "e", [b"data"])
+    with open(os.path.join(str(tmp_path), "index"), "r+b") as f:
+        f.write(b"XXXX")
+    cache = DiskCache(str(tmp_path))
+    assert cache.get(("key",)) is None
+    assert cache.size() == 0
+    assert os.listdir(os.path.join(str(tmp_path), "entries")) == []
+
+
+def test_stale_temp_files_are_swept(tmp_path):
+    DiskCache(str(tmp_path)).put(("key",), "e", [b"data"])
+    entries = os.path.join(str(tmp_path), "entries")
+    old = os.path.join(entries, ".tmpold")
+    new = os.path.join(entries, ".tmpnew")
+    for path in (old, new):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+    stale = time.time() - disk_cache.STALE_TEMP_AGE - 1
+    os.utime(old, (stale, stale))
+    DiskCache(str(tmp_path)).get(("key",))
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
+
+
+def test_unusable_directory_disables_cache(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_bytes(b"")
+    cache = DiskCache(str(blocker / "cache"))
+    cache.put(("key",), "e", [b"data"])
+    assert cache.get(("key",)) is None
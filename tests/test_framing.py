@@ -0,0 +1,59 @@
+import os
+import socket
+import threading
+import zlib
+
+import pytest
+
+from ObjectRuntime import compression, framing
+
+
+def _round_trip(parts):
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        thread = threading.Thread(target=framing.send_parts, args=(sender, parts))
+        thread.start()
+        frame = framing.read_frame(receiver)
+        thread.join()
+    return frame
+
+
+@pytest.mark.parametrize("codec", [None] + compression.available())
+def test_tagged_frames(codec):
+    for payload in (b"", b"small", b"compressible " * 50000, os.urandom(300000)):
+        frame = _round_trip(framing.frame_parts(payload, 42, codec))
+        assert framing.HEADER.unpack_from(frame)[0] == 42
+        assert bytes(frame[framing.HEADER.size:]) == payload
+
+
+def test_untagged_frame():
+    assert _round_trip(framing.frame_parts(b"request", None, "zlib")) == b"request"
+
+
+def test_small_payloads_stay_uncompressed():
+    parts = framing.frame_parts(b"x" * (compression.threshold - 1), 1, "zlib")
+    assert not framing.HEADER.unpack_from(parts[0])[0] & compression.COMPRESSED_FLAG
+
+
+def test_decompression_bomb_is_rejected():
+    compressor = zlib.compressobj(9)
+    body = bytearray((compression.CODEC_IDS["zlib"],))
+    block = bytes(1024 * 1024)
+    for _ in range(framing.MAX_MESSAGE_SIZE // len(block) + 8):
+        body += compressor.compress(block)
+    body += compressor.flush()
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        thread = threading.Thread(target=lambda: _send_ignoring_reset(sender, body))
+        thread.start()
+        with pytest.raises(ValueError):
+            framing.read_frame(receiver)
+        receiver.close()
+        thread.join()
+
+
+def _send_ignoring_reset(sender, body):
+    try:
+        framing.send_parts(sender, [framing.HEADER.pack(len(body) | compression.COMPRESSED_FLAG), body])
+    except OSError:
+        pass
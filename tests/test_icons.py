@@ -0,0 +1,65 @@
+import base64
+import os
+
+import pytest
+
+from ObjectRuntime import icons
+
+
+# A 1x1 PNG no Resources/ file has
+PNG = base64.b64encode(bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360f8cfc0f01f0005000201a1d2a6"
+    "0c0000000049454e44ae426082"
+)).decode("ascii")
+PNG_ID = icons._icon_id(base64.b64decode(PNG))
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    calls = []
+
+    def fetch(icon_id):
+        calls.append(icon_id)
+        if icon_id != PNG_ID:
+            raise KeyError(icon_id)
+        return PNG
+
+    monkeypatch.setattr(icons, "_icons", {})
+    monkeypatch.setattr(icons, "_ids_by_name", {})
+    monkeypatch.setattr(icons, "_local_loaded", False)
+    monkeypatch.setattr(icons, "_unavailable", set())
+    icons.set_fetcher(fetch)
+    yield calls
+    icons.set_fetcher(None)
+
+
+def test_find_icon_never_fetches(fetches):
+    assert icons.find_icon(icons.icon_id_for("WPSlurmJob.png")) is not None
+    assert icons.find_icon(PNG_ID) is None
+    assert fetches == []
+
+
+def test_prefetch(fetches):
+    local = icons.icon_id_for("WPSlurmJob.png")
+    assert icons.prefetch([local, PNG_ID, PNG_ID, "missing"]) == [PNG_ID]
+    assert sorted(fetches) == sorted([PNG_ID, "missing"])
+    assert icons.find_icon(PNG_ID) == PNG
+    # Neither the fetched nor the unavailable icon is asked for again
+    assert icons.prefetch([PNG_ID, "missing"]) == []
+    assert len(fetches) == 2
+
+
+def test_pixmap_cache_does_not_fetch(fetches):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+    from ObjectRuntime.pixmap_cache import PixmapCache
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    cache = PixmapCache()
+    placeholder = cache.get(PNG_ID, 32)
+    assert placeholder is not None
+    assert fetches == []
+    icons.prefetch([PNG_ID])
+    assert cache.get(PNG_ID, 32) is not placeholder
+    assert app is not None
@@ -0,0 +1,61 @@
+from ObjectRuntime.job_record import iter_job_records, parse_jobs
+
+
+ONE_LINE = (
+    "JobId=101 JobName=my job UserId=bob(1001) JobState=RUNNING Reason=None Partition=general "
+    "StdOut=/home/bob/out.txt WorkDir=/home/bob/a dir\n"
+    "JobId=200 ArrayJobId=103 ArrayTaskId=1-4 JobState=PENDING Partition=debug,gpu\n"
+    "JobId=201 ArrayJobId=103 ArrayTaskId=5 JobState=RUNNING Partition=debug\n"
+)
+
+MULTI_LINE = """JobId=101 JobName=my job
+   UserId=bob(1001) GroupId=users(100)
+   JobState=RUNNING Reason=None Dependency=(null)
+   Partition=general
+   StdOut=/home/bob/out.txt
+   WorkDir=/home/bob/a dir
+
+JobId=102 JobName=x
+   UserId=al(1002)
+   JobState=PENDING Reason=Priority
+   Partition=general,gpu
+"""
+
+
+def test_one_line_format():
+    records = list(iter_job_records(ONE_LINE.splitlines()))
+    assert [record.job_id for record in records] == ["101", "200", "201"]
+    first = records[0]
+    assert first.name == "my job"
+    assert first.user == "bob"
+    assert first.state == "RUNNING"
+    assert first.std_out == "/home/bob/out.txt"
+    assert first.work_dir == "/home/bob/a dir"
+    assert records[1].partition == "debug,gpu"
+
+
+def test_multi_line_format():
+    records = parse_jobs(MULTI_LINE)
+    assert [record.job_id for record in records] == ["101", "102"]
+    assert records[0].name == "my job"
+    assert records[0].work_dir == "/home/bob/a dir"
+    assert records[1].user == "al"
+    assert records[1].reason == "Priority"
+
+
+def test_formats_agree():
+    one_line = list(iter_job_records(ONE_LINE.splitlines()))[0]
+    multi_line = parse_jobs(MULTI_LINE)[0]
+    assert one_line.to_extra() == multi_line.to_extra()
+
+
+def test_array_ids():
+    records = list(iter_job_records(ONE_LINE.splitlines()))
+    assert records[0].ids() == ["101"]
+    assert records[1].ids() == ["200", "103_[1-4]"]
+    assert records[2].ids() == ["201", "103_5"]
+
+
+def test_empty_output():
+    assert list(iter_job_records([])) == []
+    assert parse_jobs("No jobs in the system\n") == []
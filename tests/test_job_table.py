@@ -0,0 +1,85 @@
+import pytest
+
+from ObjectRuntime.job_record import parse_jobs
+from ObjectRuntime.job_table import JobList, JobTable
+from ObjectRuntime.slurm_collector import parse_snapshot
+from ObjectRuntime.slurm_partition import WPSlurmPartition
+
+
+SNAPSHOT = "general*\ngpu\n--\ngeneral 101 RUNNING\ngeneral 102 PENDING\ngeneral,gpu 103 PENDING\n"
+
+RECORDS = {record.job_id: record for record in parse_jobs(
+    "JobId=101 JobName=a UserId=bob(1001) JobState=RUNNING Partition=general\n"
+    "JobId=103 JobName=c UserId=al(1002) JobState=COMPLETING Partition=general,gpu\n"
+)}
+
+
+def _partition():
+    partition = WPSlurmPartition("general", "/Slurm/Quartz/general", "login.invalid")
+    partition.setHost("localhost")
+    partition.setPort(9000)
+    partition.getJobs(parse_snapshot(SNAPSHOT))
+    return partition
+
+
+def test_table_columns():
+    table = JobTable()
+    table.append("1", "RUNNING")
+    table.append("2", "".join(["RUN", "NING"]))
+    assert len(table) == 2
+    assert table.row("2") == 1
+    assert table.row("3") is None
+    # States are interned, so equal states share one string
+    assert table.states[0] is table.states[1]
+
+
+def test_set_record_updates_state():
+    table = JobTable()
+    table.append("103", "PENDING")
+    table.set_record(0, RECORDS["103"])
+    assert table.states[0] == "COMPLETING"
+    assert table.records[0] is RECORDS["103"]
+
+
+def test_partition_jobs():
+    partition = _partition()
+    assert partition.children_count == 3
+    assert isinstance(partition.children, JobList)
+    assert partition.jobs.ids == ["101", "102", "103"]
+    assert partition.jobs.states == ["RUNNING", "PENDING", "PENDING"]
+
+
+def test_job_list_creates_jobs_on_access():
+    partition = _partition()
+    partition.getJobDetails(RECORDS)
+    jobs = partition.children
+    assert len(jobs) == 3
+    assert [job.title for job in jobs] == ["101", "102", "103"]
+    assert [job.title for job in jobs[1:]] == ["102", "103"]
+    last = jobs[-1]
+    assert last.path == "/Slurm/Quartz/general/103"
+    assert (last.host, last.port, last.slurm_host) == ("localhost", 9000, "login.invalid")
+    assert last.state == "COMPLETING"
+    assert last.record is RECORDS["103"]
+    with pytest.raises(IndexError):
+        jobs[3]
+    with pytest.raises(IndexError):
+        jobs[-4]
+
+
+def test_child_records_match_job_records():
+    partition = _partition()
+    partition.getJobDetails(RECORDS)
+    expected = [job.to_record(False) for job in partition.children]
+    assert partition.child_records() == expected
+    assert partition.child_records(1, 2) == expected[1:2]
+    assert partition.to_record()["children"] == expected
+
+
+def test_shared_records_are_counted_once():
+    table = JobTable()
+    for job_id in ("103_1", "103_2", "103_3"):
+        table.append(job_id, "PENDING")
+        table.set_record(table.row(job_id), RECORDS["103"])
+    once = RECORDS["103"].memory_size()
+    assert table.memory_size() - table.memory_size(records=False) == once
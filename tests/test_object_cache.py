@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from ObjectRuntime import object_cache
+from ObjectRuntime.job_record import parse_jobs
+from ObjectRuntime.object_cache import ObjectCache
+from ObjectRuntime.slurm_collector import parse_snapshot
+from ObjectRuntime.slurm_partition import WPSlurmPartition
+
+
+def test_hit_and_miss():
+    cache = ObjectCache(1000)
+    loads = []
+    loader = lambda: (loads.append(1) or "value", 10, 60.0)
+    assert cache.get("a", loader) == "value"
+    assert cache.get("a", loader) == "value"
+    assert len(loads) == 1
+
+
+def test_single_flight():
+    cache = ObjectCache(1000)
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        release.wait(5)
+        return "value", 10, 60.0
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("a", loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["value"] * 8
+    assert len(loads) == 1
+
+
+def test_failed_load_is_raised_and_not_cached():
+    cache = ObjectCache(1000)
+
+    def failing():
+        raise RuntimeError("squeue failed")
+
+    with pytest.raises(RuntimeError):
+        cache.get("a", failing)
+    assert cache.get("a", lambda: ("value", 10, 60.0)) == "value"
+
+
+def test_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(object_cache.time, "monotonic", lambda: now[0])
+    cache = ObjectCache(1000)
+    assert cache.get("a", lambda: ("old", 10, 2.0)) == "old"
+    now[0] += 1.9
+    assert cache.get("a", lambda: ("new", 10, 2.0)) == "old"
+    now[0] += 0.2
+    assert cache.get("a", lambda: ("new", 10, 2.0)) == "new"
+    # A zero TTL is never stored
+    cache.get("b", lambda: ("once", 10, 0.0))
+    assert "b" not in cache.keys()
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = ObjectCache(100)
+    for key in "abc":
+        cache.get(key, lambda: (key, 40, 60.0))
+    assert cache.keys() == ["b", "c"]
+    cache.get("b", lambda: ("b", 40, 60.0))
+    cache.get("d", lambda: ("d", 40, 60.0))
+    assert cache.keys() == ["b", "d"]
+    # Larger than the whole cache: returned, but not stored
+    assert cache.get("e", lambda: ("e", 101, 60.0)) == "e"
+    assert cache.keys() == ["b", "d"]
+
+
+def test_shared_job_records_are_not_charged_to_partitions():
+    snapshot = parse_snapshot("general\ngpu\n--\n" + "".join(f"general,gpu {job} PENDING\n" for job in range(100)))
+    records = {record.job_id: record for record in parse_jobs(
+        "".join(f"JobId={job} JobName=job{job} JobState=PENDING Partition=general,gpu WorkDir=/home/u\n" for job in range(100))
+    )}
+    partitions = []
+    for name in ("general", "gpu"):
+        partition = WPSlurmPartition(name, f"/Slurm/Q/{name}", "login")
+        partition.getJobs(snapshot)
+        partition.getJobDetails(records)
+        partitions.append(partition)
+    record_bytes = sum(record.memory_size() for record in records.values())
+    for partition in partitions:
+        assert partition.memory_size() - partition.memory_size(records=False) == record_bytes
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from ObjectRuntime import poller
+from ObjectRuntime.job_record import parse_jobs
+from ObjectRuntime.poller import ClusterState, SnapshotPoller
+from ObjectRuntime.providers import Registry
+from ObjectRuntime.slurm_collector import parse_snapshot
+
+
+POLLS = [
+    ("general*\n--\ngeneral 101 RUNNING\n", "JobId=101 JobState=RUNNING Partition=general\n"),
+    ("general*\n--\ngeneral 101 COMPLETING\ngeneral 102 PENDING\n",
+     "JobId=101 JobState=COMPLETING Partition=general\nJobId=102 JobState=PENDING Partition=general\n"),
+]
+
+
+@pytest.fixture
+def cluster_polls(monkeypatch):
+    """Make poll_cluster return the states in POLLS in turn; the list records each call."""
+    calls = []
+
+    def poll_cluster(slurm_host, cache_size):
+        snapshot, jobs = POLLS[min(len(calls), len(POLLS) - 1)]
+        calls.append(slurm_host)
+        records = {record.job_id: record for record in parse_jobs(jobs)}
+        return ClusterState(parse_snapshot(snapshot), records, cache_size)
+
+    monkeypatch.setattr(poller, "poll_cluster", poll_cluster)
+    return calls
+
+
+def _poller(loads=None):
+    registry = Registry({"clusters": [{"name": "Quartz", "slurm_host": "login.invalid", "snapshot_interval": 30}]})
+    cluster = registry.clusters["Quartz"]
+
+    def load(path, state):
+        if loads is not None:
+            loads.append((path, state))
+        obj = registry.resolve(path, state)
+        return obj, 100, 3600.0
+
+    return cluster, SnapshotPoller(cluster, cluster.snapshot_interval, load)
+
+
+def test_poll_swaps_state(cluster_polls):
+    cluster, snapshot_poller = _poller()
+    assert cluster.state is None
+    first = snapshot_poller.poll()
+    assert cluster.state is first
+    assert first.cache.max_bytes == cluster.cache.max_bytes
+    second = snapshot_poller.poll()
+    assert cluster.state is second is not first
+    assert cluster_polls == ["login.invalid", "login.invalid"]
+    # The first state is untouched by the swap
+    assert list(first.records) == ["101"]
+
+
+def test_cached_objects_are_rebuilt_from_the_new_state(cluster_polls):
+    loads = []
+    cluster, snapshot_poller = _poller(loads)
+    first = snapshot_poller.poll()
+    job = first.cache.get("/Slurm/Quartz/general/101", lambda: snapshot_poller.load("/Slurm/Quartz/general/101", first))
+    assert job.state == "RUNNING"
+    second = snapshot_poller.poll()
+    # Rebuilt before the swap, so the first request after it is a cache hit
+    assert loads[1:] == [("/Slurm/Quartz/general/101", second)]
+    rebuilt = second.cache.get("/Slurm/Quartz/general/101", lambda: pytest.fail("not rebuilt"))
+    assert rebuilt.state == "COMPLETING"
+    assert first.cache.get("/Slurm/Quartz/general/101", lambda: pytest.fail("dropped")) is job
+
+
+def test_failed_rebuild_does_not_stop_the_swap(cluster_polls):
+    cluster, snapshot_poller = _poller()
+    first = snapshot_poller.poll()
+    first.cache.get("/Slurm/Quartz/gone", lambda: ("stale", 100, 3600.0))
+    second = snapshot_poller.poll()
+    assert cluster.state is second
+    assert second.cache.keys() == []
+
+
+def test_concurrent_polls_share_one(cluster_polls, monkeypatch):
+    cluster, snapshot_poller = _poller()
+    release = threading.Event()
+    poll_cluster = poller.poll_cluster
+
+    def slow_poll_cluster(slurm_host, cache_size):
+        release.wait(5)
+        return poll_cluster(slurm_host, cache_size)
+
+    monkeypatch.setattr(poller, "poll_cluster", slow_poll_cluster)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(snapshot_poller.poll())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(cluster_polls) == 1
+    assert results == [cluster.state] * 4
+
+
+def test_records_are_fetched_once_when_lazy():
+    fetches = []
+    state = ClusterState(parse_snapshot("general*\n--\n"), lambda: fetches.append(1) or {}, 1024)
+    assert state.records == {}
+    assert state.records == {}
+    assert fetches == [1]
@@ -0,0 +1,91 @@
+import pytest
+
+from ObjectRuntime.job_record import parse_jobs
+from ObjectRuntime.poller import ClusterState
+from ObjectRuntime.providers import Registry, providers
+from ObjectRuntime.slurm_collector import parse_snapshot
+
+
+def _registry():
+    return Registry({"clusters": [{"name": "Quartz", "slurm_host": "login.invalid"}]})
+
+
+@pytest.mark.parametrize("job", ["1;touch pwned", "1 2", "$(id)", "1_", "abc", "1_[2;3]"])
+def test_job_ids_are_validated_before_slurm_is_asked(job):
+    with pytest.raises(KeyError):
+        _registry().resolve(f"/Slurm/Quartz/general/{job}")
+
+
+def _state():
+    snapshot = parse_snapshot("general*\ngpu\n--\ngeneral 101 RUNNING\ngeneral,gpu 102 PENDING\n")
+    records = {record.job_id: record for record in parse_jobs(
+        "JobId=101 JobState=RUNNING Partition=general\n"
+        "JobId=102 JobState=PENDING Partition=general,gpu\n"
+    )}
+    return ClusterState(snapshot, records, 1024 * 1024)
+
+
+def test_partition_from_state():
+    partition = _registry().resolve("/Slurm/Quartz/general", _state())
+    assert partition.children_count == 2
+    assert [child.title for child in partition.children] == ["101", "102"]
+
+
+def test_unknown_partition():
+    with pytest.raises(KeyError):
+        _registry().resolve("/Slurm/Quartz/missing", _state())
+
+
+def test_job_from_state():
+    state = _state()
+    assert _registry().resolve("/Slurm/Quartz/general/101", state).state == "RUNNING"
+    assert _registry().resolve("/Slurm/Quartz/gpu/102", state).state == "PENDING"
+
+
+def test_job_must_be_in_its_partition():
+    state = _state()
+    for path in ("/Slurm/Quartz/gpu/101", "/Slurm/Quartz/missing/101", "/Slurm/Quartz/general/999"):
+        with pytest.raises(KeyError):
+            _registry().resolve(path, state)
+
+
+def test_routes_name_their_cluster():
+    registry = Registry({"clusters": [
+        {"name": "Quartz", "slurm_host": "quartz.invalid"},
+        {"name": "BigRed", "slurm_host": "bigred.invalid", "cache_size_mb": 8, "snapshot_interval": 30},
+    ]})
+    cluster, func, params = registry.route("/Slurm/BigRed/general/101")
+    assert cluster is registry.clusters["BigRed"]
+    assert func is providers["job"]
+    assert params == {"cluster": "BigRed", "partition": "general", "job": "101"}
+    assert cluster.cache.max_bytes == 8 * 1024 * 1024
+    assert cluster.snapshot_interval == 30.0
+    assert registry.route("/Slurm/Quartz")[1] is providers["batch_system"]
+    with pytest.raises(KeyError):
+        registry.route("/Slurm/Missing/general")
+
+
+def test_fixed_cluster_routes(monkeypatch):
+    monkeypatch.setitem(providers, "overview", lambda cluster, params, path, state: (cluster.name, path))
+    registry = Registry({
+        "clusters": [{"name": "Quartz", "slurm_host": "quartz.invalid"}],
+        "routes": [
+            {"pattern": "/Q/{partition}", "provider": "partition", "cluster": "Quartz"},
+            {"pattern": "/Q/{partition}/{job}", "provider": "job", "cluster": "Quartz"},
+            {"pattern": "/Overview", "provider": "overview", "cluster": "Quartz"},
+        ],
+    })
+    cluster, func, params = registry.route("/Q/general/101")
+    assert (cluster.name, func, params) == ("Quartz", providers["job"], {"partition": "general", "job": "101"})
+    assert registry.resolve("/Overview") == ("Quartz", "/Overview")
+    assert registry.resolve("/Q/general", _state()).children_count == 2
+    with pytest.raises(KeyError):
+        registry.route("/Slurm/Quartz")
+
+
+def test_bad_routes():
+    clusters = [{"name": "Quartz", "slurm_host": "quartz.invalid"}]
+    with pytest.raises(ValueError):
+        Registry({"clusters": clusters, "routes": [{"pattern": "/X/{partition}", "provider": "missing"}]})
+    with pytest.raises(ValueError):
+        Registry({"clusters": clusters, "routes": [{"pattern": "/X/{partition}", "provider": "partition", "cluster": "BigRed"}]})
@@ -0,0 +1,41 @@
+import pytest
+
+from ObjectRuntime.router import PathRouter
+
+
+def _router():
+    router = PathRouter()
+    router.add("/Slurm/{cluster}", "batch_system")
+    router.add("/Slurm/{cluster}/{partition}", "partition")
+    router.add("/Slurm/{cluster}/{partition}/{job}", "job")
+    router.add("/BR/{partition}", "br_partition")
+    router.add("/Slurm/Quartz/overview", "overview")
+    return router
+
+
+def test_parameters():
+    router = _router()
+    assert router.match("/Slurm/Quartz") == ("batch_system", {"cluster": "Quartz"})
+    assert router.match("/Slurm/Quartz/general/101") == ("job", {"cluster": "Quartz", "partition": "general", "job": "101"})
+    assert router.match("/BR/gpu/") == ("br_partition", {"partition": "gpu"})
+
+
+def test_literal_wins_over_parameter():
+    router = _router()
+    assert router.match("/Slurm/Quartz/overview") == ("overview", {})
+    assert router.match("/Slurm/BigRed/overview") == ("partition", {"cluster": "BigRed", "partition": "overview"})
+
+
+def test_unknown_paths():
+    router = _router()
+    for path in ("/", "/Slurm", "/Other/x", "/Slurm/Quartz/general/101/extra"):
+        with pytest.raises(KeyError):
+            router.match(path)
+
+
+def test_conflicting_routes():
+    router = _router()
+    with pytest.raises(ValueError):
+        router.add("/Slurm/{name}", "other")
+    with pytest.raises(ValueError):
+        router.add("/Slurm/{cluster}/{partition}", "again")
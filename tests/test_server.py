@@ -0,0 +1,151 @@
+import pytest
+
+from ObjectRuntime import server, wire
+from ObjectRuntime.job_record import parse_jobs
+from ObjectRuntime.poller import ClusterState
+from ObjectRuntime.providers import Registry
+from ObjectRuntime.slurm_collector import parse_snapshot
+
+
+SNAPSHOT = "general*\ngpu\ndebug\n--\ngeneral 101 RUNNING\ngeneral 102 PENDING\ngpu 103 RUNNING\n"
+
+JOBS = (
+    "JobId=101 JobState=RUNNING Partition=general\n"
+    "JobId=102 JobState=PENDING Partition=general\n"
+    "JobId=103 JobState=RUNNING Partition=gpu\n"
+)
+
+
+def _state(snapshot=SNAPSHOT, jobs=JOBS):
+    records = {record.job_id: record for record in parse_jobs(jobs)}
+    return ClusterState(parse_snapshot(snapshot), records, 1024 * 1024)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A registry serving Quartz from a polled state, so no request reaches Slurm."""
+    registry = Registry({"clusters": [{"name": "Quartz", "slurm_host": "login.invalid"}]})
+    registry.clusters["Quartz"].state = _state()
+    monkeypatch.setattr(server, "registry", registry)
+    return registry
+
+
+def _replies(handler, message, fmt="wire"):
+    replies = []
+    handler(replies.append, message, fmt)
+    return [wire.decode(reply) for reply in replies] if fmt == "wire" else replies
+
+
+class _Stub:
+    def __init__(self, *names):
+        self.names = names
+
+    def child_records(self):
+        return [{"path": name} for name in self.names]
+
+
+def test_expand_paths():
+    tree = {
+        "/Slurm/Quartz": _Stub("/Slurm/Quartz/general", "/Slurm/Quartz/gpu", "/Slurm/Quartz/debug"),
+        "/Slurm/Quartz/general": _Stub("/Slurm/Quartz/general/101", "/Slurm/Quartz/general/102"),
+        "/Slurm/Quartz/gpu": _Stub("/Slurm/Quartz/gpu/103"),
+        "/Slurm/Quartz/debug": _Stub(),
+    }
+    lookups = []
+    lookup = lambda path: lookups.append(path) or tree[path]
+    assert server.expand_paths(["/Slurm/Quartz/g*"], lookup) == ["/Slurm/Quartz/general", "/Slurm/Quartz/gpu"]
+    assert server.expand_paths(["/Slurm/Quartz/*/10[13]"], lookup) == ["/Slurm/Quartz/general/101", "/Slurm/Quartz/gpu/103"]
+    # Plain paths are not looked up; duplicates keep their first position
+    lookups.clear()
+    assert server.expand_paths(["/Slurm/Quartz/gpu/", "/Slurm/Quartz/g?u", "/Slurm/Quartz/debug/*"], lookup) == ["/Slurm/Quartz/gpu"]
+    assert lookups == ["/Slurm/Quartz", "/Slurm/Quartz/debug"]
+
+
+def test_expand_paths_is_bounded(monkeypatch):
+    monkeypatch.setattr(server, "MAX_BATCH_OBJECTS", 2)
+    lookup = lambda path: _Stub("/a/1", "/a/2", "/a/3")
+    assert server.expand_paths(["/a/1", "/a/2"], lookup) == ["/a/1", "/a/2"]
+    with pytest.raises(ValueError):
+        server.expand_paths(["/a/*"], lookup)
+
+
+def test_get_objects(registry):
+    [(kind, entries)] = _replies(server.send_objects, {"paths": ["/Slurm/Quartz/g*", "/Slurm/Quartz/missing", "/Slurm/Quartz/gpu/103"]})
+    assert kind == wire.KIND_OBJECTS
+    assert [path for path, _ in entries] == ["/Slurm/Quartz/general", "/Slurm/Quartz/gpu", "/Slurm/Quartz/missing", "/Slurm/Quartz/gpu/103"]
+    (_, (_, general)), (_, (_, gpu)), (_, missing), (_, (_, job)) = entries
+    assert [child["title"] for child in general["children"]] == ["101", "102"]
+    assert gpu["children_count"] == 1
+    assert missing[0] == wire.KIND_ERROR
+    assert job["state"] == "RUNNING"
+    # The entries are the cached replies GetObject sends
+    [(_, single)] = _replies(server.send_object, {"path": "/Slurm/Quartz/general"})
+    assert single == general
+
+
+def test_get_objects_pickle(registry):
+    [reply] = _replies(server.send_objects, {"paths": ["/Slurm/Quartz/gpu", "/Slurm/Quartz/missing"]}, "pickle")
+    objects = server.pickle.loads(reply)
+    assert objects["/Slurm/Quartz/gpu"].title == "gpu"
+    assert "error" in objects["/Slurm/Quartz/missing"]
+
+
+def test_get_objects_needs_paths(registry):
+    with pytest.raises(ValueError):
+        _replies(server.send_objects, {"paths": "/Slurm/Quartz/*"})
+
+
+def test_get_objects_share_one_slurm_query(monkeypatch):
+    """Without a polled state, a batch still asks Slurm once rather than once per object."""
+    monkeypatch.setattr(server, "registry", Registry({"clusters": [{"name": "Quartz", "slurm_host": "login.invalid"}]}))
+    calls = []
+
+    class Collector:
+        def snapshot(self):
+            calls.append("snapshot")
+            return parse_snapshot(SNAPSHOT)
+
+    def fetch_records(slurm_host):
+        calls.append("records")
+        return _state().records
+
+    monkeypatch.setattr(server, "get_collector", lambda slurm_host: Collector())
+    monkeypatch.setattr(server, "fetch_records", fetch_records)
+    [(_, entries)] = _replies(server.send_objects, {"paths": ["/Slurm/Quartz/*/*"]})
+    assert [path for path, _ in entries] == ["/Slurm/Quartz/general/101", "/Slurm/Quartz/general/102", "/Slurm/Quartz/gpu/103"]
+    assert all(kind == wire.KIND_OBJECT for _, (kind, _) in entries)
+    assert calls == ["snapshot", "records"]
+
+
+def test_not_modified(registry):
+    [(kind, record)] = _replies(server.send_object, {"path": "/Slurm/Quartz/general"})
+    assert kind == wire.KIND_OBJECT
+    meta = record["meta"]
+    assert meta["etag"] and meta["as_of"]
+    assert _replies(server.send_object, {"path": "/Slurm/Quartz/general", "if_none_match": meta["etag"]}) == [(wire.KIND_NOT_MODIFIED, meta)]
+    [(kind, _)] = _replies(server.send_object, {"path": "/Slurm/Quartz/general", "if_none_match": "stale"})
+    assert kind == wire.KIND_OBJECT
+    [reply] = _replies(server.send_object, {"path": "/Slurm/Quartz/general", "if_none_match": meta["etag"]}, "pickle")
+    assert server.pickle.loads(reply) == {"not_modified": True, "etag": meta["etag"], "as_of": registry.clusters["Quartz"].state.taken_at}
+
+
+def test_get_objects_not_modified(registry):
+    [(_, entries)] = _replies(server.send_objects, {"paths": ["/Slurm/Quartz/g*"]})
+    etags = {path: value["meta"]["etag"] for path, (_, value) in entries}
+    etags["/Slurm/Quartz/gpu"] = "stale"
+    [(_, entries)] = _replies(server.send_objects, {"paths": ["/Slurm/Quartz/g*"], "if_none_match": etags})
+    assert [kind for _, (kind, _) in entries] == [wire.KIND_NOT_MODIFIED, wire.KIND_OBJECT]
+
+
+def test_etag_follows_content_not_time(registry):
+    cluster = registry.clusters["Quartz"]
+    [(_, first)] = _replies(server.send_object, {"path": "/Slurm/Quartz/general"})
+    # A new poll with the same jobs keeps the etag though as_of moves on
+    cluster.state = _state()
+    cluster.state.taken_at += 10
+    [(_, same)] = _replies(server.send_object, {"path": "/Slurm/Quartz/general"})
+    assert same["meta"]["etag"] == first["meta"]["etag"]
+    assert same["meta"]["as_of"] != first["meta"]["as_of"]
+    cluster.state = _state(jobs=JOBS.replace("JobId=102 JobState=PENDING", "JobId=102 JobState=RUNNING"))
+    [(_, changed)] = _replies(server.send_object, {"path": "/Slurm/Quartz/general"})
+    assert changed["meta"]["etag"] != first["meta"]["etag"]
@@ -0,0 +1,32 @@
+from ObjectRuntime.slurm_collector import parse_snapshot
+
+
+OUTPUT = """general*
+gpu
+debug
+--
+general 101 RUNNING
+gpu 102 PENDING
+general,gpu 103 PENDING
+general 104_[1-8%2] PENDING
+bogus line
+"""
+
+
+def test_partitions_in_sinfo_order():
+    snapshot = parse_snapshot(OUTPUT)
+    assert snapshot.partitions == ["general", "gpu", "debug"]
+
+
+def test_jobs_by_partition():
+    snapshot = parse_snapshot(OUTPUT)
+    assert snapshot.getJobs("general") == [("101", "RUNNING"), ("103", "PENDING"), ("104_[1-8%2]", "PENDING")]
+    assert snapshot.getJobs("gpu") == [("102", "PENDING"), ("103", "PENDING")]
+    assert snapshot.getJobCount("debug") == 0
+    assert snapshot.getJobs("missing") == []
+
+
+def test_empty_output():
+    snapshot = parse_snapshot("")
+    assert snapshot.partitions == []
+    assert snapshot.jobs == {}
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+from ObjectRuntime.slurm_connection import SlurmConnection
+
+
+FAKE_SLURM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ObjectBench", "fake_slurm.py")
+
+
+@pytest.fixture
+def connection(tmp_path, monkeypatch):
+    ssh = tmp_path / "ssh"
+    ssh.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_SLURM}" ssh "$@"\n')
+    ssh.chmod(0o755)
+    monkeypatch.chdir(tmp_path)
+    connection = SlurmConnection("login.example", pool_size=1, ssh=str(ssh))
+    yield connection
+    connection.close()
+
+
+def test_run_quotes_arguments(connection, tmp_path):
+    result = connection.run(["echo", "1;touch pwned", "$(touch pwned)", "a b"])
+    assert result.returncode == 0
+    assert result.stdout == b"1;touch pwned $(touch pwned) a b\n"
+    assert not (tmp_path / "pwned").exists()
+
+
+def test_iter_lines_quotes_arguments(connection, tmp_path):
+    assert list(connection.iter_lines(["echo", "x|touch pwned"])) == ["x|touch pwned\n"]
+    assert not (tmp_path / "pwned").exists()
+
+
+def test_run_script_uses_the_shell(connection):
+    assert connection.run_script("echo a && echo b").stdout == b"a\nb\n"
+
+
+def test_iter_lines_failure(connection):
+    with pytest.raises(RuntimeError):
+        list(connection.iter_lines(["false"]))
@@ -0,0 +1,152 @@
+from ObjectRuntime import wire
+from ObjectRuntime.subscriptions import SubscriptionHub
+from ObjectRuntime.wp_object import WPObject
+
+
+def _object(titles, etag=None, as_of=100.0):
+    obj = WPObject("Partition", "/Slurm/Quartz/general")
+    obj.children = [WPObject(title, f"/Slurm/Quartz/general/{job}") for job, title in titles.items()]
+    obj.children_count = len(obj.children)
+    obj.etag = etag
+    obj.as_of = as_of
+    return obj
+
+
+class _Subscriber:
+    def __init__(self):
+        self.deltas = []
+        self.busy = False
+
+    def __call__(self, payload):
+        if self.busy:
+            return False
+        kind, value = wire.decode(payload)
+        assert kind == wire.KIND_DELTA
+        self.deltas.append(value)
+        return True
+
+
+def _hub(current):
+    # A long interval keeps the hub's own poll thread out of the way
+    return SubscriptionHub(lambda path: current[0], interval=3600)
+
+
+def test_unchanged_object_pushes_nothing():
+    current = [_object({"1": "a", "2": "b"}, "e1")]
+    hub = _hub(current)
+    subscriber = _Subscriber()
+    hub.subscribe(current[0], subscriber)
+    hub.poll()
+    assert subscriber.deltas == []
+
+
+def test_added_changed_removed():
+    current = [_object({"1": "a", "2": "b"}, "e1")]
+    hub = _hub(current)
+    subscriber = _Subscriber()
+    hub.subscribe(current[0], subscriber)
+    current[0] = _object({"1": "a", "2": "B", "3": "c"}, "e2")
+    hub.poll()
+    current[0] = _object({"2": "B", "3": "c"}, "e3")
+    hub.poll()
+    first, second = subscriber.deltas
+    assert [record["title"] for record in first["added"]] == ["c"]
+    assert [record["title"] for record in first["changed"]] == ["B"]
+    assert first["removed"] == []
+    assert first["object"]["meta"]["etag"] == "e2"
+    assert second["added"] == second["changed"] == []
+    assert second["removed"] == ["/Slurm/Quartz/general/1"]
+
+
+def test_busy_subscriber_gets_changes_coalesced():
+    current = [_object({"1": "a", "2": "b"}, "e1")]
+    hub = _hub(current)
+    subscriber = _Subscriber()
+    hub.subscribe(current[0], subscriber)
+    subscriber.busy = True
+    current[0] = _object({"1": "A", "2": "b"}, "e2")
+    hub.poll()
+    current[0] = _object({"1": "A", "2": "B"}, "e3")
+    hub.poll()
+    assert subscriber.deltas == []
+    subscriber.busy = False
+    hub.poll()
+    (delta,) = subscriber.deltas
+    assert sorted(record["title"] for record in delta["changed"]) == ["A", "B"]
+    hub.poll()
+    assert len(subscriber.deltas) == 1
+
+
+def test_late_subscriber_diffs_against_its_own_object():
+    old = _object({"1": "a"}, "e1")
+    current = [old]
+    hub = _hub(current)
+    early = _Subscriber()
+    hub.subscribe(old, early)
+    current[0] = _object({"1": "a", "2": "b"}, "e2")
+    hub.poll()
+    # Subscribes with the state from before the poll, e.g. a GetObject answered just before it
+    late = _Subscriber()
+    hub.subscribe(old, late)
+    hub.poll()
+    assert len(early.deltas) == 1
+    (delta,) = late.deltas
+    assert [record["title"] for record in delta["added"]] == ["b"]
+
+
+def test_unsubscribe():
+    current = [_object({"1": "a"}, "e1")]
+    hub = _hub(current)
+    subscriber = _Subscriber()
+    token = hub.subscribe(current[0], subscriber)
+    hub.unsubscribe(token)
+    current[0] = _object({"1": "b"}, "e2")
+    hub.poll()
+    assert subscriber.deltas == []
+
+
+def test_apply_replacing_delta():
+    obj = _object({"1": "a", "2": "b"})
+    newer = _object({"2": "B", "3": "c"}, "e2")
+    record = wire.decode(wire.encode_object(newer.to_record(), newer.wire_meta()))[1]
+    added, changed, removed = obj.apply_delta({"object": record, "added": [], "changed": [], "removed": [], "replace": True})
+    assert [child.title for child in added] == ["c"]
+    assert [child.title for child in changed] == ["B"]
+    assert removed == ["/Slurm/Quartz/general/1"]
+    assert [child.title for child in obj.children] == ["B", "c"]
+    assert obj.etag == "e2"
+
+
+def test_as_of_alone_is_pushed_at_most_every_interval():
+    current = [_object({"1": "a"}, "e1", as_of=100.0)]
+    hub = _hub(current)
+    subscriber = _Subscriber()
+    hub.subscribe(current[0], subscriber)
+    for as_of in (102.0, 104.0, 159.0):
+        current[0] = _object({"1": "a"}, "e1", as_of=as_of)
+        hub.poll()
+    assert subscriber.deltas == []
+    current[0] = _object({"1": "a"}, "e1", as_of=161.0)
+    hub.poll()
+    (delta,) = subscriber.deltas
+    assert delta["added"] == delta["changed"] == delta["removed"] == []
+    assert float(delta["object"]["meta"]["as_of"]) == 161.0
+    current[0] = _object({"1": "a"}, "e1", as_of=163.0)
+    hub.poll()
+    assert len(subscriber.deltas) == 1
+    # A real change goes out at once, carrying the new as_of with it
+    current[0] = _object({"1": "b"}, "e2", as_of=165.0)
+    hub.poll()
+    assert len(subscriber.deltas) == 2
+
+
+def test_forced_as_of():
+    current = [_object({"1": "a"}, "e1", as_of=100.0)]
+    hub = _hub(current)
+    subscriber = _Subscriber()
+    hub.subscribe(current[0], subscriber)
+    current[0] = _object({"1": "a"}, "e1", as_of=102.0)
+    hub.poll(as_of_interval=0.0)
+    assert len(subscriber.deltas) == 1
+    hub.poll(as_of_interval=0.0)
+    assert len(subscriber.deltas) == 1
@@ -0,0 +1,95 @@
+import pytest
+
+from ObjectRuntime import wire
+
+
+def _record(path, children=(), **extra):
+    return {
+        "type": "WPSlurmPartition",
+        "path": path,
+        "title": path.rsplit("/", 1)[-1],
+        "icon_id": "0123456789abcdef",
+        "badge": "3",
+        "state": "",
+        "children_count": len(children),
+        "extra": dict(extra),
+        "children": list(children),
+    }
+
+
+def _job(path, state="RUNNING"):
+    record = _record(path, user="alice", name="job with spaces")
+    record.update(type="WPSlurmJob", badge=state, state=state)
+    return record
+
+
+def test_object_round_trip_with_children():
+    record = _record("/Slurm/Quartz/general", [_job("/Slurm/Quartz/general/1"), _job("/Slurm/Quartz/general/2", "PENDING")])
+    kind, value = wire.decode(wire.encode_object(record))
+    assert kind == wire.KIND_OBJECT
+    assert value == record
+    assert "meta" not in value
+
+
+def test_object_meta_trailer():
+    record = _record("/Slurm/Quartz/debug")
+    meta = {"as_of": "1700000000.250", "etag": "abc123"}
+    kind, value = wire.decode(wire.encode_object(record, meta))
+    assert kind == wire.KIND_OBJECT
+    assert value.pop("meta") == meta
+    assert value == record
+
+
+def test_append_meta_to_encoded_object():
+    payload = wire.encode_object(_record("/Slurm/Quartz/debug"))
+    wire.append_meta(payload, {"etag": "ü-tag"})
+    assert wire.decode(payload)[1]["meta"] == {"etag": "ü-tag"}
+
+
+def test_children_and_end():
+    records = [_job(f"/Slurm/Quartz/general/{index}") for index in range(300)]
+    assert wire.decode(wire.encode_children(records)) == (wire.KIND_CHILDREN, records)
+    assert wire.decode(wire.encode_end()) == (wire.KIND_END, None)
+
+
+def test_delta_round_trip():
+    header = _record("/Slurm/Quartz/general")
+    added = [_job("/Slurm/Quartz/general/3")]
+    changed = [_job("/Slurm/Quartz/general/1", "COMPLETING")]
+    kind, delta = wire.decode(wire.encode_delta(header, added, changed, ["/Slurm/Quartz/general/2"], {"as_of": "1.000"}))
+    assert kind == wire.KIND_DELTA
+    assert delta["object"].pop("meta") == {"as_of": "1.000"}
+    assert delta == {"object": header, "added": added, "changed": changed, "removed": ["/Slurm/Quartz/general/2"]}
+
+
+def test_small_messages():
+    assert wire.decode(wire.encode_error("No such object")) == (wire.KIND_ERROR, "No such object")
+    assert wire.decode(wire.encode_icon("0123", "iVBORw0K")) == (wire.KIND_ICON, ("0123", "iVBORw0K"))
+    assert wire.decode(wire.encode_json('{"a": 1}')) == (wire.KIND_JSON, '{"a": 1}')
+    assert wire.decode(wire.encode_not_modified({"etag": "e1"})) == (wire.KIND_NOT_MODIFIED, {"etag": "e1"})
+    assert wire.decode(wire.encode_file_chunk(10, 1000, b"\x00log\n")) == (wire.KIND_FILE_CHUNK, (10, 1000, b"\x00log\n"))
+
+
+def test_objects_nest_complete_messages():
+    record = _record("/Slurm/Quartz/general", [_job("/Slurm/Quartz/general/1")])
+    entries = [
+        ("/Slurm/Quartz/general", wire.encode_object(record, {"etag": "e1"})),
+        ("/Slurm/Quartz/gone", wire.encode_error("Unknown object path")),
+        ("/Slurm/Quartz/debug", wire.encode_not_modified({"etag": "e2", "as_of": "2.000"})),
+    ]
+    kind, value = wire.decode(wire.encode_objects(entries))
+    assert kind == wire.KIND_OBJECTS
+    assert [path for path, _ in value] == [path for path, _ in entries]
+    (_, (object_kind, decoded)), (_, error), (_, not_modified) = value
+    assert object_kind == wire.KIND_OBJECT
+    assert decoded.pop("meta") == {"etag": "e1"}
+    assert decoded == record
+    assert error == (wire.KIND_ERROR, "Unknown object path")
+    assert not_modified == (wire.KIND_NOT_MODIFIED, {"etag": "e2", "as_of": "2.000"})
+
+
+def test_decode_rejects_bad_input():
+    with pytest.raises(ValueError):
+        wire.decode(b"XX\x01\x00")
+    with pytest.raises(ValueError):
+        wire.decode(b"WP")